@@ -33,39 +33,51 @@ def _get_file_type(data):
         if bytes("workbook.xml", "ascii") in data:
             file_type = "xlsm"
 
-    temp_file = _make_temp_file(data, file_type)
+    return file_type
 
-    return temp_file, file_type
 
+def process_data(data, filename, file_path=None):
+    """Extracts and decodes Excel 4 macros from data.
 
-def process_data(data, filename):
+    Args:
+        data: Data of the workbook.
+        filename: Name of the workbook.
+        file_path: Optional path of a file that contains data. It is used as
+            is for XLS and XLSB workbooks; XLSM workbooks are modified while
+            they are parsed, so they are always written to a temporary file.
+    """
     excel_doc = None
-    temp_file, file_type = _get_file_type(data)
-    file_path = temp_file.name
+    file_type = _get_file_type(data)
 
-    results = dict()
+    temp_file = None
+    if not file_path or file_type not in ("xls", "xlsb"):
+        temp_file = _make_temp_file(data, file_type)
+        file_path = temp_file.name
 
-    if file_type == "xls":
-        excel_doc = XLSWrapper(file_path)
-    elif file_type == "xlsb":
-        excel_doc = XLSBWrapper(file_path)
-    elif file_type == "xlsm":
-        excel_doc = XLSMWrapper(file_path)
+    results = dict()
 
-    if not hasattr(excel_doc, "workbook"):
-        logging.debug("file not supported")
-        return
+    try:
+        if file_type == "xls":
+            excel_doc = XLSWrapper(file_path)
+        elif file_type == "xlsb":
+            excel_doc = XLSBWrapper(file_path)
+        elif file_type == "xlsm":
+            excel_doc = XLSMWrapper(file_path)
 
-    results.update(excel_doc.parse_sheets(file_path))
-    results["meta"].update({"file_name": filename, "file_type": file_type})
+        if not hasattr(excel_doc, "workbook"):
+            logging.debug("file not supported")
+            return
 
-    excel_doc_decoded = decode(file_path, file_type, results["defined_names"])
+        results.update(excel_doc.parse_sheets(file_path))
+        results["meta"].update({"file_name": filename, "file_type": file_type})
 
-    results["decoded"] = excel_doc_decoded
-    results["iocs"] = iocs(excel_doc_decoded)
+        excel_doc_decoded = decode(file_path, file_type, results["defined_names"])
 
-    temp_file.close()
-    os.unlink(temp_file.name)
+        results["decoded"] = excel_doc_decoded
+        results["iocs"] = iocs(excel_doc_decoded)
+    finally:
+        if temp_file is not None:
+            os.unlink(temp_file.name)
 
     return results
 
@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+
+import yaml
+
+fixtures_path = Path(__file__).parent.parent / "tests" / "fixtures"
+
+
+def load_backend_cfg(path: str) -> dict:
+    """Loads the backend configuration that benchmarks run with.
+
+    Args:
+        path: Path of the backend configuration, defaults to
+            /etc/strelka/backend.yaml or the repository's configuration.
+    Returns:
+        Dictionary that contains the parsed backend configuration.
+    """
+    if not path:
+        if os.path.exists("/etc/strelka/backend.yaml"):
+            path = "/etc/strelka/backend.yaml"
+        else:
+            path = str(
+                Path(__file__).parent
+                / "../../../../configs/python/backend/backend.yaml"
+            )
+
+    with open(path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    # Benchmarks are not traced
+    backend_cfg["telemetry"] = {}
+
+    return backend_cfg
@@ -0,0 +1,4 @@
+from .corpus import main
+
+if __name__ == "__main__":
+    main()
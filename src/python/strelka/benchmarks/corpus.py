@@ -0,0 +1,303 @@
+"""Benchmarks backend throughput on a corpus of files.
+
+Each file of the corpus is distributed through a local backend (file data
+in File objects, no coordinator) after a warm-up pass that initializes the
+scanners. The benchmark reports throughput (files and MB per second),
+latency percentiles of requests, tasting, scanner assignment, scanners, and
+files by MIME flavor, and the peak RSS of the process.
+
+Results can be saved as JSON and compared with the results of another run;
+metrics that regressed by more than the threshold are flagged and the
+benchmark exits with status 1.
+
+Usage:
+    python -m strelka.benchmarks [-c backend.yaml] [-p corpus] [-r 3] [-o new.json]
+    python -m strelka.benchmarks [-p corpus] --compare old.json
+    python -m strelka.benchmarks --compare old.json new.json
+"""
+import argparse
+import functools
+import json
+import logging
+import math
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from strelka import strelka
+
+from . import fixtures_path, load_backend_cfg
+
+# Latencies that changed by less than this (in seconds) are never regressions
+min_latency_delta = 0.0005
+
+
+def percentile(values: list, q: float) -> float:
+    """Returns the q-th percentile (nearest rank) of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(values: list) -> dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p99": percentile(values, 99),
+        "total": sum(values),
+    }
+
+
+class Recorder(object):
+    """Records latencies of a backend's stages, scanners, and files.
+
+    Attributes:
+        recording: Boolean that is set while samples are recorded (unset
+            during the warm-up pass).
+        stages: Dictionary of stage names to latencies.
+        scanners: Dictionary of scanner names to latencies.
+        flavors: Dictionary of MIME flavors to latencies of distributing
+            files of that flavor (excluding files extracted from them).
+    """
+
+    def __init__(self, backend: strelka.Backend) -> None:
+        self.recording: bool = False
+        self.stages: dict[str, list] = {"request": [], "taste": [], "assign": []}
+        self.scanners: dict[str, list] = {}
+        self.flavors: dict[str, list] = {}
+
+        backend.match_flavors = self.stage("taste", backend.match_flavors)
+        backend.match_scanners = self.stage("assign", backend.match_scanners)
+
+        distribute_file = backend.distribute_file
+        recorder = self
+
+        @functools.wraps(distribute_file)
+        def distribute_file_wrapper(root_id, file, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return distribute_file(root_id, file, *args, **kwargs)
+            finally:
+                if recorder.recording:
+                    flavor = (file.flavors.get("mime") or ["unknown"])[0]
+                    recorder.flavors.setdefault(flavor, []).append(
+                        time.perf_counter() - start
+                    )
+
+        backend.distribute_file = distribute_file_wrapper
+
+        scan_wrapper = strelka.Scanner.scan_wrapper
+
+        @functools.wraps(scan_wrapper)
+        def scan_wrapper_wrapper(plugin, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return scan_wrapper(plugin, *args, **kwargs)
+            finally:
+                if recorder.recording:
+                    recorder.scanners.setdefault(plugin.name, []).append(
+                        time.perf_counter() - start
+                    )
+
+        # Scanner objects are created by the backend, so the class is wrapped
+        strelka.Scanner.scan_wrapper = scan_wrapper_wrapper  # type: ignore
+
+    def stage(self, name: str, fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if self.recording:
+                    self.stages[name].append(time.perf_counter() - start)
+
+        return wrapper
+
+
+def load_corpus(path: Path) -> list[Path]:
+    if path.is_file():
+        return [path]
+    return sorted(p for p in path.rglob("*") if p.is_file())
+
+
+def run(args: argparse.Namespace) -> dict:
+    """Distributes the corpus and returns the results."""
+    logging.disable(logging.CRITICAL)
+
+    backend = strelka.Backend(
+        load_backend_cfg(args.backend_cfg), disable_coordinator=True
+    )
+    recorder = Recorder(backend)
+
+    corpus = [(path.name, path.read_bytes()) for path in load_corpus(args.corpus)]
+
+    def distribute(name: str, data: bytes) -> int:
+        return len(
+            backend.distribute(
+                "benchmark", strelka.File(name=name, data=data), int(time.time()) + 300
+            )
+        )
+
+    # Warm up scanners so that initialization is not measured
+    for name, data in corpus:
+        distribute(name, data)
+
+    recorder.recording = True
+    files = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for name, data in corpus:
+            request_start = time.perf_counter()
+            files += distribute(name, data)
+            recorder.stages["request"].append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+    recorder.recording = False
+
+    size = sum(len(data) for _, data in corpus) * args.repeat
+
+    return {
+        "corpus": str(args.corpus),
+        "requests": len(corpus) * args.repeat,
+        "files": files,
+        "bytes": size,
+        "elapsed": elapsed,
+        "files_per_sec": files / elapsed if elapsed else 0.0,
+        "mb_per_sec": size / 1024 / 1024 / elapsed if elapsed else 0.0,
+        # Kilobytes on Linux
+        "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "stages": {name: summarize(v) for name, v in recorder.stages.items()},
+        "scanners": {name: summarize(v) for name, v in recorder.scanners.items()},
+        "flavors": {name: summarize(v) for name, v in recorder.flavors.items()},
+    }
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{results['requests']} requests, {results['files']} files,"
+        f" {results['bytes'] / 1024 / 1024:.1f} MB in {results['elapsed']:.2f}s"
+    )
+    print(
+        f"{results['files_per_sec']:.1f} files/s, {results['mb_per_sec']:.2f} MB/s,"
+        f" peak RSS {results['peak_rss'] / 1024 / 1024:.1f} MB"
+    )
+
+    for section in ("stages", "scanners", "flavors"):
+        print()
+        print(f"{section:<40} {'count':>7} {'p50':>10} {'p99':>10} {'total':>10}")
+        for name, summary in sorted(
+            results[section].items(), key=lambda item: -item[1]["total"]
+        ):
+            print(
+                f"{name[:40]:<40} {summary['count']:>7} "
+                f"{summary['p50'] * 1000:>8.2f}ms {summary['p99'] * 1000:>8.2f}ms "
+                f"{summary['total']:>9.2f}s"
+            )
+
+
+def compare(old: dict, new: dict, threshold: float) -> list[str]:
+    """Prints changes between two runs and returns the metrics that regressed.
+
+    Throughput regresses when it drops by more than threshold (a fraction),
+    latencies and peak RSS regress when they grow by more than threshold.
+    """
+    regressions = []
+    rows = []
+
+    def check(name: str, before: float, after: float, higher_is_better: bool) -> None:
+        change = (after - before) / before if before else 0.0
+        regressed = change < -threshold if higher_is_better else change > threshold
+        if regressed and not higher_is_better and name.endswith(("p50", "p99")):
+            regressed = after - before >= min_latency_delta
+        if regressed:
+            regressions.append(name)
+        rows.append((name, before, after, change, regressed))
+
+    for metric in ("files_per_sec", "mb_per_sec"):
+        check(metric, old[metric], new[metric], True)
+    check("peak_rss", old["peak_rss"], new["peak_rss"], False)
+
+    for section in ("stages", "scanners", "flavors"):
+        for name in sorted(set(old[section]) & set(new[section])):
+            for q in ("p50", "p99"):
+                check(
+                    f"{section}.{name}.{q}",
+                    old[section][name][q],
+                    new[section][name][q],
+                    False,
+                )
+
+    print(f"{'metric':<56} {'old':>12} {'new':>12} {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        print(
+            f"{name[:56]:<56} {before:>12.6g} {after:>12.6g} {change:>+7.1%}"
+            + (" REGRESSION" if regressed else "")
+        )
+
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="strelka.benchmarks",
+        description="benchmarks backend throughput on a corpus of files",
+    )
+    parser.add_argument("-c", "--backend-cfg", dest="backend_cfg", default="")
+    parser.add_argument(
+        "-p",
+        "--corpus",
+        type=Path,
+        default=fixtures_path,
+        help="file or directory of files to distribute (default: test fixtures)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of times the corpus is distributed (default: 3)",
+    )
+    parser.add_argument(
+        "-o", "--output", default="", help="path that results are saved to as JSON"
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="+",
+        metavar="RESULTS",
+        default=[],
+        help="results to compare with: one file (compared with this run) or two"
+        " files (compared with each other, nothing is run)",
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="fraction that a metric can regress by (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    if len(args.compare) > 2:
+        parser.error("--compare takes one or two results files")
+
+    if len(args.compare) == 2:
+        (old, new) = [json.loads(Path(path).read_text()) for path in args.compare]
+    else:
+        new = run(args)
+        print_results(new)
+        if args.output:
+            Path(args.output).write_text(json.dumps(new, indent=2))
+        if not args.compare:
+            return
+        old = json.loads(Path(args.compare[0]).read_text())
+        print()
+
+    regressions = compare(old, new, args.threshold)
+    if regressions:
+        print(
+            f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}"
+        )
+        sys.exit(1)
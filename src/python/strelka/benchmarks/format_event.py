@@ -0,0 +1,138 @@
+"""Benchmarks format_event on events produced from the largest test fixtures.
+
+Events are produced by distributing each fixture through a local backend,
+then formatted repeatedly with format_event and with the previous
+implementation (format_event_remap). Outputs of both implementations must
+be identical.
+
+Usage:
+    python -m strelka.benchmarks.format_event [-c backend.yaml] [-n 10] [-r 5]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Callable
+
+from boltons import iterutils  # type: ignore
+
+from strelka import strelka
+
+from . import fixtures_path, load_backend_cfg
+
+
+def format_event_remap(metadata: dict) -> str:
+    """Formats an event with two remaps (the implementation prior to prune_event)."""
+
+    def visit(path, key, value):
+        if isinstance(value, (bytes, bytearray)):
+            value = str(value, encoding="UTF-8", errors="replace")
+        return key, value
+
+    remap1 = iterutils.remap(metadata, visit=visit)
+    remap2 = iterutils.remap(
+        remap1,
+        lambda p, k, v: v != "" and v != [] and v != {} and v is not None,
+    )
+    return json.dumps(remap2)
+
+
+def measure(fn: Callable, events: list, repeat: int) -> float:
+    """Returns the fastest time (in seconds) that fn took to format events."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            fn(event)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="strelka.benchmarks.format_event",
+        description="benchmarks format_event on events of the largest test fixtures",
+    )
+    parser.add_argument("-c", "--backend-cfg", dest="backend_cfg", default="")
+    parser.add_argument(
+        "-n",
+        "--fixtures",
+        type=int,
+        default=10,
+        help="number of fixtures to benchmark, largest first (default: 10)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of times each fixture's events are formatted (default: 5)",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    backend = strelka.Backend(
+        load_backend_cfg(args.backend_cfg), disable_coordinator=True
+    )
+
+    fixtures = sorted(
+        (path for path in fixtures_path.iterdir() if path.is_file()),
+        key=lambda path: path.stat().st_size,
+        reverse=True,
+    )[: args.fixtures]
+
+    try:
+        import msgpack  # type: ignore # noqa: F401
+
+        encodings = ["json", "msgpack"]
+    except ImportError:
+        encodings = ["json"]
+
+    print(
+        f"{'fixture':<32} {'events':>6} {'json':>10} {'remap':>10} "
+        f"{'single':>10} {'speedup':>8}"
+        + ("" if len(encodings) == 1 else f" {'msgpack':>10} {'size':>10}")
+    )
+
+    totals = {"remap": 0.0, "single": 0.0}
+    for path in fixtures:
+        events = backend.distribute(
+            str(path),
+            strelka.File(name=path.name, data=path.read_bytes()),
+            int(time.time()) + 300,
+        )
+
+        formatted = [strelka.format_event(event) for event in events]
+        if formatted != [format_event_remap(event) for event in events]:
+            print(f"{path.name}: format_event output differs", file=sys.stderr)
+            sys.exit(1)
+
+        remap = measure(format_event_remap, events, args.repeat)
+        single = measure(strelka.format_event, events, args.repeat)
+        totals["remap"] += remap
+        totals["single"] += single
+
+        line = (
+            f"{path.name[:32]:<32} {len(events):>6} "
+            f"{sum(len(event) for event in formatted):>10} "
+            f"{remap * 1000:>8.2f}ms {single * 1000:>8.2f}ms "
+            f"{remap / single:>7.1f}x"
+        )
+        if "msgpack" in encodings:
+            packed = [strelka.format_event(event, "msgpack") for event in events]
+            line += (
+                f" {measure(lambda e: strelka.format_event(e, 'msgpack'), events, args.repeat) * 1000:>8.2f}ms"
+                f" {sum(len(event) for event in packed):>10}"
+            )
+        print(line)
+
+    print(
+        f"{'total':<32} {'':>6} {'':>10} {totals['remap'] * 1000:>8.2f}ms "
+        f"{totals['single'] * 1000:>8.2f}ms {totals['remap'] / totals['single']:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
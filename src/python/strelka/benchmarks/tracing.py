@@ -0,0 +1,186 @@
+"""Benchmarks the per-file overhead of tracing on small test fixtures.
+
+Fixtures are distributed through a local backend with tracing disabled (no
+tracer provider), sampled (spans are created for every file, a fraction of
+them are recorded), and at full rate (every span is recorded). Recorded
+spans are exported to an exporter that discards them, so the results show
+the cost of creating spans and building their attributes, not the cost of
+sending them to a collector.
+
+Usage:
+    python -m strelka.benchmarks.tracing [-c backend.yaml] [-s 16384] [-r 5]
+        [--scanners ScanHeader,ScanFooter]
+"""
+import argparse
+import logging
+import time
+from typing import Optional, Sequence
+
+from opentelemetry import context, trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    ParentBased,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import Link, SpanKind
+from opentelemetry.util.types import Attributes
+
+from strelka import strelka
+
+from . import fixtures_path, load_backend_cfg
+
+
+class DiscardExporter(SpanExporter):
+    """Drops exported spans."""
+
+    def export(self, spans: Sequence) -> SpanExportResult:
+        return SpanExportResult.SUCCESS
+
+
+class SwitchSampler(Sampler):
+    """Delegates to a sampler that can be replaced between runs.
+
+    The global tracer provider can only be set once per process, so the
+    sampling rate is switched here instead.
+    """
+
+    def __init__(self) -> None:
+        self.sampler: Sampler = ALWAYS_OFF
+
+    def should_sample(
+        self,
+        parent_context: Optional[context.Context],
+        trace_id: int,
+        name: str,
+        kind: Optional[SpanKind] = None,
+        attributes: Attributes = None,
+        links: Optional[Sequence[Link]] = None,
+        trace_state: Optional[trace.TraceState] = None,
+    ) -> SamplingResult:
+        return self.sampler.should_sample(
+            parent_context, trace_id, name, kind, attributes, links, trace_state
+        )
+
+    def get_description(self) -> str:
+        return f"SwitchSampler{{{self.sampler.get_description()}}}"
+
+
+def measure(backend: strelka.Backend, fixtures: list, repeat: int) -> float:
+    """Returns the fastest time (in seconds) taken to distribute the fixtures."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, data in fixtures:
+            backend.distribute(
+                "benchmark",
+                strelka.File(name=name, data=data),
+                int(time.time()) + 300,
+            )
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="strelka.benchmarks.tracing",
+        description="benchmarks the per-file overhead of tracing",
+    )
+    parser.add_argument("-c", "--backend-cfg", dest="backend_cfg", default="")
+    parser.add_argument(
+        "-s",
+        "--max-size",
+        type=int,
+        default=16384,
+        help="size (in bytes) of the largest fixture distributed (default: 16384)",
+    )
+    parser.add_argument(
+        "--scanners",
+        default="",
+        help="comma-separated scanners to keep from the configuration; cheap"
+        " scanners make the overhead easier to see (default: all)",
+    )
+    parser.add_argument(
+        "--sampling",
+        type=float,
+        default=0.1,
+        help="sampling rate of the sampled run (default: 0.1)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of times the fixtures are distributed (default: 5)",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+
+    backend_cfg = load_backend_cfg(args.backend_cfg)
+    if args.scanners:
+        keep = args.scanners.split(",")
+        backend_cfg["scanners"] = {
+            name: mappings
+            for name, mappings in backend_cfg["scanners"].items()
+            if name in keep
+        }
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+
+    fixtures = [
+        (path.name, path.read_bytes())
+        for path in sorted(fixtures_path.iterdir())
+        if path.is_file() and 0 < path.stat().st_size <= args.max_size
+    ]
+
+    # Warm up scanners so that initialization is not measured
+    measure(backend, fixtures, 1)
+    files = sum(
+        len(
+            backend.distribute(
+                "benchmark", strelka.File(name=name, data=data), int(time.time()) + 300
+            )
+        )
+        for name, data in fixtures
+    )
+
+    results = [("disabled", measure(backend, fixtures, args.repeat))]
+
+    # Spans created by the backend and scanners go through the global provider
+    sampler = SwitchSampler()
+    provider = TracerProvider(sampler=ParentBased(sampler))
+    provider.add_span_processor(BatchSpanProcessor(DiscardExporter()))
+    trace.set_tracer_provider(provider)
+    backend.tracer = trace.get_tracer(strelka.__name__)
+
+    sampler.sampler = TraceIdRatioBased(args.sampling)
+    results.append(
+        (f"sampled ({args.sampling:g})", measure(backend, fixtures, args.repeat))
+    )
+
+    sampler.sampler = TraceIdRatioBased(1.0)
+    results.append(("full (1.0)", measure(backend, fixtures, args.repeat)))
+
+    provider.shutdown()
+
+    print(f"{len(fixtures)} fixtures (<= {args.max_size} bytes), {files} files")
+    print(f"{'tracing':<16} {'total':>10} {'per file':>10} {'overhead':>10}")
+    (_, disabled) = results[0]
+    for mode, elapsed in results:
+        print(
+            f"{mode:<16} {elapsed * 1000:>8.2f}ms "
+            f"{elapsed / files * 1e6:>8.1f}us "
+            f"{(elapsed - disabled) / files * 1e6:>8.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import resource
+import time
+from typing import Optional
+
+# Scanners that are skipped on degraded files (CPU-heavy external tools)
+default_expensive = [
+    "ScanCapa",
+    "ScanFloss",
+    "ScanOcr",
+]
+
+
+def cpu_time() -> float:
+    """Returns the CPU time (in seconds) used by the process and its children.
+
+    Children (e.g. external tools run by scanners) are counted once they
+    exit; isolated scanners' helper processes are not counted.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class RequestBudget(object):
+    """Bounds the work done across a request's extraction tree.
+
+    Each file that is scanned is charged to the request's budget (CPU time,
+    bytes of data, and files). When the remaining fraction of the budget
+    drops to the reserve, extracted files from scanners at or below the
+    priority threshold are degraded: expensive scanners are skipped and the
+    file is flagged with "budget_degraded". Once the budget is spent, every
+    extracted file is degraded. Files are never dropped, so results stay
+    complete but get cheaper.
+
+    Attributes:
+        cpu: CPU time (in seconds) that a request can use.
+        bytes: Amount of file data (in bytes) that a request can scan.
+        files: Number of files that a request can scan.
+        reserve: Fraction of the budget left at which files are degraded.
+        priority: Extracted files from scanners at or below this priority
+            are degraded when the budget runs low.
+        expensive: List of scanners that are skipped on degraded files.
+        used: Dictionary of the amount of each limit used by the request.
+    """
+
+    def __init__(self, budget_cfg: dict) -> None:
+        self.cpu: float = budget_cfg.get("cpu", 0)
+        self.bytes: int = budget_cfg.get("bytes", 0)
+        self.files: int = budget_cfg.get("files", 0)
+        self.reserve: float = budget_cfg.get("reserve", 0.25)
+        self.priority: int = budget_cfg.get("priority", 5)
+        expensive = budget_cfg.get("expensive")
+        self.expensive: list = default_expensive if expensive is None else expensive
+        self.used: dict = {}
+        self.started: float = 0.0
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets the budget (when a request is distributed)."""
+        self.used = {"bytes": 0, "files": 0}
+        self.started = cpu_time()
+
+    def charge(self, size: int) -> None:
+        """Charges a scanned file and its data to the budget."""
+        self.used["bytes"] += size
+        self.used["files"] += 1
+
+    def remaining(self) -> float:
+        """Returns the fraction of the budget left (the lowest of its limits)."""
+        fractions = [1.0]
+        if self.cpu:
+            fractions.append(1 - (cpu_time() - self.started) / self.cpu)
+        if self.bytes:
+            fractions.append(1 - self.used["bytes"] / self.bytes)
+        if self.files:
+            fractions.append(1 - self.used["files"] / self.files)
+        return min(fractions)
+
+    def degrades(self, depth: int, priority: int) -> bool:
+        """Returns True if expensive scanners should be skipped on a file.
+
+        Args:
+            depth: Depth of the file, the request's file is never degraded.
+            priority: Priority of the scanner that extracted the file.
+        """
+        if depth == 0:
+            return False
+        remaining = self.remaining()
+        if remaining <= 0:
+            return True
+        return remaining <= self.reserve and priority <= self.priority
+
+
+def get_request_budget(budget_cfg: dict) -> Optional[RequestBudget]:
+    """Returns a RequestBudget or None if no budget limit is set."""
+    if not any(budget_cfg.get(key) for key in ("cpu", "bytes", "files")):
+        return None
+    return RequestBudget(budget_cfg)
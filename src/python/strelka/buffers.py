@@ -0,0 +1,243 @@
+import collections
+import contextvars
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from typing import Optional, Union
+
+# Number of times each bytes method copied spilled data (see MappedData)
+copies: collections.Counter = collections.Counter()
+
+
+class MappedData(mmap.mmap):
+    """Read-only memory map of file data that was spilled to disk.
+
+    Maps behave like bytes: indexing, slicing, searching (find, in, regular
+    expressions), comparisons, and the buffer protocol (hashlib, YARA,
+    memoryview) read the map without copying it, and decode reads it into
+    a str without an intermediate bytes copy. Other bytes methods (e.g.
+    split or splitlines) are called on a copy of the data, which is counted
+    in copies and logged.
+
+    Attributes:
+        path: Path of the file that the data is mapped from, scanners that
+            pass files to external tools can use it instead of writing the
+            data to a temporary file.
+    """
+
+    path: str
+
+    def __contains__(self, value) -> bool:
+        if isinstance(value, int):
+            return self.find(bytes([value])) != -1
+        return self.find(value) != -1
+
+    def __eq__(self, other) -> bool:
+        try:
+            return memoryview(self) == other
+        except TypeError:
+            return NotImplemented
+
+    def __ne__(self, other) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None  # type: ignore
+
+    def __iter__(self):
+        # Same as bytes, iterating yields integers
+        return iter(memoryview(self))
+
+    def __add__(self, other) -> bytes:
+        return self[:] + other
+
+    def __radd__(self, other) -> bytes:
+        return other + self[:]
+
+    def __bytes__(self) -> bytes:
+        return self[:]
+
+    def startswith(self, prefix, start: int = 0, end: Optional[int] = None) -> bool:
+        prefixes = prefix if isinstance(prefix, tuple) else (prefix,)
+        return any(self[start:end][: len(p)] == p for p in prefixes)
+
+    def endswith(self, suffix, start: int = 0, end: Optional[int] = None) -> bool:
+        suffixes = suffix if isinstance(suffix, tuple) else (suffix,)
+        view = memoryview(self)[start:end]
+        return any(
+            len(view) >= len(s) and view[len(view) - len(s) :] == s for s in suffixes
+        )
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        with memoryview(self) as view:
+            return str(view, encoding, errors)
+
+    def __getattr__(self, name: str):
+        if name.startswith("__") or not hasattr(bytes, name):
+            raise AttributeError(name)
+        copies[name] += 1
+        logging.debug(f"copying {len(self)} bytes of spilled data {self.path} ({name})")
+        return getattr(self[:], name)
+
+    def release(self) -> None:
+        """Unmaps the data and deletes the file."""
+        try:
+            self.close()
+        except BufferError:
+            # Views of the data are still held, the map is closed when collected
+            logging.debug(f"views of spilled data {self.path} are still held")
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class FileBuffer(object):
+    """Assembles file data in memory and spills it to disk past a threshold.
+
+    Data is written in chunks (e.g. as it is retrieved from the coordinator).
+    Data that stays under the threshold is joined into bytes; larger data is
+    written to a file in the spill directory and memory-mapped, so it does
+    not count against the worker's memory.
+
+    Attributes:
+        threshold: Size (in bytes) past which data is spilled to disk.
+        directory: Directory that data is spilled to.
+        chunks: List of chunks held in memory (before data is spilled).
+        size: Amount of data (in bytes) written.
+    """
+
+    def __init__(self, threshold: int, directory: str = "") -> None:
+        self.threshold: int = threshold
+        self.directory: str = directory or tempfile.gettempdir()
+        self.chunks: list[bytes] = []
+        self.size: int = 0
+        self.spill: Optional[tempfile._TemporaryFileWrapper] = None
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.spill is not None:
+            self.spill.write(chunk)
+            return
+
+        self.chunks.append(chunk)
+        if self.size > self.threshold:
+            self.spill = tempfile.NamedTemporaryFile(
+                dir=self.directory, prefix="strelka-", delete=False
+            )
+            self.spill.writelines(self.chunks)
+            self.chunks = []
+
+    def getvalue(self) -> Union[bytes, MappedData]:
+        """Returns the data as bytes or, if it was spilled, a MappedData."""
+        if self.spill is None:
+            data = b"".join(self.chunks)
+            self.chunks = []
+            return data
+
+        try:
+            self.spill.flush()
+            data = MappedData(self.spill.fileno(), 0, access=mmap.ACCESS_READ)
+            data.path = self.spill.name
+            return data
+        except Exception:
+            os.unlink(self.spill.name)
+            raise
+        finally:
+            # The map keeps the data available after the file is closed
+            self.spill.close()
+            self.spill = None
+
+    def close(self) -> None:
+        """Discards the data."""
+        self.chunks = []
+        if self.spill is not None:
+            self.spill.close()
+            os.unlink(self.spill.name)
+            self.spill = None
+
+
+def release_data(data) -> None:
+    """Releases file data that was spilled to disk, other data is left as is."""
+    if isinstance(data, MappedData):
+        data.release()
+
+
+class DataFile(object):
+    """File on disk that contains a file's data, shared by the file's scanners.
+
+    The data is written the first time a scanner acquires the file and the
+    file is deleted once it is closed (when the file's scanners finish) and
+    every scanner that acquired it released it. Data that was spilled to disk
+    (see MappedData) is not written again, its spill file is used instead.
+
+    Attributes:
+        data: Data of the file.
+        directory: Directory that the data is written to.
+        path: Path of the file, empty until the file is first acquired.
+        references: Number of scanners that hold the file.
+        closed: Boolean that is set when the file's scanners finish.
+    """
+
+    def __init__(self, data, directory: str = "") -> None:
+        self.data = data
+        self.directory: str = directory or tempfile.gettempdir()
+        self.path: str = ""
+        self.references: int = 0
+        self.closed: bool = False
+        # Scanners can run concurrently (see Backend.run_scanners_concurrently)
+        self.lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> str:
+        """Returns the path of the file, writing the data on first use."""
+        with self.lock:
+            if self.closed:
+                raise ValueError("data file is closed")
+            if not self.path:
+                if isinstance(self.data, MappedData):
+                    self.path = self.data.path
+                else:
+                    self.path = self.write()
+            self.references += 1
+            return self.path
+
+    def write(self) -> str:
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory, prefix="strelka-", delete=False
+        ) as f:
+            try:
+                f.write(self.data)
+            except BaseException:
+                os.unlink(f.name)
+                raise
+        return f.name
+
+    def release(self) -> None:
+        with self.lock:
+            self.references -= 1
+            self.cleanup()
+
+    def close(self) -> None:
+        with self.lock:
+            self.closed = True
+            self.cleanup()
+
+    def cleanup(self) -> None:
+        if not self.closed or self.references > 0:
+            return
+        # Spill files are deleted with their data (see release_data)
+        if self.path and not isinstance(self.data, MappedData):
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        self.path = ""
+        self.data = None
+
+
+# Data file of the file whose scanners are running (see Scanner.data_file)
+current_data_file: contextvars.ContextVar[Optional[DataFile]] = contextvars.ContextVar(
+    "current_data_file", default=None
+)
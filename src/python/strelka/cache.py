@@ -0,0 +1,302 @@
+import abc
+import collections
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Optional
+
+import redis
+
+# Scanners whose results depend on more than the file's data (e.g. the time
+# spent scanning, the current time, or the state of an external service)
+default_exclude = [
+    "ScanCuckoo",
+    "ScanDelay",
+    "ScanFalconSandbox",
+    "ScanX509",
+]
+
+
+def encode_entry(entry: dict) -> str:
+    """Dumps a cache entry as JSON.
+
+    Bytes are replaced with strings the same way format_event replaces them,
+    so replayed events are identical to the events produced by scanners.
+    """
+
+    def default(value):
+        if isinstance(value, (bytes, bytearray)):
+            return str(value, encoding="UTF-8", errors="replace")
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+    return json.dumps(entry, default=default)
+
+
+class ResultCache(abc.ABC):
+    """Stores scan results by file content.
+
+    File entries are keyed by the file's SHA-256 and the scanner assignment
+    inputs (name, source, and external flavors) under a namespace derived
+    from the backend configuration. Each entry contains the file's flavors,
+    assigned scanners, size, scan event, and the keys of the files extracted
+    from it; entries for extracted files are stored separately, so a file's
+    results can only be replayed when the results of every file extracted
+    from it (down to limits.max_depth) are also cached.
+
+    Scanner entries contain the event of a single scanner and are keyed by
+    the inputs of that scanner (see Scanner.cache_key), so they remain valid
+    when other scanners or their options change.
+
+    Attributes:
+        namespace: String prefixed to every key.
+        ttl: Amount of time (in seconds) that entries are kept.
+        max_entries: Maximum number of entries kept.
+        exclude: List of scanners that prevent a file's results from being
+            stored.
+        hits: Number of lookups that returned an entry.
+        misses: Number of lookups that did not return an entry.
+        stores: Number of entries stored.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = 86400,
+        max_entries: int = 100000,
+        exclude: Optional[list] = None,
+    ) -> None:
+        self.namespace: str = namespace
+        self.ttl: int = ttl
+        self.max_entries: int = max_entries
+        self.exclude: list = default_exclude if exclude is None else exclude
+        self.hits: int = 0
+        self.misses: int = 0
+        self.stores: int = 0
+
+    def key(self, *parts) -> str:
+        """Returns the cache key for a list of inputs.
+
+        Args:
+            parts: JSON serializable values that the cached results depend on
+                (e.g. the SHA-256 of the file's data).
+        Returns:
+            String that contains the cache key.
+        """
+        h = hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode())
+        return f"{self.namespace}:{h.hexdigest()}"
+
+    @abc.abstractmethod
+    def get_many(self, keys: list) -> list:
+        """Returns the entries stored for keys (None for missing keys)."""
+
+    @abc.abstractmethod
+    def put(self, key: str, entry: dict) -> None:
+        """Stores an entry."""
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the entry stored for key, errors are logged and ignored."""
+        try:
+            (entry,) = self.get_many([key])
+        except Exception:
+            logging.exception("failed to read from result cache")
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return entry
+
+    def resolve(self, key: str, depth: int, max_depth: int) -> Optional[dict]:
+        """Returns a cached entry with the entries of its extracted files.
+
+        Entries are fetched one level at a time; each child in an entry's
+        "children" list is given an "entry" holding the child's entry.
+        Children deeper than max_depth are not resolved, they would not
+        be distributed.
+
+        Args:
+            key: Cache key of the file.
+            depth: Depth of the file.
+            max_depth: Maximum depth that extracted files are distributed.
+        Returns:
+            Dictionary containing the entry or None if the entry, or an entry
+            for any extracted file, is missing.
+        """
+        try:
+            (root,) = self.get_many([key])
+            level = [(root, depth)] if root is not None else []
+
+            while level:
+                children = [
+                    (child, child_depth + 1)
+                    for (entry, child_depth) in level
+                    for child in entry.get("children", [])
+                    if child_depth + 1 <= max_depth
+                ]
+                if not children:
+                    break
+
+                entries = self.get_many([child["key"] for (child, _) in children])
+                if any(entry is None for entry in entries):
+                    root = None
+                    break
+
+                for (child, _), entry in zip(children, entries):
+                    child["entry"] = entry
+
+                level = [
+                    (entry, child_depth)
+                    for (_, child_depth), entry in zip(children, entries)
+                ]
+
+        except Exception:
+            logging.exception("failed to read from result cache")
+            root = None
+
+        if root is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return root
+
+    def store(self, key: str, entry: dict) -> None:
+        """Stores an entry, errors are logged and ignored."""
+        try:
+            self.put(key, entry)
+            self.stores += 1
+        except Exception:
+            logging.exception("failed to write to result cache")
+
+
+class LocalResultCache(ResultCache):
+    """Stores scan results in process memory (least recently used eviction)."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.entries: collections.OrderedDict = collections.OrderedDict()
+        # Scanner entries are read and written from scanner threads
+        self.lock: threading.Lock = threading.Lock()
+
+    def get_many(self, keys: list) -> list:
+        now = time.monotonic()
+        values = []
+
+        with self.lock:
+            for key in keys:
+                (expire_at, value) = self.entries.get(key, (0.0, None))
+                if value is not None and expire_at <= now:
+                    del self.entries[key]
+                    value = None
+                if value is not None:
+                    self.entries.move_to_end(key)
+                values.append(value)
+
+        return [json.loads(value) if value is not None else None for value in values]
+
+    def put(self, key: str, entry: dict) -> None:
+        value = encode_entry(entry)
+
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class RedisResultCache(ResultCache):
+    """Stores scan results in Redis (the coordinator).
+
+    Entries expire after ttl; when more than max_entries are stored, the
+    oldest entries are deleted. Stored entries are tracked in a sorted set
+    scored by the time that they were stored.
+    """
+
+    def __init__(self, client: redis.StrictRedis, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.client: redis.StrictRedis = client
+        self.index: str = "result:index"
+
+    def get_many(self, keys: list) -> list:
+        p = self.client.pipeline(transaction=False)
+        for key in keys:
+            p.get(key)
+
+        return [json.loads(value) if value else None for value in p.execute()]
+
+    def put(self, key: str, entry: dict) -> None:
+        now = time.time()
+
+        p = self.client.pipeline(transaction=False)
+        p.set(key, encode_entry(entry), ex=self.ttl)
+        p.zadd(self.index, {key: now})
+        p.zremrangebyscore(self.index, "-inf", now - self.ttl)
+        p.zcard(self.index)
+        count = p.execute()[-1]
+
+        if count > self.max_entries:
+            evicted = self.client.zpopmin(self.index, count - self.max_entries)
+            if evicted:
+                p = self.client.pipeline(transaction=False)
+                for member, _ in evicted:
+                    p.delete(member)
+                p.execute()
+
+
+def get_result_cache(
+    backend_cfg: dict,
+    coordinator: Optional[redis.StrictRedis] = None,
+    scope: str = "file",
+) -> Optional[ResultCache]:
+    """Returns the result cache described by caching.results.
+
+    Args:
+        backend_cfg: Dictionary that contains the parsed backend configuration.
+        coordinator: Redis client connection to the coordinator.
+        scope: String that describes which results are cached, "file" for
+            the results of all scanners assigned to a file or "scanner" for
+            the results of individual scanners.
+    Returns:
+        ResultCache object or None if result caching is disabled.
+    """
+    results_cfg = backend_cfg.get("caching", {}).get("results", {})
+
+    if scope == "scanner":
+        if not results_cfg.get("scanners", False):
+            return None
+
+        # Scanner keys contain everything that scanner results depend on
+        namespace = "result:scanner"
+    else:
+        if not results_cfg.get("enabled", False):
+            return None
+
+        # Configurations that were not loaded by BackendConfig are not hashed
+        sha1 = backend_cfg.get("sha1")
+        if not sha1:
+            sha1 = hashlib.sha1(
+                json.dumps(backend_cfg, sort_keys=True, default=str).encode()
+            ).hexdigest()
+
+        namespace = f"result:{sha1}"
+
+    if results_cfg.get("version"):
+        namespace = f"{namespace}:{results_cfg['version']}"
+
+    kwargs = {
+        "ttl": results_cfg.get("ttl", 86400),
+        "max_entries": results_cfg.get("max_entries", 100000),
+        "exclude": results_cfg.get("exclude"),
+    }
+
+    if results_cfg.get("backend", "coordinator") == "coordinator" and coordinator:
+        logging.info(f"caching {scope} results in coordinator")
+        return RedisResultCache(coordinator, namespace, **kwargs)
+
+    logging.info(f"caching {scope} results in memory")
+    return LocalResultCache(namespace, **kwargs)
@@ -0,0 +1,176 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import redis
+import redis.asyncio
+
+
+class AsyncCoordinator(object):
+    """Sends commands to the coordinator from an asyncio event loop.
+
+    The event loop runs on a background thread, so pushing events and
+    uploading extracted files overlaps with scanning instead of blocking it.
+    Submissions are sent by a single writer in the order they are submitted;
+    submissions queued while a pipeline is in flight are sent together in
+    the next pipeline. Because submissions are ordered, data uploaded by one
+    submission can be read by a later submission without waiting for the
+    upload to complete.
+
+    Commands are tuples of a Redis command method name and its arguments,
+    e.g. ("rpush", "event:<id>", "FIN").
+
+    Threads do not survive os.fork, so a process that submits commands to a
+    coordinator created by its parent (e.g. a worker forked by Supervisor)
+    starts its own event loop, I/O thread, and connection first; submissions
+    that the parent had not completed are not sent by the child.
+
+    Attributes:
+        client: asyncio Redis client connection to the coordinator.
+        loop: Event loop that runs on the I/O thread.
+        pid: Process ID of the process that the I/O thread runs in.
+        pending: Set of futures of submissions that have not completed.
+        metrics: Backend metrics, pipeline round trips are observed as the
+            "pipeline" operation.
+    """
+
+    def __init__(self, coordinator: redis.StrictRedis) -> None:
+        self.kwargs: dict = coordinator.connection_pool.connection_kwargs
+        self.metrics = None
+        # Serializes starting the event loop in a forked process
+        self.starting = threading.Lock()
+        self.start()
+
+    def start(self) -> None:
+        """Starts the event loop and I/O thread in the current process."""
+        self.client = redis.asyncio.StrictRedis(
+            host=self.kwargs.get("host", "localhost"),
+            port=self.kwargs.get("port", 6379),
+            db=self.kwargs.get("db", 0),
+            username=self.kwargs.get("username"),
+            password=self.kwargs.get("password"),
+        )
+        self.loop = asyncio.new_event_loop()
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: set = set()
+        self.lock = threading.Lock()
+        self.pid: int = os.getpid()
+
+        started = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, args=(started,), name="coordinator", daemon=True
+        )
+        self.thread.start()
+        started.wait()
+
+    def run(self, started: threading.Event) -> None:
+        """Runs the event loop (on the I/O thread)."""
+        asyncio.set_event_loop(self.loop)
+        self.queue = asyncio.Queue()
+        self.writer = self.loop.create_task(self.write())
+        started.set()
+        self.loop.run_forever()
+
+    async def write(self) -> None:
+        """Sends queued submissions to the coordinator in order."""
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            pipeline = self.client.pipeline(transaction=False)
+            for commands, _ in batch:
+                for name, *args in commands:
+                    getattr(pipeline, name)(*args)
+
+            start = time.monotonic()
+            try:
+                results = await pipeline.execute(raise_on_error=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            if self.metrics:
+                self.metrics.coordinator_latency.observe(
+                    time.monotonic() - start, operation="pipeline"
+                )
+
+            for commands, future in batch:
+                replies = results[: len(commands)]
+                results = results[len(commands) :]
+
+                errors = [reply for reply in replies if isinstance(reply, Exception)]
+                if errors:
+                    future.set_exception(errors[0])
+                else:
+                    future.set_result(replies)
+
+    def submit(self, commands: list) -> concurrent.futures.Future:
+        """Queues commands to be sent to the coordinator.
+
+        Args:
+            commands: List of command tuples.
+        Returns:
+            Future that contains the list of replies to the commands.
+        """
+        if self.pid != os.getpid():
+            with self.starting:
+                if self.pid != os.getpid():
+                    self.start()
+
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self.done)
+
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (commands, future))
+
+        return future
+
+    def send(self, commands: list) -> None:
+        """Queues commands to be sent to the coordinator, errors are logged."""
+        self.submit(commands).add_done_callback(self.log_failure)
+
+    def done(self, future: concurrent.futures.Future) -> None:
+        with self.lock:
+            self.pending.discard(future)
+
+    @staticmethod
+    def log_failure(future: concurrent.futures.Future) -> None:
+        if future.exception() is not None:
+            logging.error(f"failed to send to coordinator: {future.exception()}")
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Waits for every queued submission to complete."""
+        if self.pid != os.getpid():
+            return
+        with self.lock:
+            pending = list(self.pending)
+        concurrent.futures.wait(pending, timeout=timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Sends queued submissions and stops the event loop."""
+        if self.pid != os.getpid() or not self.thread.is_alive():
+            return
+        self.flush(timeout)
+        try:
+            asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result(timeout)
+        except Exception:
+            logging.exception("failed to close coordinator connection")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+        if not self.thread.is_alive():
+            self.loop.close()
+
+    async def shutdown(self) -> None:
+        """Stops the writer and closes the connection (on the I/O thread)."""
+        self.writer.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.writer
+        await self.client.close()
@@ -0,0 +1,119 @@
+import contextlib
+import contextvars
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Iterator, Optional
+
+
+class Deadlines(object):
+    """Enforces nested deadlines (request, distribution, and scanner).
+
+    Deadlines are pushed when a budget starts and popped when the work it
+    covers completes; they are stored in a context variable, so threads
+    that run with a copy of the caller's context (e.g. scanners on the
+    scanner pool) inherit the caller's deadlines.
+
+    On the main thread, the tightest deadline is enforced with a single
+    interval timer (ITIMER_REAL). When the timer fires, the exception of
+    the outermost expired deadline is raised, so an expired request is never
+    reported as an expired scanner. Popping a deadline re-arms the timer for
+    the deadlines that remain, so inner deadlines cannot cancel outer ones;
+    if an outer deadline passed in the meantime (e.g. its exception was
+    handled by a scanner), its exception is raised when the inner deadline
+    is popped.
+
+    Off the main thread, deadlines are tracked but cannot be enforced with
+    signals; callers bound their work with remaining() instead (e.g. as the
+    timeout of a future or a subprocess).
+
+    Attributes:
+        grace: Amount of time (in seconds) after which the exception of an
+            expired deadline is raised again if the code that it interrupted
+            handled it (e.g. with "except Exception").
+    """
+
+    def __init__(self, grace: float = 1.0) -> None:
+        self.grace: float = grace
+        self.stack: contextvars.ContextVar[tuple] = contextvars.ContextVar(
+            "deadlines", default=()
+        )
+
+    def push(self, seconds: float, exception: type) -> contextvars.Token:
+        """Starts a deadline.
+
+        Args:
+            seconds: Amount of time (in seconds) until the deadline.
+            exception: Exception raised when the deadline passes.
+        Returns:
+            Token that is passed to pop when the deadline ends.
+        Raises:
+            Exception of the outermost deadline that has passed, if any.
+        """
+        token = self.stack.set(
+            self.stack.get() + ((time.monotonic() + seconds, exception),)
+        )
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGALRM, self.handler)
+            try:
+                self.arm()
+            except BaseException:
+                # An outer deadline has passed, the deadline is not started
+                self.stack.reset(token)
+                raise
+        return token
+
+    def pop(self, token: contextvars.Token) -> None:
+        """Ends the deadline started with token (and any deadline inside it).
+
+        Raises:
+            Exception of the outermost remaining deadline that has passed.
+        """
+        self.stack.reset(token)
+        if threading.current_thread() is threading.main_thread():
+            self.arm()
+
+    @contextlib.contextmanager
+    def enter(self, seconds: float, exception: type) -> Iterator[None]:
+        """Context manager that pushes and pops a deadline."""
+        token = self.push(seconds, exception)
+        try:
+            yield
+        finally:
+            self.pop(token)
+
+    def remaining(self) -> Optional[float]:
+        """Returns the time (in seconds) until the tightest deadline or None."""
+        stack = self.stack.get()
+        if not stack:
+            return None
+        return max(min(expires_at for expires_at, _ in stack) - time.monotonic(), 0.0)
+
+    def arm(self) -> None:
+        """Sets the interval timer for the tightest deadline.
+
+        Raises:
+            Exception of the outermost deadline that has passed, if any.
+        """
+        stack = self.stack.get()
+        if not stack:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            return
+
+        now = time.monotonic()
+        for expires_at, exception in stack:
+            if expires_at <= now:
+                signal.setitimer(signal.ITIMER_REAL, self.grace)
+                raise exception
+
+        signal.setitimer(
+            signal.ITIMER_REAL, min(expires_at for expires_at, _ in stack) - now
+        )
+
+    def handler(self, signal_number: int, frame: Optional[FrameType]) -> None:
+        """Raises the exception of the outermost deadline that has passed."""
+        self.arm()
+
+
+deadlines = Deadlines()
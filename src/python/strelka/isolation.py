@@ -0,0 +1,359 @@
+import importlib
+import logging
+import math
+import multiprocessing
+import multiprocessing.connection
+import queue
+import resource
+import threading
+import traceback
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import inflection
+
+
+class ScannerCrashed(Exception):
+    """Raised when the helper process running a scanner exits or hangs."""
+
+
+class IsolatedException(Exception):
+    """Unhandled exception raised by a scanner in a helper process.
+
+    The message contains the traceback from the helper process.
+    """
+
+
+def serve(
+    connection: multiprocessing.connection.Connection,
+    backend_cfg: dict,
+    memory: int,
+    cpu: int,
+    level: int,
+) -> None:
+    """Runs scanners for an IsolationPool (in the helper process).
+
+    Requests are tuples of the scanner name, the name and size of the shared
+    memory segment that holds the file data, the file, options, expire_at,
+    and the amount of time (in seconds) that the scanner can run. Replies
+    are tuples of the scanner's event, flags, extracted files (as tuples of
+    data, name, and external flavors), and error (see IsolationPool.scan).
+
+    File data is copied out of shared memory once per request, since scanners
+    expect bytes (e.g. for decode and find) and may keep references to the
+    data (e.g. in extracted files) that must outlive the segment's contents.
+    """
+    # Imported here, strelka.strelka imports this module
+    from .deadlines import deadlines
+    from .strelka import ScannerException, ScannerTimeout
+
+    logging.basicConfig(level=level)
+
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    (_, cpu_hard) = resource.getrlimit(resource.RLIMIT_CPU)
+
+    plugins: dict = {}
+    buffer: Optional[shared_memory.SharedMemory] = None
+
+    while True:
+        try:
+            request = connection.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if request is None:
+            break
+
+        (name, buffer_name, size, file, options, expire_at, timeout) = request
+
+        if buffer is None or buffer.name != buffer_name:
+            if buffer is not None:
+                buffer.close()
+            # Helpers share the parent's resource tracker, the parent unlinks
+            buffer = shared_memory.SharedMemory(name=buffer_name)
+        data = bytes(buffer.buf[:size])
+
+        event: dict = {}
+        flags: list = []
+        files: list = []
+        error: Optional[Tuple[str, str]] = None
+
+        try:
+            if name not in plugins:
+                module = importlib.import_module(
+                    f"strelka.scanners.{inflection.underscore(name)}"
+                )
+                plugin = getattr(module, name)(backend_cfg)
+                # Extracted files are hashed when they are emitted by the backend
+                plugin.hash_files = False
+                plugins[name] = plugin
+            plugin = plugins[name]
+
+            plugin.event = event
+            plugin.files = files
+            plugin.flags = flags
+            plugin.expire_at = expire_at
+            plugin.scanner_timeout = timeout
+
+            # RLIMIT_CPU counts the helper's lifetime, so it is raised per scan
+            if cpu:
+                usage = resource.getrusage(resource.RUSAGE_SELF)
+                soft = math.ceil(usage.ru_utime + usage.ru_stime) + cpu
+                if cpu_hard != resource.RLIM_INFINITY:
+                    soft = min(soft, cpu_hard)
+                resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard))
+
+            deadline = deadlines.push(timeout, ScannerTimeout)
+            try:
+                plugin.scan(data, file, options, expire_at)
+            finally:
+                deadlines.pop(deadline)
+
+            event = plugin.event
+        except ScannerTimeout:
+            error = ("timed_out", "")
+        except ScannerException as e:
+            error = ("exception", e.message)
+        except Exception as e:
+            error = ("uncaught", "".join(traceback.format_exception(e, limit=-10)))
+
+        del data
+
+        connection.send(
+            (
+                event,
+                flags,
+                [(f.data, f.name, f.flavors.get("external", [])) for f in files],
+                error,
+            )
+        )
+
+    if buffer is not None:
+        buffer.close()
+
+
+class Helper(object):
+    """Long-lived process that runs scanners for an IsolationPool.
+
+    Attributes:
+        process: Helper process (None until the helper is started).
+        connection: Parent end of the pipe to the helper process.
+        buffer: Shared memory segment that file data is written to.
+    """
+
+    def __init__(self, pool: "IsolationPool") -> None:
+        self.pool = pool
+        self.process: Optional[multiprocessing.process.BaseProcess] = None
+        self.connection: Optional[multiprocessing.connection.Connection] = None
+        self.buffer: Optional[shared_memory.SharedMemory] = None
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> None:
+        (parent, child) = self.pool.context.Pipe()
+        self.process = self.pool.context.Process(
+            target=serve,
+            args=(
+                child,
+                self.pool.backend_cfg,
+                self.pool.memory,
+                self.pool.cpu,
+                logging.getLogger().level,
+            ),
+            name="strelka-isolation",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        self.connection = parent
+
+    def write(self, data: bytes) -> None:
+        """Copies data into the shared memory segment.
+
+        The segment is reused while it fits the data without being much
+        larger than it.
+        """
+        size = max(len(data), 1)
+        if self.buffer is None or not (
+            size <= self.buffer.size <= max(size * 4, 1024 * 1024)
+        ):
+            self.release()
+            self.buffer = shared_memory.SharedMemory(
+                create=True, size=max(size, 1024 * 1024)
+            )
+        self.buffer.buf[: len(data)] = data
+
+    def release(self) -> None:
+        """Unlinks the shared memory segment."""
+        if self.buffer is not None:
+            self.buffer.close()
+            try:
+                self.buffer.unlink()
+            except FileNotFoundError:
+                # Helpers that fail to map the segment unlink it
+                pass
+            self.buffer = None
+
+    def kill(self, wait: float = 0.0) -> Optional[int]:
+        """Kills the helper process and returns its exit code.
+
+        Args:
+            wait: Amount of time (in seconds) that the helper process is given
+                to exit on its own before it is killed.
+        """
+        if self.process is None:
+            return None
+        self.process.join(wait)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+        self.release()
+        exitcode = self.process.exitcode
+        self.process = None
+        self.connection = None
+        return exitcode
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stops the helper process and unlinks the shared memory segment."""
+        if self.process is not None:
+            try:
+                self.connection.send(None)
+                self.process.join(timeout)
+            except Exception:
+                pass
+            self.kill()
+        self.release()
+
+
+class IsolationPool(object):
+    """Runs scanners in long-lived helper processes.
+
+    Scanners are isolated per mapping with the option isolation: process.
+    Isolated scanners run in a pool of helper processes that are started
+    once and reused, so a scanner that crashes, leaks memory, or hangs in
+    native code takes down its helper instead of the worker. Helpers run
+    with an address space limit (RLIMIT_AS) and a per-scan CPU limit
+    (RLIMIT_CPU); a helper that exits or does not reply within its scanner's
+    deadline is killed and only that helper is restarted.
+
+    File data is handed to helpers through shared memory instead of being
+    pickled; extracted files are returned to the backend, which emits them
+    the same way as files extracted in the worker.
+
+    Attributes:
+        backend_cfg: Dictionary that contains the parsed backend configuration.
+        processes: Number of helper processes.
+        memory: Address space limit (in bytes) of helper processes.
+        cpu: Amount of CPU time (in seconds) that a helper can spend on a scan.
+        grace: Amount of time (in seconds) that a helper can take to reply
+            after its scanner's deadline before it is killed.
+        restarts: Number of helpers restarted after they crashed or hung.
+        lock: Lock that guards restarts, scans run on multiple scanner threads.
+    """
+
+    def __init__(self, backend_cfg: dict) -> None:
+        isolation_cfg = backend_cfg.get("isolation") or {}
+        self.backend_cfg: dict = backend_cfg
+        self.processes: int = max(isolation_cfg.get("processes", 1), 1)
+        self.memory: int = isolation_cfg.get("memory", 0)
+        self.cpu: int = isolation_cfg.get("cpu", 0)
+        self.grace: float = isolation_cfg.get("grace", 0.5)
+        self.restarts: int = 0
+        self.lock = threading.Lock()
+        self.context = multiprocessing.get_context("spawn")
+        self.helpers: list[Helper] = [Helper(self) for _ in range(self.processes)]
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+        for helper in self.helpers:
+            self.idle.put(helper)
+
+    def start(self) -> None:
+        """Starts helper processes that are not running."""
+        for helper in self.helpers:
+            if not helper.alive():
+                helper.start()
+
+    def restarted(self) -> None:
+        """Counts a helper that was killed to be restarted."""
+        with self.lock:
+            self.restarts += 1
+
+    def scan(
+        self,
+        name: str,
+        data: bytes,
+        file: object,
+        options: dict,
+        expire_at: int,
+        timeout: float,
+    ) -> Tuple[dict, list, list, Optional[Tuple[str, str]]]:
+        """Runs a scanner in a helper process.
+
+        Args:
+            name: Name of the scanner class (e.g. ScanPdf).
+            data: Data associated with file that will be scanned.
+            file: File associated with data that will be scanned.
+            options: Options to be applied during scan.
+            expire_at: Expiration date for any files extracted during scan.
+            timeout: Amount of time (in seconds) that the scanner can run.
+        Returns:
+            Dictionary of scanner metadata.
+            List of scanner flags.
+            List of tuples of extracted data, name, and external flavors.
+            Tuple of the error kind (timed_out, exception, or uncaught) and
+            message, or None if the scan completed.
+        Raises:
+            ScannerCrashed: Helper process exited or did not reply in time.
+        """
+        try:
+            helper = self.idle.get(timeout=timeout)
+        except queue.Empty:
+            return ({}, [], [], ("timed_out", ""))
+
+        try:
+            if not helper.alive():
+                if helper.process is not None:
+                    helper.kill()
+                    self.restarted()
+                helper.start()
+
+            helper.write(data)
+            helper.connection.send(
+                (name, helper.buffer.name, len(data), file, options, expire_at, timeout)
+            )
+
+            try:
+                if helper.connection.poll(timeout + self.grace):
+                    return helper.connection.recv()
+            except (EOFError, OSError):
+                exitcode = helper.kill(wait=1.0)
+                self.restarted()
+                raise ScannerCrashed(f"helper process exited with code {exitcode}")
+            except BaseException:
+                # Interrupted (e.g. by a deadline), drain the reply or kill the helper
+                if helper.connection is not None:
+                    try:
+                        if helper.connection.poll(self.grace):
+                            helper.connection.recv()
+                        else:
+                            helper.kill()
+                            self.restarted()
+                    except (EOFError, OSError):
+                        helper.kill()
+                        self.restarted()
+                raise
+
+            exitcode = helper.kill()
+            self.restarted()
+            raise ScannerCrashed(
+                f"helper process did not reply in time (exit code {exitcode})"
+            )
+
+        finally:
+            self.idle.put(helper)
+
+    def close(self) -> None:
+        """Stops helper processes and unlinks their shared memory."""
+        for helper in self.helpers:
+            helper.stop()
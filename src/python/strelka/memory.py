@@ -0,0 +1,169 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+from typing import Optional
+
+# Heaps with less free memory than this (in bytes) are never fragmented
+min_fragmented_heap = 64 * 1024 * 1024
+
+
+class MallInfo2(ctypes.Structure):
+    """Heap statistics returned by glibc's mallinfo2 (glibc 2.33+)."""
+
+    _fields_ = [
+        (name, ctypes.c_size_t)
+        for name in (
+            "arena",
+            "ordblks",
+            "smblks",
+            "hblks",
+            "hblkhd",
+            "usmblks",
+            "fsmblks",
+            "uordblks",
+            "fordblks",
+            "keepcost",
+        )
+    ]
+
+
+def load_libc() -> Optional[ctypes.CDLL]:
+    name = ctypes.util.find_library("c")
+    if not name:
+        return None
+    try:
+        return ctypes.CDLL(name)
+    except OSError:
+        return None
+
+
+libc = load_libc()
+
+
+def current_rss() -> int:
+    """Returns the resident set size (in bytes) of the process, 0 if unknown."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def heap_free() -> Optional[tuple[int, int]]:
+    """Returns the free and total size (in bytes) of the malloc heap.
+
+    Free memory is memory that the allocator holds (and that counts toward
+    the resident set size) but that is not allocated, i.e. fragmentation.
+    Returns None when the allocator is not glibc's.
+    """
+    try:
+        mallinfo2 = libc.mallinfo2  # type: ignore
+    except AttributeError:
+        return None
+    mallinfo2.restype = MallInfo2
+    info = mallinfo2()
+    return (info.fordblks, info.arena)
+
+
+def trim() -> bool:
+    """Returns free heap memory to the operating system (glibc only)."""
+    try:
+        malloc_trim = libc.malloc_trim  # type: ignore
+    except AttributeError:
+        return False
+    malloc_trim.argtypes = [ctypes.c_size_t]
+    return bool(malloc_trim(0))
+
+
+class MemoryMonitor(object):
+    """Decides when a worker should be recycled based on its memory use.
+
+    The resident set size (RSS) is checked between requests. Past the soft
+    limit, or when the heap is fragmented, free heap memory is returned to
+    the operating system first and the worker is only recycled if that does
+    not bring it back under the limits. Past the hard limit the worker is
+    recycled right away, and files whose data would take the worker past
+    the hard limit are refused before they are retrieved.
+
+    Attributes:
+        soft: RSS (in bytes) past which the worker is recycled if trimming
+            the heap does not help.
+        hard: RSS (in bytes) past which the worker is recycled.
+        growth: Growth of the RSS (in bytes) over the baseline past which
+            the worker is recycled.
+        fragmentation: Fraction of the heap that can be free (held by the
+            allocator but not allocated) before the heap is trimmed and,
+            if that does not help, the worker is recycled.
+        baseline: RSS (in bytes) after the first request, once scanners
+            are loaded.
+        sizes: Boolean that is unset when the coordinator does not report
+            the size of file data, files are then not checked before they
+            are retrieved.
+    """
+
+    def __init__(self, limits_cfg: dict) -> None:
+        self.soft: int = limits_cfg.get("memory_soft", 0)
+        self.hard: int = limits_cfg.get("memory_hard", 0)
+        self.growth: int = limits_cfg.get("memory_growth", 0)
+        self.fragmentation: float = limits_cfg.get("memory_fragmentation", 0.0)
+        self.baseline: Optional[int] = None
+        self.sizes: bool = True
+
+    def fragmented(self) -> bool:
+        if not self.fragmentation:
+            return False
+        heap = heap_free()
+        if heap is None:
+            return False
+        (free, total) = heap
+        return free >= min_fragmented_heap and free / total >= self.fragmentation
+
+    def check(self) -> str:
+        """Returns why the worker should be recycled, empty if it should not."""
+        rss = current_rss()
+        if not rss:
+            return ""
+        if self.baseline is None:
+            self.baseline = rss
+
+        if self.hard and rss >= self.hard:
+            return f"rss {rss} past hard limit {self.hard}"
+
+        fragmented = self.fragmented()
+        if fragmented or (self.soft and rss >= self.soft):
+            trim()
+            rss = current_rss()
+            if self.soft and rss >= self.soft:
+                return f"rss {rss} past soft limit {self.soft} after trimming heap"
+            if fragmented and self.fragmented():
+                return "heap fragmented after trimming"
+
+        if self.growth and rss - self.baseline >= self.growth:
+            return f"rss {rss} grew past {self.growth} over baseline {self.baseline}"
+
+        return ""
+
+    def admits(self, size: int) -> bool:
+        """Returns True if data of size (in bytes) fits under the hard limit."""
+        if not self.hard:
+            return True
+        return current_rss() + size < self.hard
+
+
+def get_memory_monitor(limits_cfg: dict) -> Optional[MemoryMonitor]:
+    """Returns a MemoryMonitor or None if no memory limit is set."""
+    if not any(
+        limits_cfg.get(key)
+        for key in (
+            "memory_soft",
+            "memory_hard",
+            "memory_growth",
+            "memory_fragmentation",
+        )
+    ):
+        return None
+    if not current_rss():
+        logging.warning("resident set size is not available, disabling memory limits")
+        return None
+    return MemoryMonitor(limits_cfg)
@@ -0,0 +1,166 @@
+import contextlib
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import random
+import socket
+import threading
+import time
+from typing import Iterator, Optional
+
+import redis
+
+
+class Profiler(object):
+    """Profiles scanners with cProfile for a bounded window.
+
+    Scans are profiled when their scanner is listed in profiling.scanners
+    (or the list is empty) and a random draw falls under profiling.sampling.
+    The window starts at profiling.start or, when it is not set, when the
+    first worker starts; the start is shared through the coordinator so
+    workers that are recycled do not open a new window.
+    Profiles are aggregated per scanner and written periodically, when the
+    window closes, and when the worker shuts down, either to a directory
+    (one pstats file per scanner and worker process) or to the coordinator
+    (one key per scanner and worker process, containing the same data).
+    Written profiles can be read with pstats (e.g. python -m pstats).
+
+    Attributes:
+        scanners: List of scanners that are profiled (all when empty).
+        sampling: Fraction of scans that are profiled.
+        start_at: UNIX timestamp of the start of the window (0 when the window
+            starts with the first worker).
+        duration: Amount of time (in seconds) after the start of the window
+            that scans are profiled.
+        interval: Minimum amount of time (in seconds) between writes.
+        directory: Directory that profiles are written to.
+        key: Prefix of the coordinator keys that profiles are written to.
+        ttl: Amount of time (in seconds) that profiles are kept in the
+            coordinator.
+        stats: Dictionary of scanner names to aggregated profiles.
+        started: UNIX timestamp of the start of the window.
+    """
+
+    def __init__(
+        self, profiling_cfg: dict, coordinator: Optional[redis.StrictRedis] = None
+    ) -> None:
+        self.scanners: list = profiling_cfg.get("scanners") or []
+        self.sampling: float = profiling_cfg.get("sampling", 1.0)
+        self.start_at: float = profiling_cfg.get("start", 0)
+        self.duration: float = profiling_cfg.get("duration", 300)
+        self.interval: float = profiling_cfg.get("interval", 60)
+        self.directory: str = profiling_cfg.get("directory", "")
+        self.key: str = profiling_cfg.get("key", "")
+        self.ttl: int = profiling_cfg.get("ttl", 86400)
+        self.coordinator = coordinator
+        self.stats: dict[str, pstats.Stats] = {}
+        self.dirty: bool = False
+        self.lock = threading.Lock()
+        self.started: float = self.start_at or time.time()
+        self.written: float = time.monotonic()
+
+    def start(self) -> None:
+        """Anchors the profiling window (when the worker starts).
+
+        Without a configured start, the first worker to start sets the start
+        of the window in the coordinator and workers that start later (e.g.
+        recycled workers) read it. The start is kept for profiling.ttl (or
+        the duration if it is longer), after which a new window opens.
+        """
+        self.written = time.monotonic()
+        if self.start_at:
+            self.started = self.start_at
+            return
+        if not self.coordinator:
+            return
+
+        key = f"{self.key or 'profile'}:started"
+        try:
+            self.coordinator.set(
+                key, time.time(), nx=True, ex=max(self.ttl, int(self.duration))
+            )
+            started = self.coordinator.get(key)
+            if started is not None:
+                self.started = float(started)
+        except (redis.exceptions.RedisError, ValueError):
+            logging.exception("failed to anchor profiling window")
+
+    def active(self) -> bool:
+        return self.started <= time.time() < self.started + self.duration
+
+    def sample(self, name: str) -> bool:
+        """Returns True if a scan of the scanner should be profiled."""
+        if self.scanners and name not in self.scanners:
+            return False
+        if not self.active():
+            return False
+        return self.sampling >= 1.0 or random.random() < self.sampling
+
+    @contextlib.contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Context manager that profiles the code it wraps for a scanner."""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self.lock:
+                if name in self.stats:
+                    self.stats[name].add(profile)
+                else:
+                    self.stats[name] = pstats.Stats(profile)
+                self.dirty = True
+
+    def tick(self) -> None:
+        """Writes profiles if the interval has passed or the window closed."""
+        now = time.monotonic()
+        if self.dirty and (now - self.written >= self.interval or not self.active()):
+            self.write()
+
+    def write(self) -> None:
+        """Writes the aggregated profile of each scanner."""
+        with self.lock:
+            # Same format as pstats.Stats.dump_stats
+            dumps = {
+                name: marshal.dumps(stats.stats)  # type: ignore
+                for name, stats in self.stats.items()
+            }
+            self.dirty = False
+        self.written = time.monotonic()
+
+        worker = f"{socket.gethostname()}.{os.getpid()}"
+        for name, data in dumps.items():
+            try:
+                if self.directory:
+                    path = os.path.join(self.directory, f"{name}.{worker}.pstats")
+                    with open(f"{path}.tmp", "wb") as f:
+                        f.write(data)
+                    os.replace(f"{path}.tmp", path)
+                if self.key and self.coordinator:
+                    self.coordinator.set(
+                        f"{self.key}:{name}:{worker}", data, ex=self.ttl
+                    )
+            except Exception:
+                logging.exception(f"failed to write profile of {name}")
+
+        if dumps:
+            logging.info(f"wrote profiles of {len(dumps)} scanner(s)")
+
+
+def get_profiler(
+    profiling_cfg: dict, coordinator: Optional[redis.StrictRedis] = None
+) -> Optional[Profiler]:
+    """Returns a Profiler or None if profiling is not enabled."""
+    if not profiling_cfg.get("enabled", False):
+        return None
+    if not profiling_cfg.get("directory") and not (
+        profiling_cfg.get("key") and coordinator
+    ):
+        logging.warning("no directory or coordinator key for profiles, disabling")
+        return None
+    if profiling_cfg.get("directory"):
+        os.makedirs(profiling_cfg["directory"], exist_ok=True)
+    return Profiler(profiling_cfg, coordinator)
@@ -20,17 +20,14 @@ def convert_unit_john(jtr_number: str) -> float:
         return float(jtr_number)
 
 
-def office2john(data: bytes, tmp_dir: str) -> bytes:
+def office2john(path: str) -> bytes:
+    """Returns the hashes of the file at path (see Scanner.data_file)."""
     try:
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
-            (stdout, stderr) = subprocess.Popen(
-                ["/jtr/office2john.py", tmp_data.name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            ).communicate()
+        (stdout, stderr) = subprocess.Popen(
+            ["/jtr/office2john.py", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ).communicate()
 
     except strelka.ScannerTimeout:
         raise
@@ -40,17 +37,14 @@ def office2john(data: bytes, tmp_dir: str) -> bytes:
     return stdout
 
 
-def zip2john(data: bytes, tmp_dir: str) -> bytes:
+def zip2john(path: str) -> bytes:
+    """Returns the hashes of the file at path (see Scanner.data_file)."""
     try:
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
-            (stdout, stderr) = subprocess.Popen(
-                ["/jtr/zip2john.py", tmp_data.name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            ).communicate()
+        (stdout, stderr) = subprocess.Popen(
+            ["/jtr/zip2john.py", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ).communicate()
 
     except strelka.ScannerTimeout:
         raise
@@ -60,17 +54,14 @@ def zip2john(data: bytes, tmp_dir: str) -> bytes:
     return stdout
 
 
-def sevenzip2john(data: bytes, tmp_dir: str) -> bytes:
+def sevenzip2john(path: str) -> bytes:
+    """Returns the hashes of the file at path (see Scanner.data_file)."""
     try:
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
-            (stdout, stderr) = subprocess.Popen(
-                ["/jtr/7z2john.pl", tmp_data.name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-            ).communicate()
+        (stdout, stderr) = subprocess.Popen(
+            ["/jtr/7z2john.pl", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        ).communicate()
 
     except strelka.ScannerTimeout:
         raise
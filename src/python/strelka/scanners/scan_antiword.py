@@ -1,5 +1,4 @@
 import subprocess
-import tempfile
 
 from strelka import strelka
 
@@ -15,12 +14,9 @@ class ScanAntiword(strelka.Scanner):
     def scan(self, data, file, options, expire_at):
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             (stdout, stderr) = subprocess.Popen(
-                ["antiword", tmp_data.name],
+                ["antiword", tmp_name],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             ).communicate()
@@ -1,7 +1,6 @@
 import json
 import os
 import subprocess
-import tempfile
 
 from strelka import strelka
 
@@ -16,6 +15,15 @@ class ScanCapa(strelka.Scanner):
             Defaults to '/etc/capa/'
     """
 
+    def cache_digest(self, options):
+        location_rules = options.get("location_rules", "/etc/capa/rules/")
+        location_signatures = options.get(
+            "location_signatures", "/etc/capa/signatures/"
+        )
+        return self.digest_files(f"{location_rules}/**/*") + self.digest_files(
+            f"{location_signatures}/**/*"
+        )
+
     def scan(self, data, file, options, expire_at):
         tmp_directory = options.get("tmp_directory", "/tmp/")
         location_rules = options.get("location_rules", "/etc/capa/rules/")
@@ -42,10 +50,7 @@ def scan(self, data, file, options, expire_at):
             return
 
         try:
-            with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-                tmp_data.write(data)
-                tmp_data.flush()
-
+            with self.data_file(data, tmp_directory) as tmp_name:
                 try:
                     (stdout, stderr) = subprocess.Popen(
                         [
@@ -55,7 +60,7 @@ def scan(self, data, file, options, expire_at):
                             location_rules,
                             "-s",
                             location_signatures,
-                            tmp_data.name,
+                            tmp_name,
                         ],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
@@ -34,14 +34,10 @@ def scan(self, data, file, options, expire_at):
                     parsed_eml["header"]["subject"] and parsed_eml["header"]["header"]
                 ):
                     if b"\nReceived: from " in data:
-                        data = (
-                            data.rpartition(b"\nReceived: from ")[1]
-                            + data.rpartition(b"\nReceived: from ")[2]
-                        )[1:]
+                        data = data[data.rfind(b"\nReceived: from ") + 1 :]
                     elif b"Start mail input; end with <CRLF>.<CRLF>\n" in data:
-                        data = data.rpartition(
-                            b"Start mail input; end with <CRLF>.<CRLF>\n"
-                        )[2]
+                        marker = b"Start mail input; end with <CRLF>.<CRLF>\n"
+                        data = data[data.rfind(marker) + len(marker) :]
                     parsed_eml = ep.decode_email_bytes(data)
                     if not (
                         parsed_eml["header"]["subject"]
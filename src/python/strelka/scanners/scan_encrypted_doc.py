@@ -24,12 +24,9 @@ def crack_word(
     brute=False,
 ):
     try:
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_dir) as tmp_name:
             (office2john, stderr) = subprocess.Popen(
-                [jtr_path + "office2john.py", tmp_data.name],
+                [jtr_path + "office2john.py", tmp_name],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             ).communicate()
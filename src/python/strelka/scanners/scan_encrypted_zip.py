@@ -20,12 +20,9 @@ def crack_zip(
     scanner_timeout=150,
 ):
     try:
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_dir) as tmp_name:
             (zip2john, stderr) = subprocess.Popen(
-                [jtr_path + "zip2john", tmp_data.name],
+                [jtr_path + "zip2john", tmp_name],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             ).communicate()
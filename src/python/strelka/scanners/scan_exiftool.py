@@ -1,7 +1,6 @@
 import ast
 import json
 import subprocess
-import tempfile
 
 from strelka import strelka
 
@@ -20,12 +19,9 @@ def scan(self, data, file, options, expire_at):
         keys = options.get("keys", [])
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             (stdout, stderr) = subprocess.Popen(
-                ["exiftool", "-d", '"%s"', "-j", tmp_data.name],
+                ["exiftool", "-d", '"%s"', "-j", tmp_name],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.DEVNULL,
             ).communicate()
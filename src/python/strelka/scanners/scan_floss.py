@@ -23,10 +23,7 @@ def scan(self, data, file, options, expire_at):
         self.event["stack"] = []
 
         try:
-            with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-                # Write out the sample to a temporary file
-                tmp_data.write(data)
-
+            with self.data_file(data, tmp_directory) as tmp_name:
                 try:
                     # Write out floss results to a temporary file for processing
                     with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_output:
@@ -38,7 +35,7 @@ def scan(self, data, file, options, expire_at):
                                     "--no-static-strings",
                                     "-o",
                                     tmp_output.name,
-                                    tmp_data.name,
+                                    tmp_name,
                                 ],
                                 stdout=subprocess.DEVNULL,
                                 stderr=subprocess.DEVNULL,
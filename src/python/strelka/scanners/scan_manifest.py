@@ -19,7 +19,8 @@ class ScanManifest(strelka.Scanner):
 
     def scan(self, data, file, options, expire_at):
         try:
-            jsondata = json.loads(data)
+            # json expects bytes or str (data spilled to disk is copied)
+            jsondata = json.loads(bytes(data))
             required_keys = ["name", "manifest_version", "version"]
             optional_keys = [
                 "content_scripts",
@@ -1,6 +1,5 @@
 import json
 import subprocess
-import tempfile
 
 from strelka import strelka
 
@@ -22,15 +21,11 @@ def scan(self, data, file, options, expire_at):
         # Get the temporary directory to write the MSI file to
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            # Write the MSI data to the temporary file
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             # Run exiftool to extract metadata from the file
             try:
                 (stdout, stderr) = subprocess.Popen(
-                    ["exiftool", "-d", '"%s"', "-j", tmp_data.name],
+                    ["exiftool", "-d", '"%s"', "-j", tmp_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.DEVNULL,
                 ).communicate()
@@ -21,16 +21,13 @@ def scan(self, data, file, options, expire_at):
         split_words = options.get("split_words", True)
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_tess:
                 try:
                     tess_txt_name = f"{tmp_tess.name}.txt"
 
                     completed_process = subprocess.run(
-                        ["tesseract", tmp_data.name, tmp_tess.name],
+                        ["tesseract", tmp_name, tmp_tess.name],
                         capture_output=True,
                         check=True,
                     )
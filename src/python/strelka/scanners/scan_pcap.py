@@ -31,18 +31,14 @@ def scan(self, data, file, options, expire_at):
         except Exception as e:
             self.flags.append(e)
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-            tmp_data.seek(0)
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             with tempfile.TemporaryDirectory() as tmp_extract:
                 try:
                     (stdout, stderr) = subprocess.Popen(
                         [
                             "zeek",
                             "-r",
-                            tmp_data.name,
+                            tmp_name,
                             "/opt/zeek/share/zeek/policy/frameworks/files/extract-all-files.zeek",
                             f"FileExtract::prefix={tmp_extract}",
                             "LogAscii::use_json=T",
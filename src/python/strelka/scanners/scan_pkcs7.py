@@ -18,16 +18,13 @@ def scan(self, data, file, options, expire_at):
         try:
             # Needs a file to load data, not a buffer.
             # Try to create a temporary file in the specified temporary directory.
-            with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-                tmp_data.write(data)
-                tmp_data.flush()
-
+            with self.data_file(data, tmp_directory) as tmp_name:
                 # Try to load the PKCS7 key file.
                 try:
                     if data[:1] == b"0":
-                        pkcs7 = SMIME.load_pkcs7_der(tmp_data.name)
+                        pkcs7 = SMIME.load_pkcs7_der(tmp_name)
                     else:
-                        pkcs7 = SMIME.load_pkcs7(tmp_data.name)
+                        pkcs7 = SMIME.load_pkcs7(tmp_name)
                 except SMIME.SMIME_Error:
                     self.flags.append(
                         f"{self.__class__.__name__} Exception:  Error loading PKCS7 key file with SMIME error."
@@ -1,5 +1,3 @@
-import tempfile
-
 import rpmfile
 
 from strelka import strelka
@@ -16,12 +14,9 @@ class ScanRpm(strelka.Scanner):
     def scan(self, data, file, options, expire_at):
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             try:
-                with rpmfile.open(tmp_data.name) as rpm_obj:
+                with rpmfile.open(tmp_name) as rpm_obj:
                     extract_name = ""
                     for key, value in rpm_obj.headers.items():
                         if key == "arch":
@@ -37,23 +37,15 @@ def scan(self, data: bytes, file: strelka.File, options: dict, expire_at) -> Non
 
         extracted_pw = ""
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-            tmp_data.seek(0)
-
-            if not tmp_data:
-                self.flags.append("7zip_tmp_error")
-                return
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             (stdout, stderr) = subprocess.Popen(
-                ["7zz", "l", tmp_data.name],
+                ["7zz", "l", tmp_name],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
             ).communicate(timeout=scanner_timeout)
 
             if crack_pws and self.parse_7zip_password(stdout.decode("utf-8")):
-                sevenzip2john = password_cracking.sevenzip2john(data, tmp_directory)
+                sevenzip2john = password_cracking.sevenzip2john(tmp_name)
                 if not sevenzip2john:
                     self.flags.append("7z2john_output_empty")
                     return
@@ -101,22 +93,14 @@ def extract_7zip(
             self.flags.append("7zip_not_installed_error")
             return
 
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-            tmp_data.seek(0)
-
-            if not tmp_data:
-                self.flags.append("7zip_tmp_error")
-                return
-
+        with self.data_file(data, tmp_dir) as tmp_name:
             with tempfile.TemporaryDirectory() as tmp_extract:
                 if password:
                     (stdout, stderr) = subprocess.Popen(
                         [
                             "7zz",
                             "x",
-                            tmp_data.name,
+                            tmp_name,
                             f"-o{tmp_extract}",
                             f"-p{password}",
                         ],
@@ -125,7 +109,7 @@ def extract_7zip(
                     ).communicate(timeout=scanner_timeout)
                 else:
                     (stdout, stderr) = subprocess.Popen(
-                        ["7zz", "x", tmp_data.name, f"-o{tmp_extract}"],
+                        ["7zz", "x", tmp_name, f"-o{tmp_extract}"],
                         stdout=subprocess.PIPE,
                         stderr=subprocess.PIPE,
                     ).communicate(timeout=scanner_timeout)
@@ -161,13 +145,13 @@ def get_all_items(root, exclude=None):
 
             if password:
                 (stdout, stderr) = subprocess.Popen(
-                    ["7zz", "l", tmp_data.name, f"-p{password}"],
+                    ["7zz", "l", tmp_name, f"-p{password}"],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                 ).communicate(timeout=scanner_timeout)
             else:
                 (stdout, stderr) = subprocess.Popen(
-                    ["7zz", "l", tmp_data.name],
+                    ["7zz", "l", tmp_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE,
                 ).communicate(timeout=scanner_timeout)
@@ -7,6 +7,7 @@
 import yaml
 
 from strelka import strelka
+from strelka.buffers import MappedData
 
 
 class ScanTlsh(strelka.Scanner):
@@ -29,13 +30,22 @@ class ScanTlsh(strelka.Scanner):
     def init(self):
         self.tlsh_rules = None
 
+    def cache_digest(self, options):
+        location = options.get("location", "/etc/strelka/tlsh/")
+        if os.path.isdir(location):
+            return self.digest_files(f"{location}/**/*.yaml")
+        return self.digest_files(location)
+
     def scan(self, data, file, options, expire_at):
         # Get the location of the TLSH rule files and the score threshold
         location = options.get("location", "/etc/strelka/tlsh/")
         score_threshold = options.get("score", 30)
 
-        # Hash the data
-        tlsh_file = tlsh.hash(data)
+        # Hash the data, data spilled to disk is hashed without copying it
+        if isinstance(data, MappedData):
+            tlsh_file = self.hash_chunks(data)
+        else:
+            tlsh_file = tlsh.hash(data)
 
         # If the hash is "TNULL", add a flag and return
         if tlsh_file == "TNULL":
@@ -91,3 +101,16 @@ def scan(self, data, file, options, expire_at):
                 "score": this_score,
                 "tlsh": matched_tlsh_hash,
             }
+
+    @staticmethod
+    def hash_chunks(data, chunk: int = 1024 * 1024) -> str:
+        """Hashes data in chunks, returns "TNULL" like tlsh.hash for short data."""
+        t = tlsh.Tlsh()
+        view = memoryview(data)
+        for i in range(0, len(view), chunk):
+            t.update(view[i : i + chunk].tobytes())
+        try:
+            t.final()
+        except ValueError:
+            return "TNULL"
+        return t.hexdigest()
@@ -1,6 +1,5 @@
 import os
 import subprocess
-import tempfile
 
 from strelka import strelka
 
@@ -16,17 +15,14 @@ class ScanUpx(strelka.Scanner):
     def scan(self, data, file, options, expire_at):
         tmp_directory = options.get("tmp_directory", "/tmp/")
 
-        with tempfile.NamedTemporaryFile(dir=tmp_directory) as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-
+        with self.data_file(data, tmp_directory) as tmp_name:
             upx_return = subprocess.call(
-                ["upx", "-d", tmp_data.name, "-o", f"{tmp_data.name}_upx"],
+                ["upx", "-d", tmp_name, "-o", f"{tmp_name}_upx"],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
             if upx_return == 0:
-                with open(f"{tmp_data.name}_upx", "rb") as upx_fin:
+                with open(f"{tmp_name}_upx", "rb") as upx_fin:
                     upx_file = upx_fin.read()
                     upx_size = len(upx_file)
                     if upx_size > len(data):
@@ -35,7 +31,7 @@ def scan(self, data, file, options, expire_at):
                         # Send extracted file back to Strelka
                         self.emit_file(upx_file)
 
-                os.remove(f"{tmp_data.name}_upx")
+                os.remove(f"{tmp_name}_upx")
 
             else:
                 self.flags.append(f"return_code_{upx_return}")
@@ -21,7 +21,8 @@ def scan(self, data, file, options, expire_at):
         self.event["total"] = {"files": 0, "extracted": 0}
 
         try:
-            vba = olevba.VBA_Parser(filename=file.name, data=data)
+            # olevba expects bytes (data spilled to disk is copied)
+            vba = olevba.VBA_Parser(filename=file.name, data=bytes(data))
             if vba.detect_vba_macros():
                 extract_macros = list(vba.extract_macros())
                 self.event["total"]["files"] = len(extract_macros)
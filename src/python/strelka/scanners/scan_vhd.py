@@ -41,20 +41,13 @@ def extract_7zip(self, data, tmp_dir, scanner_timeout, expire_at, file_limit):
             self.flags.append("vhd_7zip_not_installed_error")
             return
 
-        with tempfile.NamedTemporaryFile(dir=tmp_dir, mode="wb") as tmp_data:
-            tmp_data.write(data)
-            tmp_data.flush()
-            tmp_data.seek(0)
-
-            if not tmp_data:
-                self.flags.append("vhd_7zip_tmp_error")
-                return
-
+        # Spilled data is extracted in place instead of being copied
+        with self.data_file(data, tmp_dir) as tmp_name:
             try:
                 with tempfile.TemporaryDirectory() as tmp_extract:
                     try:
                         (stdout, stderr) = subprocess.Popen(
-                            ["7zz", "x", tmp_data.name, f"-o{tmp_extract}"],
+                            ["7zz", "x", tmp_name, f"-o{tmp_extract}"],
                             stdout=subprocess.PIPE,
                             stderr=subprocess.DEVNULL,
                         ).communicate(timeout=scanner_timeout)
@@ -104,7 +97,7 @@ def get_all_items(root, exclude=None):
 
             try:
                 (stdout, stderr) = subprocess.Popen(
-                    ["7zz", "l", tmp_data.name],
+                    ["7zz", "l", tmp_name],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.DEVNULL,
                 ).communicate(timeout=scanner_timeout)
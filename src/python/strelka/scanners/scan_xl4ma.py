@@ -12,7 +12,10 @@ def scan(self, data, file, options, expire_at):
 
         # Attempt to process Excel data using analyzer
         try:
-            results = analyzer.process_data(data=data, filename=file.name)
+            with self.data_file(data) as file_path:
+                results = analyzer.process_data(
+                    data=data, filename=file.name, file_path=file_path
+                )
         except strelka.ScannerTimeout:
             raise
         except Exception as e:
@@ -24,6 +24,12 @@ class ScanYara(strelka.Scanner):
     def init(self):
         self.compiled_yara = None
 
+    def cache_digest(self, options):
+        location = options.get("location", "/etc/strelka/yara/")
+        if os.path.isdir(location):
+            return self.digest_files(f"{location}/**/*.yar*")
+        return self.digest_files(location)
+
     def scan(self, data, file, options, expire_at):
         location = options.get("location", "/etc/strelka/yara/")
         meta = options.get("meta", [])
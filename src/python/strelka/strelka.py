@@ -1,4 +1,10 @@
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
 import glob
+import hashlib
+import heapq
 import importlib
 import ipaddress
 import itertools
@@ -7,25 +13,37 @@
 import math
 import os
 import re
-import signal
 import string
+import sys
+import tempfile
+import threading
 import time
 import traceback
 import uuid
+from collections.abc import Mapping, Sequence, Set
 from types import FrameType
-from typing import Generator, Optional, Tuple
+from typing import Generator, Iterator, Optional, Tuple, Union
 
 import inflection
 import magic  # type: ignore
 import redis
 import validators  # type: ignore
 import yara  # type: ignore
-from boltons import iterutils  # type: ignore
 from opentelemetry import context, trace
 from tldextract import TLDExtract  # type: ignore
 
-from . import __namespace__
+from . import __namespace__, __version__
+from .budget import RequestBudget, get_request_budget
+from .buffers import DataFile, FileBuffer, MappedData, current_data_file, release_data
+from .cache import ResultCache, get_result_cache
+from .coordinator import AsyncCoordinator
+from .deadlines import deadlines
+from .isolation import IsolatedException, IsolationPool, ScannerCrashed
+from .memory import MemoryMonitor, get_memory_monitor
+from .profiling import Profiler, get_profiler
+from .telemetry.metrics import Metrics, get_metrics
 from .telemetry.traces import get_tracer
+from .termination import Condition, event_key, get_conditions, summarize
 
 
 class RequestTimeout(Exception):
@@ -46,6 +64,12 @@ class ScannerTimeout(Exception):
     pass
 
 
+class MemoryLimitExceeded(Exception):
+    """Raised when file data would take the worker past its memory limit."""
+
+    pass
+
+
 class ScannerException(Exception):
     def __init__(self, message=""):
         self.message = message
@@ -61,12 +85,21 @@ class File(object):
     object may be removed in favor of a pure-Redis design.
 
     Attributes:
-        data: Byte string of file data for local-only use
+        cached: Dictionary of cached scan results that are replayed instead
+            of scanning the file (see ResultCache.resolve).
+        data: Byte string of file data for local-only use or extracted file
+            data kept in memory (see DataBudget).
         depth: Integer that represents how deep the file was embedded.
+        duplicate: String that contains the tree node of the first file in
+            the request with the same data, duplicates are not scanned.
+        flags: List of flags set on the file during distribution (e.g. when
+            the file was not scanned).
         flavors: Dictionary of flavors assigned to the file during distribution.
         name: String that contains the name of the file.
         parent: UUIDv4 of the file that produced this file.
         pointer: String that contains the location of the file bytes in Redis.
+        sha256: String that contains the SHA-256 of the file data, only set
+            when result caching is enabled.
         size: Integer of data length
         source: String that describes which scanner the file originated from.
         tree: Dictionary of relationships between File objects
@@ -84,13 +117,17 @@ def __init__(
         data: Optional[bytes] = None,
     ) -> None:
         """Inits file object."""
+        self.cached: Optional[dict] = None
         self.data: Optional[bytes] = data
         self.depth: int = depth
+        self.duplicate: str = ""
+        self.flags: list[str] = []
         self.flavors: dict[str, list[str]] = {}
         self.name: str = name
         self.parent: str = parent
         self.pointer: str = pointer
         self.scanners: list[str] = []
+        self.sha256: str = ""
         self.size: int = -1
         self.source: str = source
         self.tree: dict = {}
@@ -100,7 +137,7 @@ def __init__(
             self.pointer = self.uid
 
     def dictionary(self) -> dict:
-        return {
+        dictionary = {
             "depth": self.depth,
             "flavors": self.flavors,
             "name": self.name,
@@ -109,6 +146,9 @@ def dictionary(self) -> dict:
             "source": self.source,
             "tree": self.tree,
         }
+        if self.flags:
+            dictionary["flags"] = self.flags
+        return dictionary
 
     def add_flavors(self, flavors: dict) -> None:
         """Adds flavors to the file.
@@ -119,6 +159,99 @@ def add_flavors(self, flavors: dict) -> None:
         self.flavors.update(flavors)
 
 
+class DataBudget(object):
+    """Tracks extracted file data that is kept in process memory.
+
+    Extracted files are normally uploaded to the coordinator and retrieved
+    again when they are distributed by the same backend. Files that fit in
+    the budget keep their data in File.data instead; the rest of the files
+    are uploaded to the coordinator. Reservations are released when the
+    file's data is taken for distribution.
+
+    Attributes:
+        limit: Maximum amount of data (in bytes) that can be reserved.
+        reserved: Dictionary of file UIDs to the amount of data (in bytes)
+            reserved for each file.
+        used: Amount of data (in bytes) reserved.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit: int = limit
+        self.reserved: dict[str, int] = {}
+        self.used: int = 0
+        # Files are emitted from scanner threads
+        self.lock: threading.Lock = threading.Lock()
+
+    def reserve(self, uid: str, size: int) -> bool:
+        """Reserves memory for a file's data.
+
+        Args:
+            uid: UUIDv4 of the file.
+            size: Amount of data (in bytes) to reserve.
+        Returns:
+            True if the data fits in the budget, otherwise False.
+        """
+        with self.lock:
+            if self.used + size > self.limit:
+                return False
+            self.reserved[uid] = size
+            self.used += size
+            return True
+
+    def release(self, uid: str) -> None:
+        """Releases the memory reserved for a file's data, if any."""
+        with self.lock:
+            self.used -= self.reserved.pop(uid, 0)
+
+    def reset(self) -> None:
+        """Releases every reservation."""
+        with self.lock:
+            self.reserved.clear()
+            self.used = 0
+
+
+# Number of chunks read from the coordinator per round trip when spilling
+retrieve_batch = 1024
+
+leading_whitespace = re.compile(b"[%s]*" % re.escape(string.whitespace.encode()))
+
+
+def parse_window(window_cfg: Optional[dict]) -> Optional[Tuple[int, int]]:
+    """Returns the (head, tail) sizes of a tasting window or None (whole file)."""
+    if not window_cfg or (
+        window_cfg.get("head") is None and window_cfg.get("tail") is None
+    ):
+        return None
+    return (int(window_cfg.get("head") or 0), int(window_cfg.get("tail") or 0))
+
+
+def taste_window(
+    data: Union[bytes, memoryview, str], window: Optional[Tuple[int, int]]
+) -> Union[bytes, memoryview, str]:
+    """Returns the head and tail of data that are tasted.
+
+    The head and tail are joined so that rules anchored to the start (e.g.
+    "at 0") and the end (e.g. "at filesize - 512") of files still match.
+    Data that fits in the window is returned as is.
+
+    Args:
+        data: File data.
+        window: Tuple of the number of bytes tasted from the head and tail
+            of the data, or None to taste the whole file.
+    Returns:
+        Tasted data, copied only when the head and tail are joined.
+    """
+    if window is None or len(data) <= window[0] + window[1]:
+        return data
+    (head, tail) = window
+    if isinstance(data, str):
+        return data[:head] + (data[-tail:] if tail else "")
+    view = memoryview(data)
+    if not tail:
+        return view[:head]
+    return b"".join((view[:head], view[-tail:]))
+
+
 def timeout_handler(ex):
     """Signal timeout handler"""
 
@@ -143,6 +276,58 @@ def __init__(
         self.blocking_pop_time_sec: int = backend_cfg.get("coordinator", {}).get(
             "blocking_pop_time_sec", 0
         )
+        self.event_encoding: str = backend_cfg.get("coordinator", {}).get(
+            "event_encoding", "json"
+        )
+        self.chunk_size: int = backend_cfg.get("coordinator", {}).get(
+            "chunk_size", 1024 * 16
+        )
+        self.prefetch: int = backend_cfg.get("coordinator", {}).get("prefetch", 0)
+        self.prefetch_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.draining: bool = False
+        self.scanner_concurrency: int = backend_cfg.get("concurrency", {}).get(
+            "scanners", 0
+        )
+        self.serial_scanners: list = backend_cfg.get("concurrency", {}).get(
+            "serial", []
+        )
+        self.scanner_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # Futures of scanners that timed out but are still running on the pool
+        self.abandoned: set = set()
+        # Helper processes start with work() or with the first isolated scan
+        self.isolation: IsolationPool = IsolationPool(backend_cfg)
+        self.deduplicate: bool = backend_cfg.get("distribution", {}).get(
+            "deduplicate", False
+        )
+        # SHA-256 of files in the current request mapped to their tree node
+        self.seen: dict[str, str] = {}
+        # Tree nodes of extracted files in the current request that were dropped
+        self.dropped: set[str] = set()
+        # Requests stop when a scanner event matches a condition
+        self.conditions: list[Condition] = get_conditions(
+            backend_cfg.get("termination") or {}
+        )
+        # Condition that stopped the current request and the scanners it cancelled
+        self.verdict: Optional[dict] = None
+        self.cancelled: list[str] = []
+        # Extracted data kept in memory instead of the coordinator
+        local_data_budget = backend_cfg.get("distribution", {}).get(
+            "local_data_budget", 0
+        )
+        self.local_data: Optional[DataBudget] = (
+            DataBudget(local_data_budget) if local_data_budget else None
+        )
+        # Data retrieved from the coordinator past this size is spilled to disk
+        self.spill_threshold: int = backend_cfg.get("distribution", {}).get(
+            "spill_threshold", 0
+        )
+        self.spill_directory: str = backend_cfg.get("distribution", {}).get(
+            "spill_directory", ""
+        )
+        # Data of files is written here once for scanners that need a path
+        self.tmp_directory: str = backend_cfg.get("distribution", {}).get(
+            "tmp_directory", ""
+        )
 
         self.tracer = get_tracer(
             backend_cfg.get("telemetry", {}).get("traces", {}),
@@ -152,25 +337,60 @@ def __init__(
             },
         )
 
+        self.metrics: Optional[Metrics] = get_metrics(
+            backend_cfg.get("telemetry", {}).get("metrics", {})
+        )
+        # Index of the worker process (see Supervisor)
+        self.worker: int = 0
+
+        self.compile_scanners()
+
+        tasting_cfg = backend_cfg.get("tasting", {})
+        windows_cfg = tasting_cfg.get("windows") or {}
+
         self.compiled_magic = magic.Magic(
-            magic_file=backend_cfg.get("tasting", {}).get("mime_db", None),
+            magic_file=tasting_cfg.get("mime_db", None),
             mime=True,
         )
-
-        yara_rules = backend_cfg.get("tasting", {}).get(
-            "yara_rules", "/etc/strelka/taste/"
+        self.mime_window: Optional[Tuple[int, int]] = parse_window(
+            windows_cfg.get("mime")
         )
+
+        # Rule files with the same window are compiled together
+        yara_rules = tasting_cfg.get("yara_rules", "/etc/strelka/taste/")
+        yara_window = parse_window(windows_cfg.get("yara"))
+        namespace_windows = {
+            namespace: parse_window(window)
+            for namespace, window in (windows_cfg.get("namespaces") or {}).items()
+        }
+        self.compiled_taste_yara: list[tuple[Optional[Tuple[int, int]], yara.Rules]]
         if os.path.isdir(yara_rules):
-            yara_filepaths = {}
+            yara_filepaths: dict = {}
             globbed_yara = glob.iglob(
                 f"{yara_rules}/**/*.yar*",
                 recursive=True,
             )
             for i, entry in enumerate(globbed_yara):
-                yara_filepaths[f"namespace{i}"] = entry
-            self.compiled_taste_yara = yara.compile(filepaths=yara_filepaths)
+                window = namespace_windows.get(
+                    os.path.relpath(entry, yara_rules), yara_window
+                )
+                yara_filepaths.setdefault(window, {})[f"namespace{i}"] = entry
+            self.compiled_taste_yara = [
+                (window, yara.compile(filepaths=filepaths))
+                for window, filepaths in yara_filepaths.items()
+            ]
         else:
-            self.compiled_taste_yara = yara.compile(filepath=yara_rules)
+            self.compiled_taste_yara = [
+                (yara_window, yara.compile(filepath=yara_rules))
+            ]
+
+        # Leading whitespace is only skipped within the largest window
+        self.whitespace_bound: Optional[int] = None
+        if all(window for window, _ in self.compiled_taste_yara):
+            self.whitespace_bound = max(
+                [sum(window) for window, _ in self.compiled_taste_yara],  # type: ignore
+                default=None,
+            )
 
         # If a coordinator is supplied, use it unless explicitly disabled
         if coordinator and disable_coordinator is False:
@@ -206,20 +426,56 @@ def __init__(
         if not self.coordinator:
             logging.info("backend started without coordinator")
 
-    def taste_mime(self, data: bytes) -> list:
+        # Coordinator I/O can run on an event loop that overlaps with scanning,
+        # the loop is started by work() (threads do not survive Supervisor forks)
+        self.async_io: bool = (backend_cfg.get("coordinator") or {}).get(
+            "async_io", False
+        )
+        self.coordinator_io: Optional[AsyncCoordinator] = None
+
+        self.result_cache: Optional[ResultCache] = get_result_cache(
+            backend_cfg, self.coordinator
+        )
+        self.scanner_result_cache: Optional[ResultCache] = get_result_cache(
+            backend_cfg, self.coordinator, scope="scanner"
+        )
+
+        self.profiler: Optional[Profiler] = get_profiler(
+            backend_cfg.get("profiling") or {}, self.coordinator
+        )
+
+        # Workers are recycled between requests when they use too much memory
+        self.memory: Optional[MemoryMonitor] = get_memory_monitor(self.limits)
+
+        # Work across each request's extraction tree is bounded by a budget
+        self.budget: Optional[RequestBudget] = get_request_budget(
+            backend_cfg.get("budget") or {}
+        )
+
+    def taste_mime(self, data: Union[bytes, memoryview]) -> list:
         """Tastes file data with libmagic."""
+        data = taste_window(data, self.mime_window)
+        # libmagic is passed bytes (views and spilled data are copied)
+        if not isinstance(data, (bytes, str)):
+            data = bytes(data)
         return [self.compiled_magic.from_buffer(data)]
 
-    def taste_yara(self, data: bytes) -> list:
+    def taste_yara(self, data: Union[bytes, memoryview]) -> list:
         """Tastes file data with YARA."""
 
-        taste_yara_matches = self.compiled_taste_yara.match(data=data)
+        taste_yara_matches = []
+        for window, rules in self.compiled_taste_yara:
+            taste_yara_matches.extend(rules.match(data=taste_window(data, window)))
 
         return [match.rule for match in taste_yara_matches]
 
-    def transform_leading_whitespace(self, data):
-        encoded_whitespace = string.whitespace.encode()
-        return data.lstrip(encoded_whitespace)
+    def transform_leading_whitespace(self, data: bytes) -> memoryview:
+        """Returns a view of data after its leading whitespace (without copying)."""
+        end = len(data)
+        if self.whitespace_bound is not None:
+            end = min(end, self.whitespace_bound)
+        offset = leading_whitespace.match(data, 0, end).end()  # type: ignore
+        return memoryview(data)[offset:]
 
     def match_flavors(self, data: bytes) -> dict:
         mimes = []
@@ -254,8 +510,77 @@ def check_scanners(self):
                 except ModuleNotFoundError:
                     raise
 
+    def load_scanner(self, name: str) -> "Scanner":
+        """Returns a scanner object by class name.
+
+        When scanner caching is enabled, scanner objects are created once
+        and reused for every file.
+
+        Args:
+            name: Name of the scanner class (e.g. ScanZip).
+        Returns:
+            Scanner object.
+        Raises:
+            ModuleNotFoundError: Scanner module could not be imported.
+        """
+        und_name = inflection.underscore(name)
+        scanner_import = f"strelka.scanners.{und_name}"
+        module = importlib.import_module(scanner_import)
+
+        if self.backend_cfg.get("caching", {"scanner": True}).get("scanner", True):
+            # Cache a copy of each scanner object
+            if und_name not in self.scanner_cache:
+                attr = getattr(module, name)(self.backend_cfg, self.coordinator)
+                self.scanner_cache[und_name] = attr
+            plugin = self.scanner_cache[und_name]
+
+            # Clear cached scanner of files
+            plugin.files = []
+            plugin.flags = []
+            plugin.uploads = []
+            plugin.uploads_pending = []
+            plugin.uploads_size = 0
+        else:
+            plugin = getattr(module, name)(self.backend_cfg, self.coordinator)
+
+        plugin.result_cache = self.scanner_result_cache
+        plugin.seen = self.seen if self.deduplicate else None
+        plugin.dropped = self.dropped
+        plugin.local_data = self.local_data if self.coordinator else None
+        plugin.coordinator_io = self.coordinator_io
+        plugin.isolation = self.isolation
+        plugin.metrics = self.metrics
+        plugin.profiler = self.profiler
+
+        return plugin
+
+    def preload(self) -> None:
+        """Imports and initializes all configured scanners.
+
+        Used by the supervisor before forking workers so that scanner
+        modules and objects are shared copy-on-write between workers.
+        """
+        self.check_scanners()
+
+        for name in self.scanners:
+            try:
+                self.load_scanner(name)
+            except Exception:
+                logging.exception(f"scanner {name} failed to preload")
+
+    def drain(self) -> None:
+        """Stops the work loop after the current request completes."""
+        self.draining = True
+
     def work(self) -> None:
-        """Process tasks from Redis coordinator"""
+        """Process tasks from Redis coordinator
+
+        When coordinator.prefetch is set, up to that many tasks are claimed
+        while the current request is distributed and their data is retrieved
+        in the background. Claimed tasks whose deadline passes before they
+        are started are dropped; tasks that were not started when the worker
+        shuts down are returned to the coordinator with their data.
+        """
 
         logging.info("starting up")
 
@@ -265,11 +590,32 @@ def work(self) -> None:
 
         self.check_scanners()
 
+        if self.async_io and self.coordinator_io is None:
+            self.coordinator_io = AsyncCoordinator(self.coordinator)
+            self.coordinator_io.metrics = self.metrics
+
+        # Start helper processes before the first request if any scanner uses them
+        if any(
+            (mapping.get("options") or {}).get("isolation") == "process"
+            for mappings in self.scanners.values()
+            for mapping in mappings or []
+        ):
+            self.isolation.start()
+
+        if self.metrics:
+            self.metrics.start(self.worker)
+
+        if self.profiler:
+            self.profiler.start()
+
         count = 0
         work_start = time.time()
         work_expire = work_start + self.limits.get("time_to_live", 900)
 
-        while True:
+        # Claimed tasks that were not started, with their data (if prefetched)
+        claimed: collections.deque = collections.deque()
+
+        while not self.draining:
             if self.limits.get("max_files") != 0:
                 if count >= self.limits.get("max_files", 5000):
                     break
@@ -277,8 +623,11 @@ def work(self) -> None:
                 if time.time() >= work_expire:
                     break
 
+            if claimed:
+                (task_item, expire_at, data) = claimed.popleft()
+
             # Retrieve request task from Redis coordinator
-            if self.blocking_pop_time_sec > 0:
+            elif self.blocking_pop_time_sec > 0:
                 task = self.coordinator.bzpopmin(
                     "tasks", timeout=self.blocking_pop_time_sec
                 )
@@ -286,78 +635,253 @@ def work(self) -> None:
                     continue
 
                 (queue_name, task_item, expire_at) = task
+                data = None
             else:
+                start = time.monotonic()
                 task = self.coordinator.zpopmin("tasks", count=1)
+                if self.metrics:
+                    self.metrics.coordinator_latency.observe(
+                        time.monotonic() - start, operation="pop"
+                    )
                 if len(task) == 0:
                     time.sleep(0.25)
                     continue
 
                 # Get request metadata and Redis context deadline UNIX timestamp
                 (task_item, expire_at) = task[0]
+                data = None
 
-            traceparent = None
+            # Claim the next tasks while this one is distributed
+            if self.prefetch and len(claimed) < self.prefetch:
+                self.prefetch_tasks(claimed)
 
-            # Support old (ID only) and new (JSON) style requests
-            try:
-                task_info = json.loads(task_item)
-            except json.JSONDecodeError:
-                root_id = task_item.decode()
-                # Create new file object for task, use the request root_id as the pointer
-                file = File(pointer=root_id)
-            else:
-                root_id = task_info["id"]
-                try:
-                    file = File(
-                        pointer=root_id, name=task_info["attributes"]["filename"]
-                    )
-                    traceparent = task_info.get("tracecontext", "")
-                except KeyError as ex:
-                    logging.debug(
-                        f"No filename attached (error: {ex}) to request: {task_item}"
-                    )
-                    file = File(pointer=root_id)
+            (root_id, file, traceparent, queued_at) = self.parse_task(task_item)
+
+            # Prefetched tasks are observed when they are claimed
+            if self.metrics and queued_at and data is None:
+                self.metrics.queue_wait.observe(max(time.time() - queued_at, 0))
 
             expire_at = math.ceil(expire_at)
             timeout = math.ceil(expire_at - time.time())
 
             # If the deadline has passed, bail out
             if timeout <= 0:
+                if self.metrics:
+                    self.metrics.requests.inc(result="expired")
+                if data is not None:
+                    # Prefetched data that was spilled to disk is deleted
+                    data.add_done_callback(
+                        lambda f: f.exception() or release_data(f.result())
+                    )
                 continue
 
+            result = "completed"
             try:
-                # Prepare timeout handler
-                signal.signal(signal.SIGALRM, timeout_handler(RequestTimeout))
-                signal.alarm(timeout)
-
-                # Distribute the file to the scanners
-                self.distribute(root_id, file, expire_at, traceparent=traceparent)
-
-                # Push completed event back to Redis to complete request
-                p = self.coordinator.pipeline(transaction=False)
-                p.rpush(f"event:{root_id}", "FIN")
-                p.expireat(f"event:{root_id}", expire_at)
-                p.execute()
-
-                # Reset timeout handler
-                signal.alarm(0)
+                with deadlines.enter(timeout, RequestTimeout):
+                    if data is not None:
+                        try:
+                            file.data = data.result()
+                        except MemoryLimitExceeded:
+                            # Checked again (and refused) when it is distributed
+                            pass
+
+                    # Distribute the file to the scanners
+                    self.distribute(root_id, file, expire_at, traceparent=traceparent)
+
+                    # Push completed event back to Redis to complete request
+                    start = time.monotonic()
+                    if self.coordinator_io:
+                        # Events are sent in order, FIN follows the request's events
+                        self.coordinator_io.submit(
+                            [
+                                ("rpush", f"event:{root_id}", "FIN"),
+                                ("expireat", f"event:{root_id}", expire_at),
+                            ]
+                        ).result()
+                    else:
+                        p = self.coordinator.pipeline(transaction=False)
+                        p.rpush(f"event:{root_id}", "FIN")
+                        p.expireat(f"event:{root_id}", expire_at)
+                        p.execute()
+                    if self.metrics:
+                        self.metrics.coordinator_latency.observe(
+                            time.monotonic() - start, operation="finish"
+                        )
 
             except RequestTimeout:
                 logging.debug(f"request {root_id} timed out")
+                result = "timed_out"
             except Exception:
-                signal.alarm(0)
                 logging.exception("unknown exception (see traceback below)")
+                result = "failed"
+
+            if self.metrics:
+                self.metrics.requests.inc(result=result)
+                self.metrics.tick()
+
+            if self.profiler:
+                self.profiler.tick()
 
             count += 1
 
+            if self.memory:
+                reason = self.memory.check()
+                if reason:
+                    logging.info(f"recycling worker: {reason}")
+                    break
+
+        if claimed:
+            self.return_tasks(claimed)
+
         logging.info(
             f"shutdown after servicing {count} requests(s) and"
             f" {time.time() - work_start} second(s)"
         )
 
+        if self.prefetch_pool:
+            self.prefetch_pool.shutdown()
+
+        if self.coordinator_io:
+            self.coordinator_io.close()
+            self.coordinator_io = None
+
+        if self.metrics:
+            self.metrics.stop()
+
+        if self.profiler and self.profiler.dirty:
+            self.profiler.write()
+
+        self.isolation.close()
+        if self.isolation.restarts:
+            logging.info(
+                f"restarted {self.isolation.restarts} isolation helper process(es)"
+            )
+
+        for scope, cache in [
+            ("file", self.result_cache),
+            ("scanner", self.scanner_result_cache),
+        ]:
+            if cache:
+                logging.info(
+                    f"{scope} result cache: {cache.hits} hit(s),"
+                    f" {cache.misses} miss(es), {cache.stores} store(s)"
+                )
+
+    def parse_task(
+        self, task_item: bytes
+    ) -> Tuple[str, File, Optional[str], Optional[float]]:
+        """Parses a task popped from the coordinator.
+
+        Args:
+            task_item: Task member of the tasks sorted set, either the
+                request ID (old style) or a JSON request.
+        Returns:
+            Request root ID
+            File object of the request's file
+            OpenTelemetry tracing context
+            UNIX timestamp of when the request was queued (if known)
+        """
+        traceparent = None
+        queued_at = None
+
+        # Support old (ID only) and new (JSON) style requests
+        try:
+            task_info = json.loads(task_item)
+        except json.JSONDecodeError:
+            root_id = task_item.decode()
+            # Create new file object for task, use the request root_id as the pointer
+            file = File(pointer=root_id)
+        else:
+            root_id = task_info["id"]
+            queued_at = task_info.get("time")
+            try:
+                file = File(pointer=root_id, name=task_info["attributes"]["filename"])
+                traceparent = task_info.get("tracecontext", "")
+            except KeyError as ex:
+                logging.debug(
+                    f"No filename attached (error: {ex}) to request: {task_item}"
+                )
+                file = File(pointer=root_id)
+
+        return (root_id, file, traceparent, queued_at)
+
+    def prefetch_tasks(self, claimed: collections.deque) -> None:
+        """Claims tasks and retrieves their data in the background.
+
+        Tasks are claimed without blocking, up to coordinator.prefetch
+        tasks are held at a time.
+
+        Args:
+            claimed: Deque of claimed tasks (task member, deadline, and
+                future of the task's data) that claimed tasks are added to.
+        """
+        if self.prefetch_pool is None:
+            self.prefetch_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="prefetch"
+            )
+
+        for task_item, expire_at in self.coordinator.zpopmin(
+            "tasks", count=self.prefetch - len(claimed)
+        ):
+            (root_id, _, _, queued_at) = self.parse_task(task_item)
+            if self.metrics and queued_at:
+                self.metrics.queue_wait.observe(max(time.time() - queued_at, 0))
+            data = self.prefetch_pool.submit(self.retrieve_data, root_id)
+            claimed.append((task_item, expire_at, data))
+
+    def return_tasks(self, claimed: collections.deque) -> None:
+        """Returns claimed tasks that were not started to the coordinator.
+
+        The task's data is pushed back before the task is, so the data is
+        available to whichever worker claims the task next. Tasks whose data
+        was not retrieved (e.g. it was refused by limits.memory_hard) are
+        returned without pushing data back, whatever data was not retrieved
+        is still in the coordinator. Tasks whose deadline has passed are
+        dropped.
+
+        Args:
+            claimed: Deque of claimed tasks (see prefetch_tasks).
+        """
+        while claimed:
+            (task_item, expire_at, data) = claimed.popleft()
+            if expire_at <= time.time():
+                if data.exception() is None:
+                    release_data(data.result())
+                continue
+
+            try:
+                (root_id, _, _, _) = self.parse_task(task_item)
+                chunks = []
+                if data.exception() is None:
+                    chunks = list(chunk_string(data.result(), chunk=self.chunk_size))
+                    release_data(data.result())
+                else:
+                    logging.warning(
+                        f"returning request {root_id} without its data, retrieval"
+                        f" failed: {data.exception()}"
+                    )
+
+                p = self.coordinator.pipeline(transaction=True)
+                if chunks:
+                    p.rpush(f"data:{root_id}", *chunks)
+                    p.expireat(f"data:{root_id}", math.ceil(expire_at))
+                p.zadd("tasks", {task_item: expire_at})
+                p.execute()
+
+                logging.info(f"returned request {root_id} to coordinator")
+            except Exception:
+                logging.exception(f"failed to return task {task_item}")
+
     def distribute(
         self, root_id: str, file: File, expire_at: int, traceparent: Optional[str] = ""
     ) -> list[dict]:
-        """Distributes a file through scanners.
+        """Distributes a file and the files extracted from it through scanners.
+
+        The extraction tree is walked iteratively: extracted files are added
+        to a frontier that is ordered by schedule_key, so shallow files and
+        files from high priority scanners are processed before deep branches
+        can consume the request deadline. Parent data is released as soon
+        as the parent's scanners finish.
 
         Args:
             root_id: Root request/file UUIDv4
@@ -377,143 +901,393 @@ def distribute(
             ctx = TraceContextTextMapPropagator().extract(carrier)
             context.attach(ctx)
 
-        with self.tracer.start_as_current_span("distribute") as distribute_span:
-            try:
-                data = b""
-                files = []
-                events = []
+        self.seen.clear()
+        self.dropped.clear()
+        self.verdict = None
+        self.cancelled = []
+        if self.local_data:
+            self.local_data.reset()
+        if self.budget:
+            self.budget.reset()
+
+        events = []
+        sequence = itertools.count()
+        # Entries hold the file, the priority of the scanner that extracted it,
+        # and its parent's tracing context
+        frontier: list = [(self.schedule_key(file, {}), next(sequence), file, 5, None)]
+
+        while frontier:
+            (_, _, current, priority, parent_ctx) = heapq.heappop(frontier)
+
+            if current.depth > self.limits.get("max_depth", 15):
+                logging.info(f"request {root_id} exceeded maximum depth")
+                if self.local_data:
+                    self.local_data.release(current.uid)
+                forget_files(self.seen, self.dropped, [current])
+                continue
 
-                pipeline = None
+            degrade = bool(
+                self.budget and self.budget.degrades(current.depth, priority)
+            )
 
-                try:
-                    # Prepare timeout handler
-                    signal.signal(signal.SIGALRM, timeout_handler(DistributionTimeout))
-                    signal.alarm(self.limits.get("distribution", 600))
-
-                    if file.depth > self.limits.get("max_depth", 15):
-                        logging.info(f"request {root_id} exceeded maximum depth")
-                        return []
-
-                    # Distribute can work local-only (data in File) or through a coordinator
-                    if file.data:
-                        # Pull data for file from File object
-                        data = file.data
-                    elif self.coordinator:
-                        # Pull data for file from coordinator
-                        with self.tracer.start_as_current_span("lpop"):
-                            while True:
-                                pop = self.coordinator.lpop(f"data:{file.pointer}")
-                                if pop is None:
-                                    break
-                                data += pop
-
-                        # Initialize Redis pipeline
-                        pipeline = self.coordinator.pipeline(transaction=False)
+            (node_events, children, priorities, node_ctx) = self.distribute_file(
+                root_id, current, expire_at, parent_ctx, degrade=degrade
+            )
+            events.extend(node_events)
+
+            if self.verdict:
+                # Files that were not distributed are dropped
+                dropped = children + [f for (_, _, f, _, _) in frontier]
+                self.discard_files(dropped)
+                logging.info(
+                    f"request {root_id} stopped by {self.verdict['condition']},"
+                    f" {len(dropped)} file(s) dropped"
+                )
+                summary = summarize(
+                    self.verdict, len(events), self.cancelled, len(dropped)
+                )
+                events.append(summary)
+                self.send_event(root_id, summary, expire_at)
+                break
+
+            # Re-ingest extracted files
+            for child in children:
+                child.parent = current.uid
+                child.depth = current.depth + 1
+                heapq.heappush(
+                    frontier,
+                    (
+                        self.schedule_key(child, priorities),
+                        next(sequence),
+                        child,
+                        priorities.get(child.source, 5),
+                        node_ctx,
+                    ),
+                )
+
+        return events
+
+    def retrieve_data(self, pointer: str) -> Union[bytes, MappedData]:
+        """Retrieves and deletes a file's data from the coordinator.
+
+        All chunks are read and the list is deleted in a single transaction,
+        so the data is fetched in one round trip and copied once when the
+        chunks are joined. When spilling is enabled, chunks are read in
+        batches that are removed from the list as they are read and data
+        past distribution.spill_threshold is written to disk, so the data
+        is never held in memory twice.
+
+        Args:
+            pointer: String that contains the location of the file bytes
+                in Redis.
+        Returns:
+            Bytes that contain the file's data, or MappedData if the data
+            was spilled to disk.
+        Raises:
+            MemoryLimitExceeded: The data would take the worker past
+                limits.memory_hard, it is left in the coordinator.
+        """
+        start = time.monotonic()
+
+        if self.memory and self.memory.hard and self.memory.sizes:
+            size = self.data_size(pointer)
+            # Spilled data is mapped from disk, it is only held in memory once read
+            if self.spill_threshold:
+                size = min(size, self.spill_threshold)
+            if not self.memory.admits(size):
+                raise MemoryLimitExceeded(f"data:{pointer} is {size} bytes")
+
+        if self.spill_threshold:
+            buffer = FileBuffer(self.spill_threshold, self.spill_directory)
+            try:
+                while True:
+                    commands = [
+                        ("lrange", f"data:{pointer}", 0, retrieve_batch - 1),
+                        ("ltrim", f"data:{pointer}", retrieve_batch, -1),
+                    ]
+                    if self.coordinator_io:
+                        (chunks, _) = self.coordinator_io.submit(commands).result()
                     else:
-                        raise Exception("No data or coordinator available")
+                        p = self.coordinator.pipeline(transaction=True)
+                        for name, *args in commands:
+                            getattr(p, name)(*args)
+                        (chunks, _) = p.execute()
+                    for chunk in chunks:
+                        buffer.write(chunk)
+                    if len(chunks) < retrieve_batch:
+                        break
+                data = buffer.getvalue()
+            except BaseException:
+                buffer.close()
+                raise
+        elif self.coordinator_io:
+            # Reads are ordered after the uploads of the file's data
+            (chunks, _) = self.coordinator_io.submit(
+                [
+                    ("lrange", f"data:{pointer}", 0, -1),
+                    ("delete", f"data:{pointer}"),
+                ]
+            ).result()
+            data = b"".join(chunks)
+        else:
+            p = self.coordinator.pipeline(transaction=True)
+            p.lrange(f"data:{pointer}", 0, -1)
+            p.delete(f"data:{pointer}")
+            (chunks, _) = p.execute()
+            data = b"".join(chunks)
+
+        if self.metrics:
+            self.metrics.coordinator_latency.observe(
+                time.monotonic() - start, operation="retrieve_data"
+            )
 
-                    # Match data to mime and yara flavors
-                    file.add_flavors(self.match_flavors(data))
+        return data
 
-                    # Get list of matching scanners
-                    scanner_list = self.match_scanners(file)
+    def data_size(self, pointer: str) -> int:
+        """Returns the approximate size (in bytes) of a file's data.
 
-                    tree_dict = {
-                        "node": file.uid,
-                        "parent": file.parent,
-                        "root": root_id,
-                    }
+        Sizes are reported by the coordinator (MEMORY USAGE), so they include
+        the coordinator's overhead. Coordinators that do not support the
+        command disable the check (see MemoryMonitor.sizes).
+        """
+        try:
+            if self.coordinator_io:
+                # Ordered after the uploads of the file's data
+                (size,) = self.coordinator_io.submit(
+                    [("memory_usage", f"data:{pointer}", 0)]
+                ).result()
+            else:
+                size = self.coordinator.memory_usage(f"data:{pointer}", samples=0)
+        except redis.exceptions.ResponseError:
+            logging.warning("coordinator does not report data sizes, not checking")
+            self.memory.sizes = False  # type: ignore
+            return 0
+        return size or 0
 
-                    # Since root_id comes from the request, use that instead of the file's uid
-                    if file.depth == 0:
-                        tree_dict["node"] = root_id
-                    if file.depth == 1:
-                        tree_dict["parent"] = root_id
+    def schedule_key(self, file: File, priorities: dict) -> tuple:
+        """Returns the frontier ordering key for a file.
 
-                    # Update the file object
-                    file.scanners = [s.get("name") for s in scanner_list]
-                    file.size = len(data)
-                    file.tree = tree_dict
+        Files are processed breadth-first; within a depth, files extracted by
+        higher priority scanners come first, followed by smaller files.
 
-                    # Set span attributes for the File object
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.depth", file.depth
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.flavors.mime",
-                        file.flavors.get("mime", ""),
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.flavors.yara",
-                        file.flavors.get("yara", ""),
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.flavors.external",
-                        file.flavors.get("external", ""),
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.name", file.name
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.pointer", file.pointer
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.scanners", file.scanners
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.size", file.size
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.source", file.source
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.tree.node", file.tree.get("node", "")
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.tree.parent", file.tree.get("parent", "")
-                    )
-                    distribute_span.set_attribute(
-                        f"{__namespace__}.file.tree.root", file.tree.get("root", "")
-                    )
+        Args:
+            file: File object
+            priorities: Dictionary of scanner names to assigned priorities
+                for the scanners that ran on the file's parent.
+        Returns:
+            Tuple used to order the frontier.
+        """
+        return (file.depth, -priorities.get(file.source, 5), max(file.size, 0))
+
+    def distribute_file(
+        self,
+        root_id: str,
+        file: File,
+        expire_at: int,
+        parent_ctx: Optional[context.Context] = None,
+        degrade: bool = False,
+    ) -> Tuple[list[dict], list[File], dict, Optional[context.Context]]:
+        """Distributes a single file through scanners.
+
+        Args:
+            root_id: Root request/file UUIDv4
+            file: File object
+            expire_at: Deadline UNIX timestamp
+            parent_ctx: Tracing context of the file's parent
+            degrade: Boolean that skips expensive scanners on the file when
+                the request's budget runs low (see RequestBudget)
+        Returns:
+            List of event dictionaries
+            List of extracted File objects
+            Dictionary of scanner names to assigned priorities
+            Tracing context of the file
+        """
+        with self.tracer.start_as_current_span(
+            "distribute", context=parent_ctx
+        ) as distribute_span:
+            data = b""
+            files: list[File] = []
+            events = []
+            priorities: dict = {}
+
+            # Results resolved from the result cache with the file's parent
+            cached = file.cached
+            file.cached = None
+            cache_key = ""
+
+            deadline = deadlines.push(
+                self.limits.get("distribution", 600), DistributionTimeout
+            )
 
-                    scan: dict = {}
+            try:
 
-                    for scanner in scanner_list:
+                # Distribute can work local-only (data in File) or through a coordinator
+                if file.data is not None:
+                    # Pull data for file from File object
+                    data = file.data
+                    file.data = None
+                    if self.local_data:
+                        self.local_data.release(file.uid)
+                elif self.coordinator:
+                    # Pull data for file from coordinator
+                    if cached is None and not file.duplicate:
                         try:
-                            name = scanner["name"]
-                            und_name = inflection.underscore(name)
-                            scanner_import = f"strelka.scanners.{und_name}"
-                            module = importlib.import_module(scanner_import)
-
-                            if self.backend_cfg.get("caching", {"scanner": True}).get(
-                                "scanner", True
-                            ):
-                                # Cache a copy of each scanner object
-                                if und_name not in self.scanner_cache:
-                                    attr = getattr(module, name)(
-                                        self.backend_cfg, self.coordinator
-                                    )
-                                    self.scanner_cache[und_name] = attr
-                                plugin = self.scanner_cache[und_name]
-
-                                # Clear cached scanner of files
-                                plugin.files = []
-                                plugin.flags = []
-                            else:
-                                plugin = getattr(module, name)(
-                                    self.backend_cfg, self.coordinator
+                            with self.tracer.start_as_current_span("retrieve_data"):
+                                data = self.retrieve_data(file.pointer)
+                        except MemoryLimitExceeded as e:
+                            logging.info(f"node {file.uid} not scanned: {e}")
+                            if self.coordinator_io:
+                                self.coordinator_io.send(
+                                    [("delete", f"data:{file.pointer}")]
                                 )
+                            else:
+                                self.coordinator.delete(f"data:{file.pointer}")
+                            file.flags.append("memory_limit_exceeded")
+                elif cached is None and not file.duplicate:
+                    raise Exception("No data or coordinator available")
+
+                # Refused files are not tasted, scanned, or cached
+                refused = "memory_limit_exceeded" in file.flags
+
+                if cached is None and not file.sha256 and not refused:
+                    if (
+                        self.result_cache
+                        or self.scanner_result_cache
+                        or self.deduplicate
+                    ):
+                        file.sha256 = hashlib.sha256(data).hexdigest()
+
+                # Files extracted later with the same data reference the root
+                if self.deduplicate and file.depth == 0 and not refused:
+                    self.seen.setdefault(file.sha256, root_id)
+
+                if (
+                    cached is None
+                    and self.result_cache
+                    and not file.duplicate
+                    and not refused
+                ):
+                    cache_key = self.result_cache.key(
+                        file.sha256,
+                        file.name,
+                        file.source,
+                        sorted(file.flavors.get("external", [])),
+                    )
+                    cached = self.result_cache.resolve(
+                        cache_key, file.depth, self.limits.get("max_depth", 15)
+                    )
+
+                if file.duplicate or refused:
+                    # Duplicates are not tasted or scanned
+                    flavors = {}
+                    scanner_list = []
+                elif cached is not None:
+                    # Replay the cached flavors and scanners
+                    flavors = cached["flavors"]
+                    file.add_flavors(flavors)
+                    scanner_list = cached["scanners"]
+                else:
+                    # Match data to mime and yara flavors
+                    flavors = self.match_flavors(data)
+                    file.add_flavors(flavors)
+
+                    # Get list of matching scanners
+                    scanner_list = self.match_scanners(file)
 
-                            options = scanner.get("options", {})
+                    if degrade:
+                        kept = [
+                            s
+                            for s in scanner_list
+                            if s["name"] not in self.budget.expensive  # type: ignore
+                        ]
+                        if len(kept) < len(scanner_list):
+                            file.flags.append("budget_degraded")
+                            scanner_list = kept
+
+                priorities = {s["name"]: s.get("priority", 5) for s in scanner_list}
+
+                tree_dict = {
+                    "node": file.uid,
+                    "parent": file.parent,
+                    "root": root_id,
+                }
+
+                # Since root_id comes from the request, use that instead of the file's uid
+                if file.depth == 0:
+                    tree_dict["node"] = root_id
+                if file.depth == 1:
+                    tree_dict["parent"] = root_id
+                if file.duplicate:
+                    tree_dict["duplicate"] = file.duplicate
+
+                # Update the file object
+                file.scanners = [s.get("name") for s in scanner_list]
+                if cached is not None:
+                    file.size = cached["size"]
+                elif not file.duplicate and not refused:
+                    file.size = len(data)
+                file.tree = tree_dict
+
+                if self.metrics:
+                    self.metrics.files.inc(depth=file.depth)
+
+                # Attributes are only built for spans that are sampled
+                if distribute_span.is_recording():
+                    distribute_span.set_attributes(
+                        {
+                            f"{__namespace__}.file.depth": file.depth,
+                            f"{__namespace__}.file.flavors.mime": file.flavors.get(
+                                "mime", ""
+                            ),
+                            f"{__namespace__}.file.flavors.yara": file.flavors.get(
+                                "yara", ""
+                            ),
+                            f"{__namespace__}.file.flavors.external": file.flavors.get(
+                                "external", ""
+                            ),
+                            f"{__namespace__}.file.name": file.name,
+                            f"{__namespace__}.file.pointer": file.pointer,
+                            f"{__namespace__}.file.scanners": file.scanners,
+                            f"{__namespace__}.file.size": file.size,
+                            f"{__namespace__}.file.source": file.source,
+                            f"{__namespace__}.file.tree.node": file.tree.get(
+                                "node", ""
+                            ),
+                            f"{__namespace__}.file.tree.parent": file.tree.get(
+                                "parent", ""
+                            ),
+                            f"{__namespace__}.file.tree.root": file.tree.get(
+                                "root", ""
+                            ),
+                            f"{__namespace__}.file.cached": cached is not None,
+                        }
+                    )
 
-                            # Run the scanner
-                            (scanner_files, scanner_event) = plugin.scan_wrapper(
-                                data,
-                                file,
-                                options,
-                                expire_at,
+                scan: dict = {}
+
+                if cached is not None:
+                    scan = cached["scan"]
+                    files = self.replay_files(cached)
+                    self.check_verdict(file, scan)
+                else:
+                    if self.budget and scanner_list:
+                        self.budget.charge(len(data))
+
+                    # Scanners that need a path share one copy of the data on disk
+                    data_file = DataFile(data, self.tmp_directory)
+                    token = current_data_file.set(data_file)
+                    try:
+                        if self.scanner_concurrency > 1:
+                            results = self.run_scanners_concurrently(
+                                scanner_list, data, file, expire_at
+                            )
+                        else:
+                            results = self.run_scanners(
+                                scanner_list, data, file, expire_at
                             )
 
+                        # Results are merged in priority order to keep output deterministic
+                        for scanner_files, scanner_event in results:
                             # Collect extracted files
                             files.extend(scanner_files)
 
@@ -522,42 +1296,502 @@ def distribute(
                                 **scanner_event,
                             }
 
-                        except ModuleNotFoundError:
-                            logging.exception(
-                                f'scanner {scanner.get("name", "__missing__")} not found'
-                            )
+                            # Remaining scanners are cancelled
+                            if self.check_verdict(file, scanner_event):
+                                results.close()
+                                break
+                    finally:
+                        current_data_file.reset(token)
+                        data_file.close()
+
+                    # Duplicates of files that were dropped have no data
+                    if self.dropped:
+                        files = [f for f in files if f.duplicate not in self.dropped]
+
+                    if self.verdict:
+                        self.cancelled = [
+                            s["name"]
+                            for s in scanner_list
+                            if event_key(s["name"]) not in scan
+                        ]
+
+                    # Degraded and stopped results depend on the request, not the data
+                    if cache_key and not (
+                        "budget_degraded" in file.flags or self.verdict
+                    ):
+                        self.store_result(
+                            cache_key, file, flavors, scanner_list, scan, files
+                        )
 
-                    event = {
-                        **{"file": file.dictionary()},
-                        **{"scan": scan},
-                    }
+                # Release the file data before extracted files are distributed
+                release_data(data)
+                data = b""
 
-                    # Collect events for local-only
-                    events.append(event)
+                event = {
+                    **{"file": file.dictionary()},
+                    **{"scan": scan},
+                }
 
-                    # Send event back to Redis coordinator
-                    if pipeline:
-                        pipeline.rpush(f"event:{root_id}", format_event(event))
-                        pipeline.expireat(f"event:{root_id}", expire_at)
-                        pipeline.execute()
+                # Collect events for local-only
+                events.append(event)
 
-                    signal.alarm(0)
+                self.send_event(root_id, event, expire_at)
 
-                except DistributionTimeout:
-                    # FIXME: node id is not always file.uid
-                    logging.exception(f"node {file.uid} timed out")
+            except DistributionTimeout:
+                # FIXME: node id is not always file.uid
+                logging.exception(f"node {file.uid} timed out")
+            finally:
+                release_data(data)
+                deadlines.pop(deadline)
 
-                # Re-ingest extracted files
-                for scanner_file in files:
-                    scanner_file.parent = file.uid
-                    scanner_file.depth = file.depth + 1
-                    events.extend(self.distribute(root_id, scanner_file, expire_at))
+            return (
+                events,
+                files,
+                priorities,
+                trace.set_span_in_context(distribute_span),
+            )
 
-            except RequestTimeout:
-                signal.alarm(0)
-                raise
+    def send_event(self, root_id: str, event: dict, expire_at: int) -> None:
+        """Sends an event back to the coordinator (if any)."""
+        if self.coordinator_io:
+            self.coordinator_io.send(
+                [
+                    (
+                        "rpush",
+                        f"event:{root_id}",
+                        format_event(event, self.event_encoding),
+                    ),
+                    ("expireat", f"event:{root_id}", expire_at),
+                ]
+            )
+        elif self.coordinator:
+            pipeline = self.coordinator.pipeline(transaction=False)
+            pipeline.rpush(f"event:{root_id}", format_event(event, self.event_encoding))
+            pipeline.expireat(f"event:{root_id}", expire_at)
+            start = time.monotonic()
+            pipeline.execute()
+            if self.metrics:
+                self.metrics.coordinator_latency.observe(
+                    time.monotonic() - start, operation="event"
+                )
+
+    def check_verdict(self, file: File, scan: dict) -> bool:
+        """Checks scanner events against the stop conditions.
+
+        The first condition that matches sets the request's verdict and
+        flags the file with "verdict".
+
+        Args:
+            file: File object that was scanned.
+            scan: Dictionary of scanner keys to scanner events.
+        Returns:
+            True if a condition matched.
+        """
+        if self.verdict or not self.conditions:
+            return False
+        for condition in self.conditions:
+            matches = condition.match(scan)
+            if matches:
+                self.verdict = {
+                    "condition": condition.name,
+                    "scanner": condition.scanner,
+                    "field": condition.field,
+                    "matches": matches,
+                    "node": file.tree.get("node", file.uid),
+                }
+                file.flags.append("verdict")
+                return True
+        return False
+
+    def discard_files(self, files: list[File]) -> None:
+        """Deletes the data of extracted files that will not be distributed."""
+        pointers = []
+        for file in files:
+            if self.local_data:
+                self.local_data.release(file.uid)
+            if file.data is None and not file.duplicate:
+                pointers.append(f"data:{file.pointer}")
+        if not pointers:
+            return
+        if self.coordinator_io:
+            self.coordinator_io.send([("delete", *pointers)])
+        elif self.coordinator:
+            self.coordinator.delete(*pointers)
+
+    def store_result(
+        self,
+        key: str,
+        file: File,
+        flavors: dict,
+        scanner_list: list,
+        scan: dict,
+        files: list[File],
+    ) -> None:
+        """Stores a file's scan results in the result cache.
+
+        Results are not stored when an excluded scanner was assigned to the
+        file, when a scanner timed out or raised an unhandled exception, or
+        when an extracted file was not hashed or is a duplicate.
+
+        Args:
+            key: Cache key of the file.
+            file: File object
+            flavors: Dictionary of mime and yara flavors assigned to the file.
+            scanner_list: List of scanner dictionaries (see match_scanners).
+            scan: Dictionary of scanner metadata.
+            files: List of extracted File objects.
+        """
+        if any(s["name"] in self.result_cache.exclude for s in scanner_list):
+            return
+        for event in scan.values():
+            if {"timed_out", "uncaught_exception"} & set(event.get("flags", [])):
+                return
+        if any(not f.sha256 or f.duplicate for f in files):
+            return
+
+        children = []
+        for f in files:
+            external = f.flavors.get("external", [])
+            children.append(
+                {
+                    "key": self.result_cache.key(
+                        f.sha256, f.name, f.source, sorted(external)
+                    ),
+                    "name": f.name,
+                    "source": f.source,
+                    "flavors": external,
+                    "size": f.size,
+                }
+            )
+
+        self.result_cache.store(
+            key,
+            {
+                "flavors": flavors,
+                "scanners": [
+                    {"name": s["name"], "priority": s.get("priority", 5)}
+                    for s in scanner_list
+                ],
+                "size": file.size,
+                "scan": scan,
+                "children": children,
+            },
+        )
+
+    def replay_files(self, cached: dict) -> list[File]:
+        """Returns the extracted files of a cached result.
+
+        Args:
+            cached: Dictionary of cached scan results (see ResultCache.resolve).
+        Returns:
+            List of File objects that replay their own cached results.
+        """
+        files = []
+
+        for child in cached.get("children", []):
+            extract_file = File(name=child["name"], source=child["source"])
+            if child.get("flavors"):
+                extract_file.add_flavors({"external": child["flavors"]})
+            extract_file.size = child.get("size", -1)
+            extract_file.cached = child.get("entry")
+            files.append(extract_file)
+
+        return files
+
+    def run_scanners(
+        self, scanner_list: list, data: bytes, file: File, expire_at: int
+    ) -> Generator[Tuple[list[File], dict], None, None]:
+        """Runs scanners sequentially on the calling thread.
+
+        Args:
+            scanner_list: List of scanner dictionaries (see match_scanners).
+            data: Data associated with file that will be scanned.
+            file: File associated with data that will be scanned.
+            expire_at: Deadline UNIX timestamp
+        Yields:
+            Tuples of extracted files and scanner event in scanner_list order.
+        """
+        for scanner in scanner_list:
+            try:
+                plugin = self.load_scanner(scanner["name"])
+
+                options = scanner.get("options", {})
+
+                # Run the scanner
+                yield plugin.scan_wrapper(data, file, options, expire_at)
+
+            except ModuleNotFoundError:
+                logging.exception(
+                    f'scanner {scanner.get("name", "__missing__")} not found'
+                )
+
+    def run_scanners_concurrently(
+        self, scanner_list: list, data: bytes, file: File, expire_at: int
+    ) -> Generator[Tuple[list[File], dict], None, None]:
+        """Runs scanners concurrently on a bounded thread pool.
+
+        Scanners listed in concurrency.serial run on the calling thread while
+        the rest of the scanners run on the pool. Scanner timeouts for pooled
+        scanners are enforced here instead of with SIGALRM (which is only
+        available on the main thread); a scanner that exceeds its timeout is
+        abandoned, flagged as timed out, and evicted from the scanner cache.
+        A scanner that waits on the pool (e.g. behind abandoned scanners) for
+        longer than its timeout is cancelled and flagged as timed out, and a
+        pool whose threads are all held by abandoned scanners is replaced.
+        Waits are bounded by the distribution and request deadlines.
+
+        Args:
+            scanner_list: List of scanner dictionaries (see match_scanners).
+            data: Data associated with file that will be scanned.
+            file: File associated with data that will be scanned.
+            expire_at: Deadline UNIX timestamp
+        Yields:
+            Tuples of extracted files and scanner event in scanner_list order.
+        """
+        self.abandoned = {future for future in self.abandoned if not future.done()}
+        if self.scanner_pool is not None and (
+            len(self.abandoned) >= self.scanner_concurrency
+        ):
+            logging.warning(
+                f"replacing scanner pool, {len(self.abandoned)} threads are held by"
+                " abandoned scanners"
+            )
+            self.scanner_pool.shutdown(wait=False)
+            self.scanner_pool = None
+            self.abandoned = set()
+
+        if self.scanner_pool is None:
+            self.scanner_pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.scanner_concurrency,
+                thread_name_prefix="scanner",
+            )
+
+        order: list = []
+        results: dict = {}
+        pending: dict = {}
+        serial: list = []
+
+        for index, scanner in enumerate(scanner_list):
+            try:
+                plugin = self.load_scanner(scanner["name"])
+            except ModuleNotFoundError:
+                logging.exception(
+                    f'scanner {scanner.get("name", "__missing__")} not found'
+                )
+                continue
+
+            order.append(index)
+            options = scanner.get("options", {})
+
+            if scanner["name"] in self.serial_scanners:
+                serial.append((index, plugin, options))
+                continue
+
+            timeout = options.get("scanner_timeout", plugin.scanner_timeout or 10)
+            started: dict = {"queued": time.monotonic()}
+
+            def run(plugin=plugin, options=options, started=started):
+                started["at"] = time.monotonic()
+                return plugin.scan_wrapper(data, file, options, expire_at)
+
+            # Carry the tracing context over to the pool thread
+            future = self.scanner_pool.submit(contextvars.copy_context().run, run)
+            pending[future] = (index, plugin, timeout, started)
+
+        try:
+            for index, plugin, options in serial:
+                results[index] = plugin.scan_wrapper(data, file, options, expire_at)
+
+            while order:
+                # Yield finished results in priority order
+                while order and order[0] in results:
+                    yield results.pop(order.pop(0))
+
+                if not pending:
+                    break
+
+                # Scanners that have not started time out from when they were queued
+                now = time.monotonic()
+                wait = max(
+                    min(
+                        started.get("at", started["queued"]) + timeout
+                        for (_, _, timeout, started) in pending.values()
+                    )
+                    - now,
+                    0,
+                )
+                remaining = deadlines.remaining()
+                if remaining is not None:
+                    wait = min(wait, remaining)
+
+                done, _ = concurrent.futures.wait(
+                    pending,
+                    timeout=wait,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+
+                for future in done:
+                    (index, plugin, timeout, started) = pending.pop(future)
+                    results[index] = future.result()
+
+                # Off the main thread, expired deadlines time out every scanner
+                now = time.monotonic()
+                expired = deadlines.remaining() == 0
+                for future, (index, plugin, timeout, started) in list(pending.items()):
+                    start = started.get("at", started["queued"])
+                    if not expired and now < start + timeout:
+                        continue
+                    pending.pop(future)
+                    if not future.cancel():
+                        self.abandon_scanner(plugin, future)
+                    results[index] = (
+                        [],
+                        {
+                            plugin.key: {
+                                "elapsed": round(now - start, 6),
+                                "flags": ["timed_out"],
+                            }
+                        },
+                    )
+
+        finally:
+            # Distribution was interrupted, scanners still running are abandoned
+            for future, (index, plugin, timeout, started) in pending.items():
+                if not future.cancel():
+                    self.abandon_scanner(plugin, future)
+
+    def abandon_scanner(
+        self, plugin: "Scanner", future: concurrent.futures.Future
+    ) -> None:
+        """Evicts a scanner that is still running on an abandoned thread."""
+        logging.warning(f"{plugin.name}: abandoning scanner that is still running")
+        self.abandoned.add(future)
+        # Files the scanner extracted are not distributed
+        forget_files(plugin.seen, self.dropped, list(plugin.files))
+        plugin.seen = None
+        und_name = inflection.underscore(plugin.name)
+        if self.scanner_cache.get(und_name) is plugin:
+            del self.scanner_cache[und_name]
+
+    def compile_mappings(self, mappings: list) -> list:
+        """Compiles scanner mappings for assignment.
+
+        Flavors are converted to sets, filenames are compiled to regular
+        expressions, and sources are converted to sets (sources that are not
+        lists keep their original type, and semantics).
+
+        Args:
+            mappings: List of dictionaries that contain values used to assign
+                the scanner.
+        Returns:
+            List of compiled mapping dictionaries.
+        """
+        compiled = []
+
+        for mapping in mappings:
+            negatives = mapping.get("negative", {})
+            positives = mapping.get("positive", {})
+            compiled_mapping = {
+                "priority": mapping.get("priority", 5),
+                "options": mapping.get("options"),
+                "wildcard": "*" in positives.get("flavors", []),
+            }
 
-            return events
+            for (kind, category) in [("neg", negatives), ("pos", positives)]:
+                filename = category.get("filename", None)
+                source = category.get("source", [])
+                compiled_mapping.update(
+                    {
+                        f"{kind}_flavors": frozenset(category.get("flavors", [])),
+                        f"{kind}_filename": re.compile(filename) if filename else None,
+                        f"{kind}_source": (
+                            frozenset(source) if isinstance(source, list) else source
+                        ),
+                    }
+                )
+
+            compiled.append(compiled_mapping)
+
+        return compiled
+
+    def compile_scanners(self) -> None:
+        """Compiles the scanners configuration into an assignment index.
+
+        The index maps flavors and sources to the scanners that can be
+        positively matched by them; scanners with wildcard flavors, filename
+        mappings, or non-list sources are always evaluated.
+        """
+        self.compiled_scanners: list = []
+        self.flavor_index: dict[str, set[int]] = {}
+        self.source_index: dict[str, set[int]] = {}
+        self.wildcard_scanners: set[int] = set()
+        self.unindexed_scanners: set[int] = set()
+
+        for (index, name) in enumerate(self.scanners):
+            mappings = self.compile_mappings(self.scanners.get(name, {}) or [])
+            self.compiled_scanners.append((name, mappings))
+
+            for mapping in mappings:
+                for flavor in mapping["pos_flavors"]:
+                    self.flavor_index.setdefault(flavor, set()).add(index)
+                if mapping["wildcard"]:
+                    self.wildcard_scanners.add(index)
+                if mapping["pos_filename"]:
+                    self.unindexed_scanners.add(index)
+                if isinstance(mapping["pos_source"], frozenset):
+                    for source in mapping["pos_source"]:
+                        self.source_index.setdefault(source, set()).add(index)
+                elif mapping["pos_source"]:
+                    self.unindexed_scanners.add(index)
+
+        self.compiled_scanners_from = self.scanners
+
+    def assign_scanner(
+        self,
+        scanner: str,
+        mappings: list,
+        flavors: set,
+        file: File,
+        ignore_wildcards: Optional[bool] = False,
+    ) -> dict:
+        """Assigns a scanner with compiled mappings (see match_scanner).
+
+        Args:
+            scanner: Name of the scanner to be assigned.
+            mappings: List of compiled mapping dictionaries.
+            flavors: Set of all flavors assigned to the file.
+            file: File object to use during scanner assignment.
+            ignore_wildcards: Filter out wildcard scanner matches
+        Returns:
+            Dictionary containing the assigned scanner or None.
+        """
+        for mapping in mappings:
+            if mapping["neg_flavors"] & flavors:
+                return {}
+            if mapping["neg_filename"]:
+                if mapping["neg_filename"].search(file.name):
+                    return {}
+            if mapping["neg_source"]:
+                if file.source in mapping["neg_source"]:
+                    return {}
+            if (mapping["wildcard"] and not ignore_wildcards) or mapping[
+                "pos_flavors"
+            ] & flavors:
+                break
+            if mapping["pos_filename"]:
+                if mapping["pos_filename"].search(file.name):
+                    break
+            if mapping["pos_source"]:
+                if file.source in mapping["pos_source"]:
+                    break
+        else:
+            return {}
+
+        return {
+            "name": scanner,
+            "priority": mapping["priority"],
+            "options": mapping["options"] if mapping["options"] is not None else {},
+        }
 
     def match_scanner(
         self,
@@ -583,43 +1817,13 @@ def match_scanner(
         Returns:
             Dictionary containing the assigned scanner or None.
         """
-        for mapping in mappings:
-            negatives = mapping.get("negative", {})
-            positives = mapping.get("positive", {})
-            neg_flavors = negatives.get("flavors", [])
-            neg_filename = negatives.get("filename", None)
-            neg_source = negatives.get("source", [])
-            pos_flavors = positives.get("flavors", [])
-            pos_filename = positives.get("filename", None)
-            pos_source = positives.get("source", [])
-            assigned = {
-                "name": scanner,
-                "priority": mapping.get("priority", 5),
-                "options": mapping.get("options", {}),
-            }
-
-            for neg_flavor in neg_flavors:
-                if neg_flavor in itertools.chain(*file.flavors.values()):
-                    return {}
-            if neg_filename:
-                if re.search(neg_filename, file.name):
-                    return {}
-            if neg_source:
-                if file.source in neg_source:
-                    return {}
-            for pos_flavor in pos_flavors:
-                if (
-                    pos_flavor == "*" and not ignore_wildcards
-                ) or pos_flavor in itertools.chain(*file.flavors.values()):
-                    return assigned
-            if pos_filename:
-                if re.search(pos_filename, file.name):
-                    return assigned
-            if pos_source:
-                if file.source in pos_source:
-                    return assigned
-
-        return {}
+        return self.assign_scanner(
+            scanner,
+            self.compile_mappings(mappings),
+            set(itertools.chain(*file.flavors.values())),
+            file,
+            ignore_wildcards,
+        )
 
     def match_scanners(
         self, file: File, ignore_wildcards: Optional[bool] = False
@@ -627,17 +1831,35 @@ def match_scanners(
         """
         Wraps match_scanner
 
+        Only scanners that can be positively matched by the file's flavors
+        or source (see compile_scanners) are evaluated.
+
         Args:
             file: File object to use during scanner assignment.
             ignore_wildcards: Filter out wildcard scanner matches.
         Returns:
             List of scanner dictionaries.
         """
+        if self.compiled_scanners_from is not self.scanners:
+            self.compile_scanners()
+
+        flavors = set(itertools.chain(*file.flavors.values()))
+
+        candidates = set(self.unindexed_scanners)
+        if not ignore_wildcards:
+            candidates |= self.wildcard_scanners
+        for flavor in flavors:
+            candidates |= self.flavor_index.get(flavor, set())
+        if file.source in self.source_index:
+            candidates |= self.source_index[file.source]
+
         scanner_list = []
 
-        for name in self.scanners:
-            mappings = self.scanners.get(name, {})
-            scanner = self.match_scanner(name, mappings, file, ignore_wildcards)
+        for index in sorted(candidates):
+            (name, mappings) = self.compiled_scanners[index]
+            scanner = self.assign_scanner(
+                name, mappings, flavors, file, ignore_wildcards
+            )
             if scanner:
                 scanner_list.append(scanner)
 
@@ -681,6 +1903,24 @@ class Scanner(object):
             scanning a file. Can be overridden on a per-scanner basis
             (see scan_wrapper).
         coordinator: Redis client connection to the coordinator.
+        coordinator_io: Asynchronous coordinator I/O (see
+            Backend.load_scanner).
+        isolation: Pool of helper processes that run the scanner when it is
+            isolated (see scan_isolated).
+        metrics: Backend metrics (see Backend.load_scanner).
+        profiler: Profiler of sampled scans (see Backend.load_scanner).
+        local_data: Budget of extracted data kept in memory instead of the
+            coordinator (see Backend.load_scanner).
+        chunk_size: Size (in bytes) of the chunks that extracted files are
+            split into when they are uploaded to the coordinator.
+        upload_batch_size: Amount of data (in bytes) queued for upload
+            before the queue is sent to the coordinator (see
+            upload_to_coordinator).
+        result_cache: Cache of scanner results (see Backend.load_scanner).
+        seen: Dictionary of SHA-256 to tree node of the files in the current
+            request, used to find duplicate extracted files.
+        dropped: Set of tree nodes of extracted files in the current request
+            that were dropped (see forget_files).
     """
 
     def __init__(
@@ -702,6 +1942,30 @@ def __init__(
         self.type = IocOptions
         self.extract = TLDExtract(suffix_list_urls=[])
         self.expire_at: int = 0
+        coordinator_cfg = backend_cfg.get("coordinator") or {}
+        self.chunk_size: int = coordinator_cfg.get("chunk_size", 1024 * 16)
+        self.upload_batch_size: int = coordinator_cfg.get(
+            "upload_batch_size", 1024 * 1024 * 4
+        )
+        self.coordinator_io: Optional[AsyncCoordinator] = None
+        self.isolation: Optional[IsolationPool] = None
+        self.metrics: Optional[Metrics] = None
+        self.profiler: Optional[Profiler] = None
+        self.uploads: list = []
+        self.uploads_pending: list = []
+        self.uploads_size: int = 0
+        results_cfg = backend_cfg.get("caching", {}).get("results", {})
+        self.hash_files: bool = (
+            results_cfg.get("enabled", False)
+            or results_cfg.get("scanners", False)
+            or backend_cfg.get("distribution", {}).get("deduplicate", False)
+        )
+        self.result_cache: Optional[ResultCache] = None
+        self.seen: Optional[dict] = None
+        self.dropped: set = set()
+        self.local_data: Optional[DataBudget] = None
+        self.version: str = ""
+        self.digests: dict = {}
 
         if not self.tracer:
             self.tracer = trace.get_tracer(__name__)
@@ -718,6 +1982,80 @@ def timeout_handler(self, signal_number: int, frame: Optional[FrameType]) -> Non
         """Signal ScannerTimeout"""
         raise ScannerTimeout
 
+    def cache_digest(self, options: dict) -> str:
+        """Overrideable digest of the scanner's external inputs.
+
+        Scanners whose results depend on files other than the scanned file
+        (e.g. rules) return a digest of those files, so cached results are
+        not reused after the files change.
+
+        Args:
+            options: Options to be applied during scan.
+        Returns:
+            String that contains the digest.
+        """
+        return ""
+
+    def digest_files(self, pattern: str) -> str:
+        """Returns a digest of the files that match a glob pattern.
+
+        Digests are computed once per pattern, matching scanners that load
+        their rules once.
+
+        Args:
+            pattern: Recursive glob pattern (e.g. /etc/strelka/yara/**/*.yar*).
+        Returns:
+            String that contains the digest.
+        """
+        if pattern not in self.digests:
+            h = hashlib.sha256()
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    h.update(path.encode())
+                    with open(path, "rb") as f:
+                        h.update(f.read())
+            self.digests[pattern] = h.hexdigest()
+
+        return self.digests[pattern]
+
+    def cache_key(self, file: File, options: dict) -> str:
+        """Returns the result cache key of the scanner for a file.
+
+        Scanner results are keyed by the file's SHA-256 and name, the
+        scanner's name and version (a digest of its source code), its
+        options, and its cache_digest.
+
+        Args:
+            file: File associated with data that will be scanned.
+            options: Options to be applied during scan.
+        Returns:
+            String that contains the cache key or an empty string if the
+            results of the scanner cannot be cached.
+        """
+        if not self.result_cache or not file or not file.sha256:
+            return ""
+        if self.name in self.result_cache.exclude:
+            return ""
+
+        try:
+            if not self.version:
+                h = hashlib.sha256(__version__.encode())
+                with open(sys.modules[self.__class__.__module__].__file__, "rb") as f:
+                    h.update(f.read())
+                self.version = h.hexdigest()
+
+            return self.result_cache.key(
+                file.sha256,
+                file.name,
+                self.name,
+                self.version,
+                options,
+                self.cache_digest(options),
+            )
+        except Exception:
+            logging.exception(f"{self.name}: failed to create result cache key")
+            return ""
+
     def scan(self, data, file, options, expire_at) -> None:
         """Overrideable scan method.
 
@@ -729,6 +2067,47 @@ def scan(self, data, file, options, expire_at) -> None:
         """
         pass
 
+    @contextlib.contextmanager
+    def data_file(self, data, directory: str = "/tmp/") -> Iterator[str]:
+        """Context manager that provides the path of a file containing data.
+
+        The data of the file being distributed is written to disk once and
+        the path is shared by every scanner of the file whose directory is
+        distribution.tmp_directory (see DataFile), so scanners must not modify
+        or delete it. Data that was spilled to disk (see MappedData) is
+        already in a file and other data (e.g. in helper processes or for
+        scanners configured with another directory) is written to a temporary
+        file in directory that is deleted when the context exits.
+
+        Args:
+            data: Data associated with file that will be scanned.
+            directory: Directory that the data is written to (the shared
+                file is only used when it is in the same directory).
+        Yields:
+            Path of a file that contains the data.
+        """
+        shared = current_data_file.get()
+        if (
+            shared is not None
+            and shared.data is data
+            and os.path.realpath(directory) == os.path.realpath(shared.directory)
+        ):
+            path = shared.acquire()
+            try:
+                yield path
+            finally:
+                shared.release()
+            return
+
+        if isinstance(data, MappedData):
+            yield data.path
+            return
+
+        with tempfile.NamedTemporaryFile(dir=directory) as tmp_data:
+            tmp_data.write(data)
+            tmp_data.flush()
+            yield tmp_data.name
+
     def scan_wrapper(
         self, data: bytes, file: File, options: dict, expire_at: int
     ) -> Tuple[list[File], dict]:
@@ -739,6 +2118,11 @@ def scan_wrapper(
         empty) and metadata regardless of whether the scanner completed
         successfully or hit an exception.
 
+        When scanner results are cached, cached metadata is returned instead
+        of scanning. Only results of scanners that did not extract files,
+        time out, or hit an unhandled exception are cached; extracted files
+        must be distributed with their data.
+
         Args:
             data: Data associated with file that will be scanned.
             file: File associated with data that will be scanned (see File()).
@@ -759,26 +2143,51 @@ def scan_wrapper(
                 "scanner_timeout", self.scanner_timeout or 10
             )
 
-            current_span.set_attribute(f"{__namespace__}.scanner.name", self.name)
-            current_span.set_attribute(
-                f"{__namespace__}.scanner.timeout", self.scanner_timeout
-            )
+            recording = current_span.is_recording()
+            if recording:
+                current_span.set_attributes(
+                    {
+                        f"{__namespace__}.scanner.name": self.name,
+                        f"{__namespace__}.scanner.timeout": self.scanner_timeout,
+                    }
+                )
 
+            cache_key = self.cache_key(file, options)
+            if cache_key:
+                cached = self.result_cache.get(cache_key)
+                if recording:
+                    current_span.set_attribute(
+                        f"{__namespace__}.scanner.cached", cached is not None
+                    )
+                if cached is not None:
+                    self.event = cached
+                    return (self.files, {self.key: self.event})
+
+            # Deadlines are only enforced on the main thread, concurrent scanners
+            # have their timeouts enforced by Backend.run_scanners_concurrently
             try:
-                signal.signal(signal.SIGALRM, self.timeout_handler)
-                signal.alarm(self.scanner_timeout)
-                self.expire_at = expire_at
-                self.scan(data, file, options, expire_at)
-                signal.alarm(0)
+                deadline = deadlines.push(self.scanner_timeout, ScannerTimeout)
+                try:
+                    self.expire_at = expire_at
+                    if self.isolation and options.get("isolation") == "process":
+                        self.scan_isolated(data, file, options, expire_at)
+                    elif self.profiler and self.profiler.sample(self.name):
+                        with self.profiler.profile(self.name):
+                            self.scan(data, file, options, expire_at)
+                    else:
+                        self.scan(data, file, options, expire_at)
+                finally:
+                    deadlines.pop(deadline)
             except ScannerTimeout:
                 self.flags.append("timed_out")
             except (DistributionTimeout, RequestTimeout):
                 raise
+            except ScannerCrashed as e:
+                logging.error(f"{self.name}: {e}")
+                self.flags.append("crashed")
             except ScannerException as e:
-                signal.alarm(0)
                 self.event.update({"exception": e.message})
             except Exception as e:
-                signal.alarm(0)
                 logging.exception(
                     f"{self.name}: unhandled exception while scanning"
                     f' uid {file.uid if file else "_missing_"} (see traceback below)'
@@ -788,13 +2197,71 @@ def scan_wrapper(
                     {"exception": "\n".join(traceback.format_exception(e, limit=-10))}
                 )
 
+            # Extracted files must be in the coordinator before they are distributed
+            self.flush_uploads()
+
             self.event = {
                 **{"elapsed": round(time.time() - start, 6)},
                 **{"flags": self.flags},
                 **self.event,
             }
+
+            if self.metrics:
+                self.metrics.scanner_elapsed.observe(
+                    self.event["elapsed"], scanner=self.name
+                )
+                self.metrics.scanner_bytes.inc(len(data), scanner=self.name)
+                for flag in self.flags:
+                    self.metrics.scanner_flags.inc(scanner=self.name, flag=flag)
+
+            if cache_key and not self.files:
+                if not {
+                    "timed_out",
+                    "uncaught_exception",
+                    "failed_to_emit_file",
+                    "crashed",
+                } & set(self.flags):
+                    self.result_cache.store(cache_key, self.event)
+
             return (self.files, {self.key: self.event})
 
+    def scan_isolated(self, data, file, options, expire_at) -> None:
+        """Runs the scan method in a helper process (see IsolationPool).
+
+        The scanner's metadata and flags are merged from the helper and files
+        extracted by the helper are emitted here, so they are deduplicated,
+        uploaded, and kept in memory like files extracted in the worker.
+
+        Raises:
+            ScannerTimeout: Scan did not complete before its deadline.
+            ScannerException: Scanner raised ScannerException.
+            IsolatedException: Scanner raised an unhandled exception.
+            ScannerCrashed: Helper process exited or did not reply in time.
+        """
+        # The scanner's deadline is on the stack when it is called by scan_wrapper
+        timeout = deadlines.remaining()
+        if timeout is None:
+            timeout = self.scanner_timeout
+        elif timeout <= 0:
+            raise ScannerTimeout
+
+        (event, flags, extracted, error) = self.isolation.scan(
+            self.name, data, file, options, expire_at, timeout
+        )
+
+        self.event.update(event)
+        self.flags.extend(flags)
+        for extracted_data, name, flavors in extracted:
+            self.emit_file(extracted_data, name=name, flavors=flavors)
+
+        if error is not None:
+            (kind, message) = error
+            if kind == "timed_out":
+                raise ScannerTimeout
+            elif kind == "exception":
+                raise ScannerException(message)
+            raise IsolatedException(message)
+
     def emit_file(
         self, data: bytes, name: str = "", flavors: Optional[list[str]] = None
     ) -> None:
@@ -808,18 +2275,51 @@ def emit_file(
                 )
                 if flavors:
                     extract_file.add_flavors({"external": flavors})
+                extract_file.size = len(data)
+
+                # Extracted files are hashed here since their data may only be
+                # stored in the coordinator when their parent's results are cached
+                if self.hash_files:
+                    extract_file.sha256 = hashlib.sha256(
+                        data.encode() if isinstance(data, str) else data
+                    ).hexdigest()
+
+                # Duplicates within a request are not uploaded or scanned
+                if self.seen is not None:
+                    extract_file.duplicate = self.seen.setdefault(
+                        extract_file.sha256, extract_file.uid
+                    )
+                    if extract_file.duplicate == extract_file.uid:
+                        extract_file.duplicate = ""
+
+                if current_span.is_recording():
+                    current_span.set_attributes(
+                        {
+                            f"{__namespace__}.file.name": name,
+                            f"{__namespace__}.file.size": len(data),
+                            f"{__namespace__}.file.source": self.name,
+                        }
+                    )
 
-                current_span.set_attribute(f"{__namespace__}.file.name", name)
-                current_span.set_attribute(f"{__namespace__}.file.size", len(data))
-                current_span.set_attribute(f"{__namespace__}.file.source", self.name)
-
-                if self.coordinator:
-                    for c in chunk_string(data):
-                        self.upload_to_coordinator(
-                            extract_file.pointer,
-                            c,
-                            self.expire_at,
+                if extract_file.duplicate:
+                    if current_span.is_recording():
+                        current_span.set_attribute(
+                            f"{__namespace__}.file.duplicate", extract_file.duplicate
                         )
+                elif self.coordinator and not (
+                    self.local_data
+                    and self.local_data.reserve(extract_file.uid, len(data))
+                ):
+                    self.upload_to_coordinator(
+                        extract_file.pointer,
+                        data,
+                        self.expire_at,
+                    )
+                elif self.coordinator:
+                    # Match the bytes that would be retrieved from the coordinator
+                    if isinstance(data, str):
+                        data = data.encode()
+                    extract_file.data = bytes(data)
                 else:
                     extract_file.data = data
 
@@ -829,24 +2329,85 @@ def emit_file(
                 logging.exception("failed to emit file")
                 self.flags.append("failed_to_emit_file")
 
-    def upload_to_coordinator(self, pointer, chunk, expire_at) -> None:
+    def upload_to_coordinator(self, pointer, data, expire_at) -> None:
         """Uploads data to coordinator.
 
         This method is used during scanning to upload data to coordinator,
         where the data is later pulled from during file distribution.
 
+        Data is split into chunks that are pushed with a single RPUSH and
+        queued with the uploads of every file extracted during the scan.
+        The queue is sent in one pipeline when it holds more than
+        upload_batch_size bytes and when the scan finishes (see
+        flush_uploads).
+
         Args:
             pointer: String that contains the location of the file bytes
                 in Redis.
-            chunk: String that contains a chunk of data to be added to
-                the coordinator.
+            data: String that contains the data to be added to the
+                coordinator.
             expire_at: Expiration date for data stored in pointer.
         """
-        if self.coordinator:
-            p = self.coordinator.pipeline(transaction=False)
-            p.rpush(f"data:{pointer}", chunk)
-            p.expireat(f"data:{pointer}", expire_at)
-            p.execute()
+        if self.coordinator and len(data):
+            self.uploads.append(
+                ("rpush", f"data:{pointer}", *chunk_string(data, chunk=self.chunk_size))
+            )
+            self.uploads.append(("expireat", f"data:{pointer}", expire_at))
+            self.uploads_pending.append(pointer)
+            self.uploads_size += len(data)
+
+            if self.uploads_size >= self.upload_batch_size:
+                self.flush_uploads()
+
+    def flush_uploads(self) -> None:
+        """Sends queued uploads to the coordinator.
+
+        Files whose data could not be uploaded are removed from the scanner's
+        extracted files. When coordinator I/O is asynchronous, uploads are
+        sent without waiting for them to complete (failures are logged).
+        """
+        if not self.uploads:
+            return
+
+        (uploads, pending) = (self.uploads, self.uploads_pending)
+        self.uploads = []
+        self.uploads_pending = []
+        self.uploads_size = 0
+
+        if self.coordinator_io:
+            self.coordinator_io.send(uploads)
+            return
+
+        with self.tracer.start_as_current_span("upload") as current_span:
+            if current_span.is_recording():
+                current_span.set_attribute(
+                    f"{__namespace__}.upload.files", len(pending)
+                )
+            try:
+                p = self.coordinator.pipeline(transaction=False)
+                for name, *args in uploads:
+                    getattr(p, name)(*args)
+                start = time.monotonic()
+                p.execute()
+                if self.metrics:
+                    self.metrics.coordinator_latency.observe(
+                        time.monotonic() - start, operation="upload"
+                    )
+            except Exception:
+                logging.exception("failed to upload files")
+                self.flags.append("failed_to_emit_file")
+                failed = set(pending)
+                forget_files(
+                    self.seen,
+                    self.dropped,
+                    [f for f in self.files if f.pointer in failed],
+                )
+                # Duplicates of the files that were not uploaded have no data
+                self.files = [
+                    f
+                    for f in self.files
+                    if f.pointer not in failed and f.duplicate not in self.dropped
+                ]
 
     def process_ioc(
         self, ioc, ioc_type, scanner_name, description="", malicious=False
@@ -954,6 +2515,30 @@ def add_iocs(self, ioc, ioc_type, description="", malicious=False) -> None:
             logging.error(f"Failed to add {ioc} from {self.name}: {e}")
 
 
+def forget_files(seen: Optional[dict], dropped: set, files: list[File]) -> None:
+    """Records extracted files that are dropped before they are distributed.
+
+    Files are removed from the request's duplicate tracking, so later copies
+    of their data are uploaded and scanned instead of referencing a tree node
+    that has no event, and their tree nodes are added to dropped, so copies
+    that already reference them are dropped too.
+
+    Args:
+        seen: Dictionary of SHA-256 to tree node (see Scanner.seen), or None
+            if duplicates are not tracked.
+        dropped: Set of tree nodes of dropped files.
+        files: List of dropped files.
+    """
+    if seen is None:
+        return
+    for file in files:
+        if file.duplicate:
+            continue
+        if seen.get(file.sha256) == file.uid:
+            seen.pop(file.sha256, None)
+        dropped.add(file.uid)
+
+
 def chunk_string(s, chunk=1024 * 16) -> Generator[bytes, None, None]:
     """Takes an input string and turns it into smaller byte pieces.
 
@@ -969,7 +2554,60 @@ def chunk_string(s, chunk=1024 * 16) -> Generator[bytes, None, None]:
         yield s[c : c + chunk]
 
 
-def format_event(metadata: dict) -> str:
+def prune_event(value):
+    """Replaces bytes with strings and removes empty values in a single pass.
+
+    Values that are empty strings, empty lists, empty dictionaries, or None
+    are removed from dictionaries and lists (including tuples and sets)
+    after their own values have been pruned, so containers that only hold
+    empty values are removed too. Bytes are decoded as UTF-8 with errors
+    replaced before they are checked.
+
+    Args:
+        value: Dictionary or list to prune.
+    Returns:
+        Copy of value with bytes replaced and empty values removed.
+    """
+    if isinstance(value, Mapping):
+        pruned = {}
+        for k, v in value.items():
+            t = type(v)
+            if t is str:
+                if v:
+                    pruned[k] = v
+            elif t is int or t is float or t is bool:
+                pruned[k] = v
+            elif v is not None:
+                v = prune_event(v)
+                if v != "" and v != [] and v != {} and v is not None:
+                    pruned[k] = v
+        return pruned
+
+    if isinstance(value, (bytes, bytearray)):
+        return str(value, encoding="UTF-8", errors="replace")
+
+    if isinstance(value, str):
+        return value
+
+    if isinstance(value, (Sequence, Set)):
+        items = []
+        for v in value:
+            t = type(v)
+            if t is str:
+                if v:
+                    items.append(v)
+            elif t is int or t is float or t is bool:
+                items.append(v)
+            elif v is not None:
+                v = prune_event(v)
+                if v != "" and v != [] and v != {} and v is not None:
+                    items.append(v)
+        return items if type(value) is list else value.__class__(items)
+
+    return value
+
+
+def format_event(metadata: dict, encoding: str = "json") -> Union[str, bytes]:
     """Formats file metadata into an event.
 
     This function must be used on file metadata before the metadata is
@@ -978,23 +2616,21 @@ def format_event(metadata: dict) -> str:
         * Replaces all bytes with strings
         * Removes all values that are empty strings, empty lists,
             empty dictionaries, or None
-        * Dumps dictionary as JSON
+        * Dumps dictionary as JSON (or msgpack)
 
     Args:
         metadata: Dictionary that needs to be formatted into an event.
+        encoding: String that contains the event encoding, "json" or
+            "msgpack" (requires the msgpack package).
 
     Returns:
-        JSON-formatted file event.
+        JSON-formatted file event (or msgpack-formatted bytes).
     """
+    event = prune_event(metadata)
+
+    if encoding == "msgpack":
+        import msgpack  # type: ignore
+
+        return msgpack.packb(event, use_bin_type=True)
 
-    def visit(path, key, value):
-        if isinstance(value, (bytes, bytearray)):
-            value = str(value, encoding="UTF-8", errors="replace")
-        return key, value
-
-    remap1 = iterutils.remap(metadata, visit=visit)
-    remap2 = iterutils.remap(
-        remap1,
-        lambda p, k, v: v != "" and v != [] and v != {} and v is not None,
-    )
-    return json.dumps(remap2)
+    return json.dumps(event)
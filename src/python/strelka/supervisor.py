@@ -0,0 +1,156 @@
+import gc
+import logging
+import os
+import signal
+import time
+from types import FrameType
+from typing import Optional
+
+from opentelemetry import trace
+
+from .strelka import Backend
+
+# Workers that exit faster than this (in seconds) are restarted with a delay
+min_worker_lifetime = 1.0
+restart_delay = 1.0
+
+# Signals that are handled differently by the supervisor and its workers
+handled_signals = {signal.SIGTERM, signal.SIGINT}
+
+
+class Supervisor(object):
+    """Runs a pool of pre-forked backend workers.
+
+    The supervisor loads the backend (configuration, libmagic, compiled taste
+    YARA rules, scanner modules and objects) once and forks workers that share
+    those pages copy-on-write. Workers that exit after reaching
+    limits.max_files, limits.time_to_live, or a memory limit are restarted;
+    SIGTERM and SIGINT drain all workers and stop the supervisor.
+
+    Attributes:
+        backend: Backend object that is shared with each forked worker.
+        workers: Number of worker processes to keep running.
+        children: Dictionary of worker PIDs to worker index.
+        draining: Boolean that is set when the supervisor is shutting down.
+    """
+
+    def __init__(self, backend: Backend, workers: int) -> None:
+        self.backend: Backend = backend
+        self.workers: int = workers
+        self.children: dict[int, int] = {}
+        self.started: dict[int, float] = {}
+        self.draining: bool = False
+
+    def drain(self, signal_number: int, frame: Optional[FrameType]) -> None:
+        """Forwards SIGTERM to all workers and stops restarting them."""
+        if not self.draining:
+            logging.info(f"draining {len(self.children)} worker(s)")
+        self.draining = True
+
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def spawn(self, index: int) -> None:
+        """Forks a worker process.
+
+        SIGTERM and SIGINT are blocked while the worker is forked, so they
+        are not handled by the supervisor's handlers in the worker (before
+        the worker installs its own) or before the worker is recorded in
+        the supervisor.
+
+        Args:
+            index: Integer that identifies the worker slot.
+        """
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, handled_signals)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                self.run_worker(index, mask)
+
+            logging.info(f"started worker {index} (pid {pid})")
+            self.children[pid] = index
+            self.started[pid] = time.monotonic()
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+
+    def run_worker(self, index: int, mask: set) -> None:
+        """Runs the backend work loop in a forked worker. Never returns.
+
+        Args:
+            index: Integer that identifies the worker slot.
+            mask: Set of signals that were blocked before the worker was
+                forked, restored once the worker's handlers are installed.
+        """
+        code = 0
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.backend.drain())
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        # Workers do not signal their siblings
+        self.children = {}
+        self.started = {}
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+
+        self.backend.worker = index
+
+        try:
+            self.backend.work()
+        except Exception:
+            logging.exception(f"worker {index} failed (see traceback below)")
+            code = 1
+        finally:
+            # os._exit skips atexit handlers, so flush telemetry manually
+            provider = trace.get_tracer_provider()
+            if hasattr(provider, "shutdown"):
+                provider.shutdown()
+            logging.shutdown()
+            os._exit(code)
+
+    def run(self) -> None:
+        """Preloads the backend, forks workers and supervises them."""
+        if not self.backend.coordinator:
+            logging.error("no coordinator specified")
+            return
+
+        self.backend.preload()
+
+        # Move preloaded objects out of the collector's generations so that
+        # garbage collection in workers does not dirty the shared pages
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self.drain)
+        signal.signal(signal.SIGINT, self.drain)
+
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = self.children.pop(pid, None)
+            started = self.started.pop(pid, time.monotonic())
+            if index is None:
+                continue
+
+            logging.info(
+                f"worker {index} (pid {pid}) exited with status"
+                f" {os.waitstatus_to_exitcode(status)}"
+            )
+
+            if self.draining:
+                continue
+
+            # Avoid a tight restart loop when workers fail on startup
+            if time.monotonic() - started < min_worker_lifetime:
+                time.sleep(restart_delay)
+
+            if not self.draining:
+                self.spawn(index)
+
+        logging.info("all workers stopped, shutting down")
@@ -0,0 +1,321 @@
+import bisect
+import http.server
+import logging
+import os
+import resource
+import threading
+import time
+from typing import Optional
+
+from ..memory import current_rss
+
+default_buckets = (
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+
+def format_labels(labels: dict) -> str:
+    """Formats labels in the Prometheus text format (e.g. {scanner="ScanZip"})."""
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        value = value.replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """Monotonically increasing value per set of labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple = labelnames
+        self.values: dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self.lock:
+            values = list(self.values.items())
+        return [
+            (self.name, dict(zip(self.labelnames, key)), value) for key, value in values
+        ]
+
+
+class Histogram(object):
+    """Distribution of observed values per set of labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = default_buckets,
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple = labelnames
+        self.buckets: tuple = tuple(buckets)
+        # Labels mapped to per-bucket counts (the last bucket is +Inf) and sum
+        self.values: dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self.lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self.values.items()
+            ]
+
+        samples = []
+        for key, counts, total in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(
+                    (
+                        f"{self.name}_bucket",
+                        {**labels, "le": format_value(float(bound))},
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class Gauge(object):
+    """Value read when metrics are collected."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, function) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.function = function
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        return [(self.name, {}, self.function())]
+
+
+def rss() -> float:
+    """Returns the resident set size (in bytes) of the current process."""
+    # Falls back to the peak RSS, in kilobytes on Linux
+    return current_rss() or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Metrics(object):
+    """Collects backend metrics and exports them in the Prometheus text format.
+
+    Metrics are collected per worker process and are exported either by an
+    HTTP server that serves them at /metrics (the port is offset by the
+    worker index, so each pre-forked worker has its own endpoint) or to a
+    textfile (for node_exporter's textfile collector) that is rewritten
+    after requests, at most once per interval. Every sample is labeled with
+    the worker index.
+
+    Attributes:
+        exporter: Exporter name ("http" or "textfile").
+        addr: Address (host:port) that the HTTP server listens on.
+        path: Path of the textfile, "{worker}" is replaced with the
+            worker index.
+        interval: Minimum amount of time (in seconds) between textfile writes.
+        worker: Index of the worker process (see Supervisor).
+    """
+
+    def __init__(self, metrics_config: dict) -> None:
+        self.exporter: str = metrics_config.get("exporter", "")
+        self.addr: str = metrics_config.get("addr", "0.0.0.0:9464")
+        self.path: str = metrics_config.get("path", "")
+        self.interval: float = metrics_config.get("interval", 15)
+        self.worker: int = 0
+        self.written: float = 0.0
+        self.server: Optional[http.server.ThreadingHTTPServer] = None
+
+        self.scanner_elapsed = Histogram(
+            "strelka_scanner_elapsed_seconds",
+            "Time spent scanning files, per scanner.",
+            ("scanner",),
+        )
+        self.scanner_bytes = Counter(
+            "strelka_scanner_bytes_total",
+            "Bytes of file data scanned, per scanner.",
+            ("scanner",),
+        )
+        self.scanner_flags = Counter(
+            "strelka_scanner_flags_total",
+            "Flags (e.g. timed_out, uncaught_exception) set by scanners.",
+            ("scanner", "flag"),
+        )
+        self.files = Counter(
+            "strelka_files_total",
+            "Files distributed, per depth.",
+            ("depth",),
+        )
+        self.requests = Counter(
+            "strelka_requests_total",
+            "Requests processed, per result.",
+            ("result",),
+        )
+        self.queue_wait = Histogram(
+            "strelka_queue_wait_seconds",
+            "Time from a request being queued to its task being popped.",
+        )
+        self.coordinator_latency = Histogram(
+            "strelka_coordinator_latency_seconds",
+            "Round-trip time of coordinator commands, per operation.",
+            ("operation",),
+        )
+        self.rss = Gauge(
+            "strelka_worker_rss_bytes",
+            "Resident set size of the worker process.",
+            rss,
+        )
+
+        self.instruments = [
+            self.scanner_elapsed,
+            self.scanner_bytes,
+            self.scanner_flags,
+            self.files,
+            self.requests,
+            self.queue_wait,
+            self.coordinator_latency,
+            self.rss,
+        ]
+
+    def collect(self) -> str:
+        """Returns every metric in the Prometheus text format."""
+        lines = []
+        constant = {"worker": self.worker}
+        for instrument in self.instruments:
+            lines.append(f"# HELP {instrument.name} {instrument.documentation}")
+            lines.append(f"# TYPE {instrument.name} {instrument.type}")
+            for name, labels, value in instrument.samples():
+                lines.append(
+                    f"{name}{format_labels({**constant, **labels})}"
+                    f" {format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+    def start(self, worker: int = 0) -> None:
+        """Starts exporting metrics from the current (worker) process."""
+        self.worker = worker
+
+        if self.exporter == "http":
+            (host, _, port) = self.addr.rpartition(":")
+            metrics = self
+
+            class Handler(http.server.BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.split("?")[0] not in ("/", "/metrics"):
+                        self.send_error(404)
+                        return
+                    body = metrics.collect().encode()
+                    self.send_response(200)
+                    self.send_header(
+                        "Content-Type", "text/plain; version=0.0.4; charset=utf-8"
+                    )
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format: str, *args) -> None:
+                    pass
+
+            try:
+                self.server = http.server.ThreadingHTTPServer(
+                    (host or "0.0.0.0", int(port) + worker), Handler
+                )
+            except OSError:
+                logging.exception("failed to start metrics server")
+                return
+
+            threading.Thread(
+                target=self.server.serve_forever, name="metrics", daemon=True
+            ).start()
+            logging.info(f"serving metrics on port {int(port) + worker}")
+
+        elif self.exporter == "textfile":
+            self.write()
+
+    def tick(self) -> None:
+        """Rewrites the textfile if the interval has passed."""
+        if self.exporter == "textfile" and time.monotonic() - self.written >= (
+            self.interval
+        ):
+            self.write()
+
+    def write(self) -> None:
+        """Writes metrics to the textfile (atomically, with a rename)."""
+        self.written = time.monotonic()
+        path = self.path.replace("{worker}", str(self.worker))
+        try:
+            with open(f"{path}.{os.getpid()}.tmp", "w") as f:
+                f.write(self.collect())
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+        except OSError:
+            logging.exception(f"failed to write metrics to {path}")
+
+    def stop(self) -> None:
+        """Stops exporting metrics, the textfile is written a final time."""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        elif self.exporter == "textfile":
+            self.write()
+
+
+def get_metrics(metrics_config: dict) -> Optional[Metrics]:
+    """Returns a Metrics object or None if metrics are not exported."""
+    exporter = metrics_config.get("exporter")
+    if not exporter:
+        return None
+    if exporter not in ("http", "textfile"):
+        logging.info(f"unknown metrics exporter {exporter}, disabling")
+        return None
+    if exporter == "textfile" and not metrics_config.get("path"):
+        logging.info("no path for metrics textfile, disabling")
+        return None
+    return Metrics(metrics_config)
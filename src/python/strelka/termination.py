@@ -0,0 +1,109 @@
+import logging
+from typing import Optional
+
+import inflection
+
+
+def event_key(name: str) -> str:
+    """Returns the key of a scanner's event (see Scanner.key)."""
+    return inflection.underscore(name.replace("Scan", ""))
+
+
+def normalize(value) -> str:
+    """Returns a value as a string, bytes are decoded like format_event does."""
+    if isinstance(value, (bytes, bytearray)):
+        return str(value, encoding="UTF-8", errors="replace")
+    return str(value)
+
+
+def load_values(path: str) -> set:
+    """Loads values (one per line, # starts a comment) from a file."""
+    values = set()
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                values.add(line)
+    return values
+
+
+class Condition(object):
+    """Stops a request when a scanner's event matches (see Backend.distribute).
+
+    The condition matches when the field of the scanner's event contains one
+    of the values (for lists, any item), or, when no values are configured,
+    when the field is set.
+
+    Attributes:
+        name: Name of the condition, reported in the summary event.
+        scanner: Name of the scanner whose events are checked.
+        field: Dotted path of the field in the scanner's event (e.g.
+            match.family).
+        values: Set of values that match, loaded from the condition's values
+            and the file at its path. Empty when any value matches.
+    """
+
+    def __init__(self, condition_cfg: dict) -> None:
+        self.name: str = condition_cfg.get("name", "")
+        self.scanner: str = condition_cfg["scanner"]
+        self.field: str = condition_cfg["field"]
+        self.values: set = {str(v) for v in condition_cfg.get("values") or []}
+        if condition_cfg.get("path"):
+            self.values |= load_values(condition_cfg["path"])
+        self.key: str = event_key(self.scanner)
+        if not self.name:
+            self.name = f"{self.key}.{self.field}"
+
+    def match(self, scan: dict) -> list:
+        """Returns the values of scan that match, empty if none match.
+
+        Args:
+            scan: Dictionary of scanner keys to scanner events.
+        """
+        value = scan.get(self.key)
+        for part in self.field.split("."):
+            if not isinstance(value, dict):
+                return []
+            value = value.get(part)
+
+        if value is None or (isinstance(value, (str, bytes, list, dict)) and not value):
+            return []
+
+        candidates = [
+            normalize(v) for v in (value if isinstance(value, list) else [value])
+        ]
+        if not self.values:
+            return candidates
+        return [v for v in candidates if v in self.values]
+
+
+def get_conditions(termination_cfg: dict) -> list[Condition]:
+    """Returns the request stop conditions, invalid conditions are skipped."""
+    conditions = []
+    for condition_cfg in termination_cfg.get("conditions") or []:
+        try:
+            conditions.append(Condition(condition_cfg))
+        except (KeyError, OSError):
+            logging.exception(f"invalid termination condition {condition_cfg}")
+    return conditions
+
+
+def summarize(
+    verdict: Optional[dict], files: int, scanners: list, dropped: int
+) -> dict:
+    """Returns the summary event of a request that was stopped.
+
+    Args:
+        verdict: Dictionary of the condition that matched (see
+            Backend.check_verdict).
+        files: Number of files distributed before the request was stopped.
+        scanners: List of scanners that were not run on the matching file.
+        dropped: Number of extracted files that were not distributed.
+    """
+    return {
+        "summary": {
+            "verdict": verdict,
+            "files": files,
+            "cancelled": {"scanners": scanners, "files": dropped},
+        }
+    }
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from strelka.benchmarks.corpus import compare, percentile
+
+
+def results(files_per_sec: float, p99: float) -> dict:
+    return {
+        "files_per_sec": files_per_sec,
+        "mb_per_sec": 10.0,
+        "peak_rss": 1024,
+        "stages": {"request": {"p50": 0.001, "p99": p99}},
+        "scanners": {"ScanHeader": {"p50": 0.00001, "p99": 0.00002}},
+        "flavors": {},
+    }
+
+
+def test_benchmarks_compare(mocker):
+    """
+    Pass: Metrics that regressed by more than the threshold are flagged, small
+        changes and negligible latencies are not.
+    Failure: Regressions are missed or unchanged metrics are flagged.
+    """
+
+    TestCase().assertEqual(2, percentile([1, 2, 3, 4], 50))
+    TestCase().assertEqual(99, percentile(list(range(1, 101)), 99))
+
+    TestCase().assertEqual(
+        [], compare(results(100.0, 0.01), results(95.0, 0.0105), 0.1)
+    )
+    TestCase().assertEqual(
+        ["files_per_sec", "stages.request.p99"],
+        compare(results(100.0, 0.01), results(80.0, 0.02), 0.1),
+    )
+
+    slow = results(100.0, 0.01)
+    slow["scanners"]["ScanHeader"]["p99"] = 0.00004
+    TestCase().assertEqual([], compare(results(100.0, 0.01), slow, 0.1))
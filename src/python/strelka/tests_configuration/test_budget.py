@@ -0,0 +1,91 @@
+import os
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import strelka
+from strelka.scanners.scan_header import ScanHeader
+
+
+def test_budget(mocker):
+    """
+    Pass: Expensive scanners are skipped on extracted files once the request's
+        budget runs low, degraded files are flagged, and every file is scanned.
+    Failure: Expensive scanners run past the budget, files are dropped, or
+        degraded files are not flagged.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["budget"] = {
+        "files": 4,
+        "reserve": 0.5,
+        "expensive": ["ScanFooter"],
+    }
+    backend_cfg["telemetry"] = {}
+
+    scan = ScanHeader.scan
+
+    def extract(self, data, file, options, expire_at):
+        scan(self, data, file, options, expire_at)
+        if file.depth == 0:
+            for i in range(4):
+                self.emit_file(f"child {i}".encode(), name=f"child{i}")
+
+    mocker.patch.object(ScanHeader, "scan", extract)
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        "root",
+        strelka.File(name="root", data=b"root"),
+        int(time.time()) + 300,
+    )
+
+    TestCase().assertEqual(5, len(events))
+    # Two of four files scanned leave half of the budget
+    for event in events[:2]:
+        TestCase().assertEqual(["ScanHeader", "ScanFooter"], event["file"]["scanners"])
+        TestCase().assertNotIn("flags", event["file"])
+        TestCase().assertIn("footer", event["scan"])
+    for event in events[2:]:
+        TestCase().assertEqual(["ScanHeader"], event["file"]["scanners"])
+        TestCase().assertEqual(["budget_degraded"], event["file"]["flags"])
+        TestCase().assertNotIn("footer", event["scan"])
+        TestCase().assertIn("header", event["scan"])
+
+    # The budget is reset for each request
+    events = backend.distribute(
+        "root",
+        strelka.File(name="root", data=b"root"),
+        int(time.time()) + 300,
+    )
+    TestCase().assertEqual(
+        [["budget_degraded"]] * 3, [e["file"].get("flags") for e in events[2:]]
+    )
+
+    # Files from high priority scanners are only degraded once the budget is spent
+    backend_cfg["scanners"]["ScanHeader"][0]["priority"] = 6
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        "root",
+        strelka.File(name="root", data=b"root"),
+        int(time.time()) + 300,
+    )
+    TestCase().assertEqual(
+        [None, None, None, None, ["budget_degraded"]],
+        [e["file"].get("flags") for e in events],
+    )
@@ -0,0 +1,147 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from unittest import TestCase, mock
+
+import yaml
+
+from strelka import strelka
+from strelka.scanners.scan_footer import ScanFooter
+
+
+def load_backend_cfg(scanners: dict, concurrency: dict) -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = scanners
+    backend_cfg["concurrency"] = concurrency
+
+    return backend_cfg
+
+
+def scanner_mapping(priority: int = 5, options: dict = None) -> list:
+    return [
+        {
+            "positive": {"flavors": ["*"]},
+            "priority": priority,
+            "options": options or {},
+        }
+    ]
+
+
+def test_distribute_concurrent_matches_sequential(mocker):
+    """
+    Pass: Concurrent scanner execution produces the same events as sequential execution.
+    Failure: Events differ between execution modes.
+    """
+
+    scanners = {
+        "ScanFooter": scanner_mapping(),
+        "ScanHeader": scanner_mapping(),
+        "ScanHtml": scanner_mapping(priority=10),
+        "ScanJavascript": scanner_mapping(),
+    }
+
+    data = Path(Path(__file__).parent / "../tests/fixtures/test.html").read_bytes()
+
+    events = {}
+    for mode, concurrency in [("sequential", {}), ("concurrent", {"scanners": 4})]:
+        backend = strelka.Backend(
+            load_backend_cfg(scanners, concurrency), disable_coordinator=True
+        )
+        events[mode] = backend.distribute(
+            str(uuid.uuid4()), strelka.File(data=data), int(time.time()) + 300
+        )
+
+    def strip(events):
+        for event in events:
+            event["file"]["tree"] = mock.ANY
+            for scanner_event in event["scan"].values():
+                scanner_event["elapsed"] = mock.ANY
+        return events
+
+    TestCase.maxDiff = None
+    TestCase().assertListEqual(strip(events["sequential"]), strip(events["concurrent"]))
+    TestCase().assertListEqual(
+        ["html", "footer", "header", "javascript"],
+        list(events["concurrent"][0]["scan"].keys()),
+    )
+
+
+def test_distribute_concurrent_scanner_timeout(mocker):
+    """
+    Pass: A concurrent scanner that exceeds its timeout is flagged and abandoned.
+    Failure: The scanner is not flagged or distribution waits for the scanner to finish.
+    """
+
+    scanners = {
+        "ScanDelay": scanner_mapping(options={"delay": 5.0, "scanner_timeout": 1}),
+        "ScanHeader": scanner_mapping(),
+    }
+
+    backend = strelka.Backend(
+        load_backend_cfg(scanners, {"scanners": 2}), disable_coordinator=True
+    )
+
+    start = time.monotonic()
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=b"test"), int(time.time()) + 300
+    )
+
+    TestCase().assertLess(time.monotonic() - start, 5.0)
+    TestCase().assertEqual(["timed_out"], events[0]["scan"]["delay"]["flags"])
+    TestCase().assertEqual([], events[0]["scan"]["header"]["flags"])
+    TestCase().assertNotIn("scan_delay", backend.scanner_cache)
+
+
+def test_distribute_concurrent_saturated_pool(mocker):
+    """
+    Pass: A scanner queued behind hung scanners times out when it does not start
+        within its timeout, and the pool held by the hung scanners is replaced.
+    Failure: Distribution waits for the hung scanners or the next file is not
+        scanned.
+    """
+
+    mocker.patch.object(ScanFooter, "scan", side_effect=lambda *args: time.sleep(3.0))
+
+    hung = {"scanner_timeout": 1}
+    scanners = {
+        "ScanDelay": scanner_mapping(priority=10, options={**hung, "delay": 3.0}),
+        "ScanFooter": scanner_mapping(priority=10, options=hung),
+        "ScanHeader": scanner_mapping(options={"scanner_timeout": 1}),
+    }
+
+    backend = strelka.Backend(
+        load_backend_cfg(scanners, {"scanners": 2}), disable_coordinator=True
+    )
+
+    start = time.monotonic()
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=b"test"), int(time.time()) + 300
+    )
+    pool = backend.scanner_pool
+
+    TestCase().assertLess(time.monotonic() - start, 3.0)
+    for key in ("delay", "footer", "header"):
+        TestCase().assertEqual(["timed_out"], events[0]["scan"][key]["flags"])
+
+    # The hung scanners hold every thread, the next file gets a new pool
+    results = list(
+        backend.run_scanners_concurrently(
+            [{"name": "ScanHeader", "priority": 5, "options": {}}],
+            b"test",
+            strelka.File(data=b"test"),
+            int(time.time()) + 300,
+        )
+    )
+
+    TestCase().assertIsNot(pool, backend.scanner_pool)
+    TestCase().assertEqual([], results[0][1]["header"]["flags"])
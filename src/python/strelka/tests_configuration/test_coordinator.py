@@ -0,0 +1,157 @@
+import asyncio
+import os
+import threading
+from unittest import TestCase, mock
+
+import pytest
+import redis
+
+from strelka.coordinator import AsyncCoordinator
+
+
+class FakePipeline(object):
+    def __init__(self, client) -> None:
+        self.client = client
+        self.commands: list = []
+
+    def __getattr__(self, name: str):
+        return lambda *args: self.commands.append((name, *args))
+
+    async def execute(self, raise_on_error: bool = True) -> list:
+        # Submissions queued while the pipeline is in flight are batched
+        self.client.executing.set()
+        await asyncio.to_thread(self.client.release.wait, 5)
+        if self.client.error:
+            raise self.client.error
+        self.client.pipelines.append(self.commands)
+        return [
+            redis.exceptions.ResponseError(name) if name == "fail" else len(args)
+            for (name, *args) in self.commands
+        ]
+
+
+class FakeClient(object):
+    def __init__(self, **kwargs) -> None:
+        self.pipelines: list = []
+        self.error = None
+        self.closed = False
+        self.executing = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def coordinator(mocker):
+    mocker.patch("strelka.coordinator.redis.asyncio.StrictRedis", FakeClient)
+    sync = mock.MagicMock()
+    sync.connection_pool.connection_kwargs = {}
+    coordinator = AsyncCoordinator(sync)
+    yield coordinator
+    coordinator.client.release.set()
+    coordinator.close(timeout=5)
+
+
+def test_async_coordinator_order(coordinator):
+    """
+    Pass: Submissions are sent in the order they are submitted, and submissions
+        queued while a pipeline is in flight are sent together in one pipeline.
+    Failure: Submissions are reordered or each submission is its own pipeline.
+    """
+
+    coordinator.client.release.clear()
+    first = coordinator.submit([("rpush", "event:1", "a")])
+    # The first pipeline is in flight until it is released
+    coordinator.client.executing.wait(5)
+    futures = [
+        coordinator.submit([("rpush", "event:1", str(i)), ("expire", "event:1", i)])
+        for i in range(3)
+    ]
+    coordinator.client.release.set()
+
+    TestCase().assertEqual([2], first.result(timeout=5))
+    TestCase().assertEqual(
+        [[2, 2]] * 3, [future.result(timeout=5) for future in futures]
+    )
+    TestCase().assertEqual(
+        [
+            [("rpush", "event:1", "a")],
+            [
+                command
+                for i in range(3)
+                for command in [("rpush", "event:1", str(i)), ("expire", "event:1", i)]
+            ],
+        ],
+        coordinator.client.pipelines,
+    )
+
+
+def test_async_coordinator_errors(coordinator):
+    """
+    Pass: Errors of a command are raised by the future of its submission only,
+        and connection errors are raised by every submission in the pipeline.
+    Failure: Errors are lost or raised by other submissions.
+    """
+
+    coordinator.client.release.clear()
+    coordinator.submit([("rpush", "event:1", "a")])
+    coordinator.client.executing.wait(5)
+    failed = coordinator.submit([("rpush", "event:1", "b"), ("fail",)])
+    sent = coordinator.submit([("rpush", "event:1", "c")])
+    coordinator.client.release.set()
+
+    with pytest.raises(redis.exceptions.ResponseError):
+        failed.result(timeout=5)
+    TestCase().assertEqual([2], sent.result(timeout=5))
+
+    coordinator.client.error = redis.exceptions.ConnectionError("down")
+    with pytest.raises(redis.exceptions.ConnectionError):
+        coordinator.submit([("rpush", "event:1", "d")]).result(timeout=5)
+
+
+def test_async_coordinator_flush_close(coordinator):
+    """
+    Pass: flush waits for every queued submission and close sends queued
+        submissions before it stops the event loop and closes the connection.
+    Failure: Submissions are pending after flush or close.
+    """
+
+    futures = [coordinator.submit([("rpush", "event:1", str(i))]) for i in range(5)]
+    coordinator.flush(timeout=5)
+    TestCase().assertTrue(all(future.done() for future in futures))
+    TestCase().assertEqual(set(), coordinator.pending)
+
+    future = coordinator.submit([("rpush", "event:1", "FIN")])
+    coordinator.close(timeout=5)
+    TestCase().assertEqual([2], future.result(timeout=0))
+    TestCase().assertTrue(coordinator.client.closed)
+    TestCase().assertFalse(coordinator.thread.is_alive())
+
+
+def test_async_coordinator_fork(coordinator):
+    """
+    Pass: A forked process that submits to its parent's coordinator starts its own
+        event loop and its submissions complete.
+    Failure: Submissions in the forked process never complete.
+    """
+
+    coordinator.submit([("rpush", "event:1", "parent")]).result(timeout=5)
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            coordinator.submit([("rpush", "event:1", "child")]).result(timeout=3)
+            coordinator.close(timeout=3)
+            code = 0
+        finally:
+            os._exit(code)
+
+    (_, status) = os.waitpid(pid, 0)
+    TestCase().assertEqual(0, os.waitstatus_to_exitcode(status))
+    TestCase().assertEqual(os.getpid(), coordinator.pid)
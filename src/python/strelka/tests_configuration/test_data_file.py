@@ -0,0 +1,119 @@
+import os
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import strelka
+from strelka.buffers import DataFile
+from strelka.scanners.scan_footer import ScanFooter
+from strelka.scanners.scan_header import ScanHeader
+
+
+def test_data_file(mocker, tmp_path):
+    """
+    Pass: Scanners that request a path of the file's data share one file in the
+        configured directory, the data is written once, and the file is deleted
+        after the file's scanners finish.
+    Failure: Scanners write their own files, or the file is left on disk.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["distribution"] = {"tmp_directory": str(tmp_path)}
+    backend_cfg["telemetry"] = {}
+
+    paths = []
+
+    def scan(self, data, file, options, expire_at):
+        with self.data_file(data, str(tmp_path)) as path:
+            with open(path, "rb") as f:
+                TestCase().assertEqual(data, f.read())
+            paths.append(path)
+
+    mocker.patch.object(ScanHeader, "scan", scan)
+    mocker.patch.object(ScanFooter, "scan", scan)
+    write = mocker.spy(DataFile, "write")
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.distribute(
+        "root",
+        strelka.File(name="test.txt", data=b"strelka data"),
+        int(time.time()) + 300,
+    )
+
+    TestCase().assertEqual(2, len(paths))
+    TestCase().assertEqual(paths[0], paths[1])
+    TestCase().assertEqual(str(tmp_path), os.path.dirname(paths[0]))
+    TestCase().assertEqual(1, write.call_count)
+    TestCase().assertFalse(os.path.exists(paths[0]))
+
+
+def test_data_file_directory(mocker, tmp_path):
+    """
+    Pass: Scanners configured with another directory than the shared file get a
+        private copy of the data in their directory.
+    Failure: The scanner's directory is ignored in favor of the shared file.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    private = tmp_path / "private"
+    private.mkdir()
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [
+            {
+                "positive": {"flavors": ["*"]},
+                "priority": 5,
+                "options": {"tmp_directory": str(private)},
+            }
+        ],
+    }
+    backend_cfg["distribution"] = {"tmp_directory": str(tmp_path)}
+    backend_cfg["telemetry"] = {}
+
+    paths = {}
+
+    def scan(self, data, file, options, expire_at):
+        with self.data_file(data, options.get("tmp_directory", f"{tmp_path}/")) as path:
+            with open(path, "rb") as f:
+                TestCase().assertEqual(data, f.read())
+            paths[self.name] = path
+
+    mocker.patch.object(ScanHeader, "scan", scan)
+    mocker.patch.object(ScanFooter, "scan", scan)
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.distribute(
+        "root",
+        strelka.File(name="test.txt", data=b"strelka data"),
+        int(time.time()) + 300,
+    )
+
+    TestCase().assertEqual(str(tmp_path), os.path.dirname(paths["ScanHeader"]))
+    TestCase().assertEqual(str(private), os.path.dirname(paths["ScanFooter"]))
+    TestCase().assertFalse(os.path.exists(paths["ScanHeader"]))
+    TestCase().assertFalse(os.path.exists(paths["ScanFooter"]))
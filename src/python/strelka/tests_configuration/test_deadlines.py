@@ -0,0 +1,85 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from unittest import TestCase
+
+import pytest
+import yaml
+
+from strelka import strelka
+from strelka.deadlines import deadlines
+
+
+def test_deadlines_outermost(mocker):
+    """
+    Pass: The exception of the outer deadline is raised when it passes before the
+        inner deadline.
+    Failure: The inner deadline's exception is raised or no exception is raised.
+    """
+
+    start = time.monotonic()
+    with pytest.raises(strelka.RequestTimeout):
+        with deadlines.enter(0.2, strelka.RequestTimeout):
+            with deadlines.enter(5, strelka.ScannerTimeout):
+                time.sleep(1)
+
+    TestCase().assertLess(time.monotonic() - start, 0.5)
+    TestCase().assertIsNone(deadlines.remaining())
+
+
+def test_deadlines_restored(mocker):
+    """
+    Pass: The outer deadline is enforced after an inner deadline passes.
+    Failure: The outer deadline is lost when the inner deadline ends.
+    """
+
+    start = time.monotonic()
+    with pytest.raises(strelka.DistributionTimeout):
+        with deadlines.enter(0.5, strelka.DistributionTimeout):
+            with pytest.raises(strelka.ScannerTimeout):
+                with deadlines.enter(0.1, strelka.ScannerTimeout):
+                    time.sleep(1)
+            time.sleep(1)
+
+    TestCase().assertLess(time.monotonic() - start, 0.8)
+
+
+def test_distribute_deadline(mocker):
+    """
+    Pass: The distribution deadline is enforced on scanners that run after other
+        scanners finish.
+    Failure: The distribution deadline is lost after the first scanner finishes.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 10}],
+        "ScanDelay": [
+            {
+                "positive": {"flavors": ["*"]},
+                "priority": 5,
+                "options": {"delay": 3.0, "scanner_timeout": 2},
+            }
+        ],
+    }
+    backend_cfg["limits"]["distribution"] = 1
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+
+    start = time.monotonic()
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=b"test"), int(time.time()) + 300
+    )
+
+    TestCase().assertLess(time.monotonic() - start, 1.5)
+    TestCase().assertListEqual([], events)
@@ -1,6 +1,8 @@
+import io
 import os
 import time
 import uuid
+import zipfile
 from pathlib import Path
 from unittest import TestCase, mock
 
@@ -221,3 +223,281 @@ def test_distribute_spaces(mocker):
 
             TestCase.maxDiff = None
             TestCase().assertListEqual(expected, events)
+
+
+def nested_zip() -> bytes:
+    """Builds a ZIP archive containing a text file and a nested ZIP archive."""
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("inner.txt", "inner " * 100)
+
+    outer = io.BytesIO()
+    with zipfile.ZipFile(outer, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("inner.zip", inner.getvalue())
+        zip_obj.writestr("outer.txt", "outer " * 100)
+
+    return outer.getvalue()
+
+
+def test_distribute_breadth_first(mocker):
+    """
+    Pass: Extracted files are distributed breadth-first (smaller files first within
+        a depth) and max_depth is respected.
+    Failure: Events are out of order or files deeper than max_depth are scanned.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanZip": [{"positive": {"flavors": ["zip_file"]}, "priority": 5}],
+    }
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=nested_zip()), int(time.time()) + 300
+    )
+
+    TestCase().assertListEqual(
+        [(0, ""), (1, "inner.zip"), (1, "outer.txt"), (2, "inner.txt")],
+        [(event["file"]["depth"], event["file"]["name"]) for event in events],
+    )
+    TestCase().assertEqual(
+        events[1]["file"]["tree"]["node"], events[3]["file"]["tree"]["parent"]
+    )
+
+    backend_cfg["limits"]["max_depth"] = 1
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=nested_zip()), int(time.time()) + 300
+    )
+
+    TestCase().assertListEqual([0, 1, 1], [event["file"]["depth"] for event in events])
+
+
+def test_distribute_duplicates(mocker):
+    """
+    Pass: Extracted files with the same data as a file earlier in the request are not
+        scanned and reference the earlier file.
+    Failure: Duplicates are scanned or do not reference the earlier file.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanZip": [{"positive": {"flavors": ["zip_file"]}, "priority": 5}],
+    }
+    backend_cfg["distribution"] = {"deduplicate": True}
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("first.txt", "duplicate " * 100)
+        zip_obj.writestr("second.txt", "duplicate " * 100)
+        zip_obj.writestr("unique.txt", "unique " * 200)
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=archive.getvalue()), int(time.time()) + 300
+    )
+
+    TestCase().assertListEqual(
+        ["", "first.txt", "second.txt", "unique.txt"],
+        [event["file"]["name"] for event in events],
+    )
+    TestCase().assertNotIn("duplicate", events[1]["file"]["tree"])
+    TestCase().assertEqual(
+        events[1]["file"]["tree"]["node"], events[2]["file"]["tree"]["duplicate"]
+    )
+    TestCase().assertEqual(1000, events[2]["file"]["size"])
+    TestCase().assertEqual([], events[2]["file"]["scanners"])
+    TestCase().assertEqual({}, events[2]["scan"])
+    TestCase().assertIn("header", events[3]["scan"])
+
+
+def test_distribute_coordinator_data(mocker):
+    """
+    Pass: File data is read from the coordinator in one transaction and reassembled.
+    Failure: Data is read chunk by chunk, not deleted, or reassembled incorrectly.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+
+    data = os.urandom(1024 * 100)
+    chunks = list(strelka.chunk_string(data))
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    pipeline = backend.coordinator.pipeline.return_value
+    pipeline.execute.return_value = [chunks, 1]
+
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(pointer="test"), int(time.time()) + 300
+    )
+
+    backend.coordinator.lpop.assert_not_called()
+    backend.coordinator.pipeline.assert_any_call(transaction=True)
+    pipeline.lrange.assert_called_once_with("data:test", 0, -1)
+    pipeline.delete.assert_called_once_with("data:test")
+    TestCase().assertEqual(len(data), events[0]["file"]["size"])
+    TestCase().assertEqual(data[:50], events[0]["scan"]["header"]["header"])
+
+
+def test_emit_file_uploads(mocker):
+    """
+    Pass: Files extracted during a scan are uploaded to the coordinator in one
+        round trip, split into chunks of the configured size.
+    Failure: Files are uploaded chunk by chunk or with the wrong chunk size.
+    """
+
+    from strelka.scanners.scan_zip import ScanZip
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("first.txt", "first " * 1000)
+        zip_obj.writestr("second.txt", "second " * 1000)
+
+    coordinator = mock.MagicMock()
+    pipeline = coordinator.pipeline.return_value
+
+    scanner = ScanZip({"coordinator": {"chunk_size": 1024}}, coordinator)
+    (files, _) = scanner.scan_wrapper(
+        archive.getvalue(), strelka.File(name="test"), {}, int(time.time()) + 300
+    )
+
+    TestCase().assertEqual(2, len(files))
+    coordinator.pipeline.assert_called_once_with(transaction=False)
+    pipeline.execute.assert_called_once_with()
+
+    TestCase().assertListEqual(
+        [
+            (f"data:{files[0].pointer}", 6),
+            (f"data:{files[1].pointer}", 7),
+        ],
+        [(c.args[0], len(c.args) - 1) for c in pipeline.rpush.call_args_list],
+    )
+    TestCase().assertEqual(2, pipeline.expireat.call_count)
+
+
+def test_distribute_local_data(mocker):
+    """
+    Pass: Extracted files that fit in the local data budget are distributed from
+        memory, the rest are uploaded to and retrieved from the coordinator.
+    Failure: Files within the budget round trip through the coordinator or the
+        budget is exceeded.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanZip": [{"positive": {"flavors": ["zip_file"]}, "priority": 5}],
+    }
+    backend_cfg["distribution"] = {"local_data_budget": 1500}
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("first.txt", "first " * 200)
+        zip_obj.writestr("second.txt", "second " * 200)
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    pipeline = backend.coordinator.pipeline.return_value
+    pipeline.execute.return_value = [[b"second " * 200], 1]
+
+    root_id = str(uuid.uuid4())
+    events = backend.distribute(
+        root_id, strelka.File(data=archive.getvalue()), int(time.time()) + 300
+    )
+
+    TestCase().assertListEqual(
+        [("", len(archive.getvalue())), ("first.txt", 1200), ("second.txt", 1400)],
+        [(event["file"]["name"], event["file"]["size"]) for event in events],
+    )
+
+    # Only the file that exceeded the budget was uploaded and retrieved
+    uploaded = [c.args[0] for c in pipeline.rpush.call_args_list]
+    TestCase().assertEqual(1, len([key for key in uploaded if key.startswith("data:")]))
+    pipeline.lrange.assert_called_once()
+    TestCase().assertEqual(0, backend.local_data.used)
+
+    # Events of every file are sent to the coordinator
+    TestCase().assertEqual(3, uploaded.count(f"event:{root_id}"))
+
+
+def test_distribute_duplicates_failed_upload(mocker):
+    """
+    Pass: Extracted files whose upload failed are dropped with their duplicates and
+        later copies of their data are uploaded instead of referencing them.
+    Failure: Later copies reference a file that has no event or data.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["distribution"] = {"deduplicate": True}
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    pipeline = backend.coordinator.pipeline.return_value
+    pipeline.execute.side_effect = [Exception("coordinator unavailable"), [1, 1]]
+
+    plugin = backend.load_scanner("ScanZip")
+    plugin.expire_at = int(time.time()) + 300
+
+    plugin.emit_file(b"duplicate " * 100, name="first.txt")
+    plugin.emit_file(b"duplicate " * 100, name="second.txt")
+    TestCase().assertEqual(plugin.files[0].uid, plugin.files[1].duplicate)
+    plugin.flush_uploads()
+
+    TestCase().assertEqual([], plugin.files)
+    TestCase().assertEqual(["failed_to_emit_file"], plugin.flags)
+    TestCase().assertEqual({}, backend.seen)
+
+    plugin.emit_file(b"duplicate " * 100, name="third.txt")
+    plugin.flush_uploads()
+
+    TestCase().assertEqual(["third.txt"], [f.name for f in plugin.files])
+    TestCase().assertEqual("", plugin.files[0].duplicate)
+    TestCase().assertEqual({plugin.files[0].sha256: plugin.files[0].uid}, backend.seen)
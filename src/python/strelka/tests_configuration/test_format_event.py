@@ -0,0 +1,45 @@
+import json
+from collections import OrderedDict
+
+import msgpack
+
+from strelka import strelka
+
+
+def test_format_event(mocker):
+    """
+    Pass: Bytes are replaced with strings and empty values are removed, including
+        containers that only hold empty values.
+    Failure: Event contains bytes or empty values, or differs from the expected JSON.
+    """
+
+    event = {
+        "file": {
+            "depth": 0,
+            "flavors": {"mime": ["text/plain"], "yara": []},
+            "name": b"test\xff",
+            "tree": {"parent": "", "root": None},
+        },
+        "scan": {
+            "header": {"elapsed": 0.1, "flags": [], "header": b"header"},
+            "strings": {
+                "elapsed": 0.0,
+                "flags": [],
+                "strings": [b"", "", None, [], {}, [{"empty": [b""]}], 0, False],
+            },
+            "entries": OrderedDict([("b", ("x", b"")), ("a", ())]),
+        },
+    }
+
+    formatted = strelka.format_event(event)
+
+    assert formatted == (
+        '{"file": {"depth": 0, "flavors": {"mime": ["text/plain"]}, '
+        '"name": "test\\ufffd"}, '
+        '"scan": {"header": {"elapsed": 0.1, "header": "header"}, '
+        '"strings": {"elapsed": 0.0, "strings": [0, false]}, '
+        '"entries": {"b": ["x"], "a": []}}}'
+    )
+    assert msgpack.unpackb(strelka.format_event(event, "msgpack")) == json.loads(
+        formatted
+    )
@@ -0,0 +1,152 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import isolation, strelka
+
+
+def load_backend_cfg(options: dict, isolation: dict = None) -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [
+            {"positive": {"flavors": ["*"]}, "priority": 5, "options": options}
+        ],
+        "ScanZip": [
+            {"positive": {"flavors": ["zip_file"]}, "priority": 5, "options": options}
+        ],
+    }
+    backend_cfg["isolation"] = isolation or {}
+
+    return backend_cfg
+
+
+def distribute(backend: strelka.Backend) -> list:
+    events = backend.distribute(
+        str(uuid.uuid4()),
+        strelka.File(
+            data=Path(Path(__file__).parent / "../tests/fixtures/test.zip").read_bytes()
+        ),
+        int(time.time()) + 300,
+    )
+
+    formatted = []
+    for event in events:
+        event = json.loads(strelka.format_event(event))
+        del event["file"]["tree"]
+        for scanner in event["scan"].values():
+            del scanner["elapsed"]
+        formatted.append(event)
+
+    return formatted
+
+
+def test_isolation_scan(mocker):
+    """
+    Pass: Scanners isolated in helper processes produce the same events as scanners
+        run in the worker, including files extracted by the helper.
+    Failure: Events differ or extracted files are missing.
+    """
+
+    backend = strelka.Backend(load_backend_cfg({}), disable_coordinator=True)
+    isolated = strelka.Backend(
+        load_backend_cfg({"isolation": "process"}), disable_coordinator=True
+    )
+
+    try:
+        expected = distribute(backend)
+        actual = distribute(isolated)
+    finally:
+        isolated.isolation.close()
+
+    TestCase.maxDiff = None
+    TestCase().assertGreater(len(actual), 1)
+    TestCase().assertListEqual(expected, actual)
+    TestCase().assertEqual(0, isolated.isolation.restarts)
+
+
+def test_isolation_crash(mocker):
+    """
+    Pass: A helper process that dies is flagged as crashed and restarted for the
+        next scan.
+    Failure: The worker raises, the scan is not flagged, or the helper is not
+        restarted.
+    """
+
+    # The helper cannot import the scanners within the address space limit
+    backend = strelka.Backend(
+        load_backend_cfg({"isolation": "process"}, {"memory": 32 * 1024 * 1024}),
+        disable_coordinator=True,
+    )
+
+    try:
+        events = distribute(backend)
+    finally:
+        backend.isolation.close()
+
+    TestCase().assertEqual(1, len(events))
+    TestCase().assertEqual(["crashed"], events[0]["scan"]["header"]["flags"])
+    TestCase().assertEqual(["crashed"], events[0]["scan"]["zip"]["flags"])
+    TestCase().assertEqual(2, backend.isolation.restarts)
+
+
+def test_isolation_expired_deadline(mocker):
+    """
+    Pass: Isolated scanners whose deadline has passed time out without being
+        sent to a helper process.
+    Failure: The scan is sent to a helper process or is not flagged as timed out.
+    """
+
+    backend = strelka.Backend(
+        load_backend_cfg({"isolation": "process"}), disable_coordinator=True
+    )
+    mocker.patch.object(strelka.deadlines, "remaining", return_value=0.0)
+    scan = mocker.patch.object(backend.isolation, "scan")
+
+    try:
+        events = distribute(backend)
+    finally:
+        backend.isolation.close()
+
+    scan.assert_not_called()
+    TestCase().assertEqual(["timed_out"], events[0]["scan"]["header"]["flags"])
+
+
+def test_isolation_concurrent_restarts(mocker):
+    """
+    Pass: Helpers that crash during concurrent scans are each counted once.
+    Failure: Restarts counted from multiple scanner threads are lost.
+    """
+
+    # The helpers cannot import the scanners within the address space limit
+    pool = isolation.IsolationPool(
+        load_backend_cfg({}, {"processes": 4, "memory": 32 * 1024 * 1024})
+    )
+
+    def scan(_) -> None:
+        try:
+            pool.scan("ScanHeader", b"data", strelka.File(), {}, 0, 10.0)
+        except isolation.ScannerCrashed:
+            pass
+
+    try:
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(scan, range(8)))
+    finally:
+        pool.close()
+
+    TestCase().assertEqual(8, pool.restarts)
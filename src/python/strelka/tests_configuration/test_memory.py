@@ -0,0 +1,92 @@
+import os
+import time
+from pathlib import Path
+from unittest import TestCase, mock
+
+import yaml
+
+from strelka import memory, strelka
+
+
+def test_memory_monitor(mocker):
+    """
+    Pass: Workers are recycled past the hard limit, past the soft limit when
+        trimming the heap does not help, and past the growth limit.
+    Failure: Workers are recycled under the limits or kept past them.
+    """
+
+    rss = mocker.patch.object(memory, "current_rss")
+    trim = mocker.patch.object(memory, "trim")
+
+    monitor = memory.MemoryMonitor(
+        {"memory_soft": 800, "memory_hard": 1000, "memory_growth": 300}
+    )
+
+    # The first check sets the baseline
+    rss.return_value = 400
+    TestCase().assertEqual("", monitor.check())
+    TestCase().assertEqual(400, monitor.baseline)
+
+    rss.return_value = 600
+    TestCase().assertEqual("", monitor.check())
+
+    rss.return_value = 700
+    TestCase().assertIn("grew past", monitor.check())
+
+    # Trimming the heap brings the worker back under the soft limit
+    monitor.baseline = 600
+    rss.side_effect = [850, 650]
+    TestCase().assertEqual("", monitor.check())
+    TestCase().assertEqual(1, trim.call_count)
+
+    rss.side_effect = [900, 850]
+    TestCase().assertIn("soft limit", monitor.check())
+
+    rss.side_effect = None
+    rss.return_value = 1000
+    TestCase().assertIn("hard limit", monitor.check())
+
+    rss.return_value = 600
+    TestCase().assertTrue(monitor.admits(300))
+    TestCase().assertFalse(monitor.admits(400))
+
+
+def test_memory_limit_exceeded(mocker):
+    """
+    Pass: Files whose data would take the worker past the hard limit are not
+        retrieved or scanned, their data is deleted and their event is flagged.
+    Failure: The file is retrieved, scanned, or not flagged.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["limits"]["memory_hard"] = 1000
+    backend_cfg["distribution"] = {}
+    backend_cfg["telemetry"] = {}
+
+    mocker.patch.object(memory, "current_rss", return_value=600)
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    backend.coordinator.memory_usage.return_value = 500
+
+    events = backend.distribute(
+        "root", strelka.File(pointer="root"), int(time.time()) + 300
+    )
+
+    TestCase().assertEqual(1, len(events))
+    TestCase().assertEqual(["memory_limit_exceeded"], events[0]["file"]["flags"])
+    TestCase().assertEqual([], events[0]["file"]["scanners"])
+    TestCase().assertEqual({}, events[0]["scan"])
+    backend.coordinator.pipeline.return_value.lrange.assert_not_called()
+    backend.coordinator.delete.assert_called_with("data:root")
@@ -0,0 +1,101 @@
+import os
+import socket
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import strelka
+from strelka.telemetry.metrics import get_metrics
+
+
+def load_backend_cfg(metrics: dict) -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanZip": [{"positive": {"flavors": ["zip_file"]}, "priority": 5}],
+    }
+    backend_cfg["telemetry"] = {"metrics": metrics}
+
+    return backend_cfg
+
+
+def test_metrics_textfile(mocker, tmp_path):
+    """
+    Pass: Distributing a file records per-scanner and per-depth metrics that are
+        written to the textfile.
+    Failure: Metrics are missing or do not match the distributed files.
+    """
+
+    path = tmp_path / "strelka_{worker}.prom"
+    backend = strelka.Backend(
+        load_backend_cfg({"exporter": "textfile", "path": str(path)}),
+        disable_coordinator=True,
+    )
+    data = Path(Path(__file__).parent / "../tests/fixtures/test.zip").read_bytes()
+
+    events = backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=data), int(time.time()) + 300
+    )
+
+    backend.metrics.start(worker=3)
+    text = (tmp_path / "strelka_3.prom").read_text()
+
+    TestCase().assertIn('strelka_files_total{worker="3",depth="0"} 1', text)
+    TestCase().assertIn(
+        f'strelka_files_total{{worker="3",depth="1"}} {len(events) - 1}', text
+    )
+    TestCase().assertIn(
+        f'strelka_scanner_bytes_total{{worker="3",scanner="ScanZip"}} {len(data)}',
+        text,
+    )
+    TestCase().assertIn(
+        f'strelka_scanner_elapsed_seconds_count{{worker="3",scanner="ScanHeader"}}'
+        f" {len(events)}",
+        text,
+    )
+    TestCase().assertIn(
+        'strelka_scanner_elapsed_seconds_bucket{worker="3",scanner="ScanZip",le="+Inf"} 1',
+        text,
+    )
+    TestCase().assertIn('strelka_worker_rss_bytes{worker="3"}', text)
+
+
+def test_metrics_http(mocker):
+    """
+    Pass: Metrics are served over HTTP on the configured port offset by the worker
+        index.
+    Failure: The endpoint is not served or does not contain metrics.
+    """
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    metrics = get_metrics({"exporter": "http", "addr": f"127.0.0.1:{port - 1}"})
+    metrics.scanner_flags.inc(scanner="ScanDelay", flag="timed_out")
+    metrics.start(worker=1)
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            text = response.read().decode()
+    finally:
+        metrics.stop()
+
+    TestCase().assertIn("# TYPE strelka_scanner_flags_total counter", text)
+    TestCase().assertIn(
+        'strelka_scanner_flags_total{worker="1",scanner="ScanDelay",flag="timed_out"} 1',
+        text,
+    )
@@ -0,0 +1,139 @@
+import os
+import pstats
+import time
+import uuid
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import strelka
+from strelka.profiling import Profiler
+
+
+def load_backend_cfg(profiling: dict) -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["profiling"] = profiling
+
+    return backend_cfg
+
+
+def test_profiling_directory(mocker, tmp_path):
+    """
+    Pass: Scans of the profiled scanner are aggregated into a pstats file and other
+        scanners are not profiled.
+    Failure: The profile is missing, unreadable, or contains other scanners.
+    """
+
+    backend = strelka.Backend(
+        load_backend_cfg(
+            {
+                "enabled": True,
+                "scanners": ["ScanHeader"],
+                "directory": str(tmp_path),
+            }
+        ),
+        disable_coordinator=True,
+    )
+
+    for _ in range(3):
+        backend.distribute(
+            str(uuid.uuid4()), strelka.File(data=b"strelka"), int(time.time()) + 300
+        )
+    backend.profiler.write()
+
+    (path,) = tmp_path.iterdir()
+    TestCase().assertTrue(path.name.startswith("ScanHeader."))
+
+    stats = pstats.Stats(str(path))
+    scans = [
+        value
+        for (filename, _, function), value in stats.stats.items()
+        if filename.endswith("scan_header.py") and function == "scan"
+    ]
+    TestCase().assertEqual(1, len(scans))
+    # Number of calls
+    TestCase().assertEqual(3, scans[0][1])
+
+
+def test_profiling_window(mocker, tmp_path):
+    """
+    Pass: Scans are not profiled after the profiling window closes.
+    Failure: Scans are profiled outside of the window.
+    """
+
+    backend = strelka.Backend(
+        load_backend_cfg({"enabled": True, "duration": 0, "directory": str(tmp_path)}),
+        disable_coordinator=True,
+    )
+
+    backend.distribute(
+        str(uuid.uuid4()), strelka.File(data=b"strelka"), int(time.time()) + 300
+    )
+
+    TestCase().assertEqual({}, backend.profiler.stats)
+    TestCase().assertFalse(backend.profiler.dirty)
+
+
+def test_profiling_recycled_worker(mocker):
+    """
+    Pass: A recycled worker joins the profiling window opened by the first worker
+        instead of opening a new window.
+    Failure: The recycled worker profiles scans after the window closed.
+    """
+
+    anchors: dict = {}
+
+    def set_anchor(key, value, nx=False, ex=None):
+        if nx and key in anchors:
+            return None
+        anchors[key] = str(value).encode()
+        return True
+
+    coordinator = mocker.MagicMock()
+    coordinator.set.side_effect = set_anchor
+    coordinator.get.side_effect = anchors.get
+
+    profiling_cfg = {"enabled": True, "duration": 300, "key": "profile"}
+    now = time.time()
+    mocker.patch("strelka.profiling.time.time", return_value=now)
+
+    first = Profiler(profiling_cfg, coordinator)
+    first.start()
+    TestCase().assertTrue(first.sample("ScanHeader"))
+
+    mocker.patch("strelka.profiling.time.time", return_value=now + 600)
+
+    recycled = Profiler(profiling_cfg, coordinator)
+    recycled.start()
+    TestCase().assertEqual(now, recycled.started)
+    TestCase().assertFalse(recycled.sample("ScanHeader"))
+
+
+def test_profiling_start(mocker, tmp_path):
+    """
+    Pass: Scans are only profiled between the configured start and the end of the
+        window.
+    Failure: Scans are profiled outside of the configured window.
+    """
+
+    now = time.time()
+    profiling_cfg = {"enabled": True, "duration": 300, "directory": str(tmp_path)}
+
+    for start, active in [(now + 60, False), (now - 60, True), (now - 600, False)]:
+        profiler = Profiler({**profiling_cfg, "start": start})
+        profiler.start()
+        TestCase().assertEqual(active, profiler.sample("ScanHeader"))
@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import time
+import uuid
+import zipfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+import yaml
+
+from strelka import strelka
+from strelka.cache import ResultCache
+
+
+def load_backend_cfg(scanners: dict, results: dict = None) -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = scanners
+    backend_cfg["caching"] = {
+        "scanner": True,
+        "results": results or {"enabled": True, "backend": "local"},
+    }
+
+    return backend_cfg
+
+
+def nested_zip() -> bytes:
+    """Builds a ZIP archive containing a text file and a nested ZIP archive."""
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("inner.txt", "inner " * 100)
+
+    outer = io.BytesIO()
+    with zipfile.ZipFile(outer, "w", zipfile.ZIP_DEFLATED) as zip_obj:
+        zip_obj.writestr("inner.zip", inner.getvalue())
+        zip_obj.writestr("outer.txt", "outer " * 100)
+
+    return outer.getvalue()
+
+
+def test_result_cache_replay(mocker):
+    """
+    Pass: Distributing the same file twice replays the cached results of the file and
+        its extracted files.
+    Failure: The file is rescanned or replayed events differ from scanned events.
+    """
+
+    backend = strelka.Backend(
+        load_backend_cfg(
+            {
+                "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+                "ScanZip": [{"positive": {"flavors": ["zip_file"]}, "priority": 5}],
+            }
+        ),
+        disable_coordinator=True,
+    )
+
+    events = []
+    for _ in range(2):
+        events.append(
+            backend.distribute(
+                str(uuid.uuid4()),
+                strelka.File(data=nested_zip()),
+                int(time.time()) + 300,
+            )
+        )
+
+    TestCase().assertEqual(1, backend.result_cache.hits)
+    TestCase().assertEqual(4, backend.result_cache.misses)
+    TestCase().assertEqual(4, backend.result_cache.stores)
+
+    # Replayed files are linked to each other, not to the files that were scanned
+    TestCase().assertEqual(
+        events[1][1]["file"]["tree"]["node"], events[1][3]["file"]["tree"]["parent"]
+    )
+
+    # Replayed events are identical once formatted
+    formatted = []
+    for run in events:
+        formatted.append([json.loads(strelka.format_event(event)) for event in run])
+        for event in formatted[-1]:
+            event["file"]["tree"] = mock.ANY
+
+    TestCase.maxDiff = None
+    TestCase().assertListEqual(formatted[0], formatted[1])
+
+
+def test_result_cache_exclude(mocker):
+    """
+    Pass: Results of files assigned to excluded scanners are not cached.
+    Failure: Results are stored or replayed.
+    """
+
+    backend = strelka.Backend(
+        load_backend_cfg(
+            {
+                "ScanDelay": [
+                    {
+                        "positive": {"flavors": ["*"]},
+                        "priority": 5,
+                        "options": {"delay": 0.0},
+                    }
+                ],
+                "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+            }
+        ),
+        disable_coordinator=True,
+    )
+
+    for _ in range(2):
+        backend.distribute(
+            str(uuid.uuid4()), strelka.File(data=b"test"), int(time.time()) + 300
+        )
+
+    TestCase().assertEqual(0, backend.result_cache.hits)
+    TestCase().assertEqual(2, backend.result_cache.misses)
+    TestCase().assertEqual(0, backend.result_cache.stores)
+
+
+def test_result_cache_scanners(mocker, tmp_path):
+    """
+    Pass: Scanner results are reused until the scanner's rules change.
+    Failure: Scanners are rerun with unchanged inputs or reused with changed rules.
+    """
+
+    rules = tmp_path / "rules.yara"
+    rules.write_text('rule first { strings: $a = "strelka" condition: $a }')
+
+    backend = strelka.Backend(
+        load_backend_cfg(
+            {
+                "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+                "ScanYara": [
+                    {
+                        "positive": {"flavors": ["*"]},
+                        "priority": 5,
+                        "options": {"location": str(rules)},
+                    }
+                ],
+            },
+            results={"scanners": True, "backend": "local"},
+        ),
+        disable_coordinator=True,
+    )
+
+    def distribute():
+        events = backend.distribute(
+            str(uuid.uuid4()), strelka.File(data=b"strelka"), int(time.time()) + 300
+        )
+        return json.loads(strelka.format_event(events[0]))["scan"]
+
+    first = distribute()
+    second = distribute()
+
+    TestCase().assertIsNone(backend.result_cache)
+    TestCase().assertEqual(2, backend.scanner_result_cache.hits)
+    TestCase().assertEqual(2, backend.scanner_result_cache.misses)
+    TestCase().assertEqual(first, second)
+
+    # Rules are loaded once per scanner object, drop the objects to reload them
+    rules.write_text('rule second { strings: $a = "strelka" condition: $a }')
+    backend.scanner_cache.clear()
+    third = distribute()
+
+    TestCase().assertEqual(3, backend.scanner_result_cache.hits)
+    TestCase().assertEqual(3, backend.scanner_result_cache.misses)
+    TestCase().assertEqual(first["header"], third["header"])
+    TestCase().assertEqual(["second"], third["yara"]["matches"])
+
+
+def test_result_cache_abstract():
+    """
+    Pass: Result cache backends that do not implement every method fail when
+        they are constructed.
+    Failure: An incomplete backend is constructed.
+    """
+
+    class IncompleteResultCache(ResultCache):
+        def get_many(self, keys: list) -> list:
+            return [None for _ in keys]
+
+    with TestCase().assertRaises(TypeError):
+        IncompleteResultCache("result:test")
@@ -248,3 +248,60 @@ def test_fixture_scanner_assignment(fixture_path, expected) -> None:
 
             TestCase.maxDiff = None
             TestCase().assertListEqual(expected, assignments)
+
+
+def test_mapping_scanner_assignment() -> None:
+    """
+    Pass: Negative, filename, and source mappings are applied in mapping order.
+    Failure: Scanners are assigned differently than their mappings specify.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanAll": [
+            {"negative": {"source": ["ScanZip"]}, "positive": {"flavors": ["*"]}},
+        ],
+        "ScanConfig": [
+            {"positive": {"filename": r"\.(cfg|ini)$"}, "priority": 3},
+        ],
+        "ScanLate": [
+            {"positive": {"flavors": ["text_file"]}, "priority": 4},
+            {"negative": {"flavors": ["text_file"]}, "priority": 9},
+        ],
+        "ScanSource": [
+            {"negative": {"filename": "^skip"}, "positive": {"source": ["ScanZip"]}},
+            {"positive": {"flavors": ["text_file"]}, "priority": 1},
+        ],
+    }
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+
+    def assign(name: str, source: str, ignore_wildcards: bool = False) -> list:
+        file = strelka.File(name=name, source=source)
+        file.add_flavors({"yara": ["text_file"]})
+        return [
+            (match["name"], match["priority"])
+            for match in backend.match_scanners(file, ignore_wildcards)
+        ]
+
+    TestCase().assertListEqual(
+        [("ScanAll", 5), ("ScanLate", 4), ("ScanConfig", 3), ("ScanSource", 1)],
+        assign("settings.ini", ""),
+    )
+    TestCase().assertListEqual(
+        [("ScanSource", 5), ("ScanLate", 4)],
+        assign("readme", "ScanZip"),
+    )
+    TestCase().assertListEqual([("ScanLate", 4)], assign("skip.txt", "ScanZip"))
+    TestCase().assertListEqual(
+        [("ScanLate", 4), ("ScanSource", 1)], assign("readme", "", True)
+    )
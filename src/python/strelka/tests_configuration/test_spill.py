@@ -0,0 +1,94 @@
+import os
+import time
+from pathlib import Path
+from unittest import TestCase, mock
+
+import yaml
+
+from strelka import buffers, strelka
+from strelka.buffers import FileBuffer, MappedData
+
+
+def test_spill(mocker, tmp_path):
+    """
+    Pass: Data retrieved from the coordinator past the spill threshold is read in
+        batches, memory-mapped from the spill directory, scanned like bytes, and
+        deleted after the file is distributed.
+    Failure: Data is not spilled, is scanned differently, or is left on disk.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["distribution"] = {
+        "spill_threshold": 8,
+        "spill_directory": str(tmp_path),
+    }
+    backend_cfg["telemetry"] = {}
+
+    mocker.patch.object(strelka, "retrieve_batch", 2)
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    pipeline = backend.coordinator.pipeline.return_value
+    pipeline.execute.side_effect = [
+        [[b"  strelka ", b"spills "], True],
+        [[b"data"], True],
+    ]
+
+    data = backend.retrieve_data("pointer")
+    TestCase().assertIsInstance(data, MappedData)
+    TestCase().assertEqual(b"  strelka spills data", data)
+    TestCase().assertEqual(str(tmp_path), os.path.dirname(data.path))
+    pipeline.ltrim.assert_called_with("data:pointer", 2, -1)
+
+    pipeline.execute.side_effect = None
+    events = backend.distribute(
+        "root",
+        strelka.File(name="test.txt", data=data),
+        int(time.time()) + 300,
+    )
+
+    TestCase().assertEqual(
+        b"  strelka spills data", events[0]["scan"]["header"]["header"]
+    )
+    TestCase().assertEqual(
+        b"  strelka spills data", events[0]["scan"]["footer"]["footer"]
+    )
+    TestCase().assertEqual(21, events[0]["file"]["size"])
+    TestCase().assertEqual([], os.listdir(tmp_path))
+
+
+def test_spill_copies(mocker, tmp_path):
+    """
+    Pass: Spilled data is decoded without a copy, and bytes methods that need a
+        copy of the data are counted.
+    Failure: Decoding copies the data or copies are not counted.
+    """
+
+    copies = mocker.patch.object(buffers, "copies", buffers.copies.copy())
+    buffer = FileBuffer(4, str(tmp_path))
+    buffer.write("strelka\nspills\ndata \u2713".encode())
+    data = buffer.getvalue()
+
+    try:
+        TestCase().assertIsInstance(data, MappedData)
+        TestCase().assertEqual("strelka\nspills\ndata \u2713", data.decode())
+        TestCase().assertEqual(0, copies["decode"])
+
+        TestCase().assertEqual(
+            [b"strelka", b"spills", "data \u2713".encode()], data.splitlines()
+        )
+        TestCase().assertEqual(1, copies["splitlines"])
+    finally:
+        data.release()
@@ -0,0 +1,142 @@
+import gc
+import os
+import signal
+import threading
+import time
+from unittest import TestCase
+
+import pytest
+
+from strelka import supervisor
+
+
+class StubBackend(object):
+    """Backend whose work loop records each worker start in a file."""
+
+    def __init__(self, path: str, starts: int = 0, block: bool = False) -> None:
+        self.coordinator = True
+        self.worker = -1
+        self.path = path
+        self.starts = starts
+        self.block = block
+        self.draining = False
+
+    def preload(self) -> None:
+        pass
+
+    def drain(self) -> None:
+        self.draining = True
+
+    def record(self, line: str) -> int:
+        with open(self.path, "a") as f:
+            f.write(f"{line}\n")
+        with open(self.path) as f:
+            return len(f.readlines())
+
+    def work(self) -> None:
+        count = self.record(f"start {self.worker} {os.getpid()} {time.monotonic()}")
+        if self.block:
+            while not self.draining:
+                time.sleep(0.01)
+            self.record(f"drained {self.worker} {os.getpid()}")
+        elif count >= self.starts:
+            os.kill(os.getppid(), signal.SIGTERM)
+
+
+def read_starts(path) -> list:
+    with open(path) as f:
+        return [line.split() for line in f if line.startswith("start")]
+
+
+@pytest.fixture(autouse=True)
+def restore_signals():
+    handlers = {
+        signum: signal.getsignal(signum) for signum in supervisor.handled_signals
+    }
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+    gc.unfreeze()
+
+
+def test_supervisor_restart(mocker, tmp_path):
+    """
+    Pass: Each worker slot is forked and workers that exit are restarted until the
+        supervisor drains.
+    Failure: Workers are not started or not restarted.
+    """
+
+    mocker.patch.object(supervisor, "min_worker_lifetime", 0)
+    path = tmp_path / "starts"
+    supervisor.Supervisor(StubBackend(str(path), starts=6), 2).run()
+
+    starts = read_starts(path)
+    TestCase().assertGreaterEqual(len(starts), 6)
+    TestCase().assertEqual({"0", "1"}, {index for (_, index, _, _) in starts})
+    TestCase().assertEqual(len(starts), len({pid for (_, _, pid, _) in starts}))
+
+
+def test_supervisor_restart_delay(mocker, tmp_path):
+    """
+    Pass: Workers that exit faster than min_worker_lifetime are restarted after
+        restart_delay.
+    Failure: Workers that fail on startup are restarted in a tight loop.
+    """
+
+    mocker.patch.object(supervisor, "min_worker_lifetime", 10.0)
+    mocker.patch.object(supervisor, "restart_delay", 0.2)
+    path = tmp_path / "starts"
+    supervisor.Supervisor(StubBackend(str(path), starts=3), 1).run()
+
+    started = [float(at) for (_, _, _, at) in read_starts(path)]
+    TestCase().assertGreaterEqual(len(started), 3)
+    for previous, current in zip(started, started[1:]):
+        TestCase().assertGreaterEqual(current - previous, 0.2)
+
+
+def test_supervisor_drain(mocker, tmp_path):
+    """
+    Pass: SIGTERM is forwarded to every worker, workers finish their work loop, and
+        they are not restarted.
+    Failure: Workers are not drained or are restarted.
+    """
+
+    path = tmp_path / "starts"
+    timer = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    try:
+        supervisor.Supervisor(StubBackend(str(path), block=True), 2).run()
+    finally:
+        timer.cancel()
+
+    with open(path) as f:
+        lines = [line.split()[:2] for line in f]
+    TestCase().assertEqual(2, len(read_starts(path)))
+    TestCase().assertCountEqual(
+        [["drained", "0"], ["drained", "1"]],
+        [line for line in lines if line[0] == "drained"],
+    )
+
+
+def test_supervisor_spawn_signals(mocker, tmp_path):
+    """
+    Pass: SIGTERM and SIGINT are blocked while a worker is forked and unblocked
+        once the worker is recorded.
+    Failure: Signals can be handled by the supervisor's handlers in the worker.
+    """
+
+    masks = []
+
+    def fork():
+        masks.append(signal.pthread_sigmask(signal.SIG_BLOCK, []))
+        return 4194304
+
+    mocker.patch.object(supervisor.os, "fork", fork)
+    sup = supervisor.Supervisor(StubBackend(str(tmp_path / "starts")), 1)
+    sup.spawn(0)
+
+    TestCase().assertTrue(supervisor.handled_signals <= masks[0])
+    TestCase().assertEqual({4194304: 0}, sup.children)
+    TestCase().assertFalse(
+        supervisor.handled_signals & signal.pthread_sigmask(signal.SIG_BLOCK, [])
+    )
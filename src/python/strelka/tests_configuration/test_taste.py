@@ -220,3 +220,77 @@ def test_taste_required() -> None:
             taste_expectations.keys(),
             msg="Fixture does not have a taste expectation",
         )
+
+
+def test_taste_windows(tmp_path) -> None:
+    """
+    Pass: YARA rules only taste the head and tail of files, unless their namespace
+        overrides the window, and leading whitespace is skipped.
+    Failure: Rules match outside of their window or anchored rules do not match.
+    """
+
+    (tmp_path / "anchored.yara").write_text(
+        'rule head_marker { strings: $a = "HEAD" condition: $a at 0 }\n'
+        'rule tail_marker { strings: $a = "TAIL" condition: $a at filesize - 4 }\n'
+        'rule middle_marker { strings: $a = "MIDDLE" condition: $a }\n'
+    )
+    (tmp_path / "content.yara").write_text(
+        'rule content_marker { strings: $a = "MIDDLE" condition: $a }\n'
+    )
+
+    backend_cfg = {
+        "tasting": {
+            "yara_rules": str(tmp_path),
+            "windows": {
+                "yara": {"head": 1024, "tail": 1024},
+                "namespaces": {"content.yara": {"head": None}},
+            },
+        },
+        "scanners": {},
+        "telemetry": {},
+    }
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+
+    data = b"HEAD" + b"\x00" * 4096 + b"MIDDLE" + b"\x00" * 4096 + b"TAIL"
+    TestCase().assertListEqual(
+        ["content_marker", "head_marker", "tail_marker"],
+        sorted(backend.match_flavors(data)["yara"]),
+    )
+    TestCase().assertListEqual(
+        ["content_marker", "head_marker", "tail_marker"],
+        sorted(backend.match_flavors(b" \r\n\t" + data)["yara"]),
+    )
+
+
+def test_taste_large_file() -> None:
+    """
+    Pass: Files larger than the tasting windows are tasted whole by default, so rules
+        that search the middle of files match, and windows only apply when enabled.
+    Failure: The default configuration tastes a window of large files.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    # ZIP with an encrypted local file header past the head and tail windows
+    header = b"PK\x03\x04\x14\x00%b\x00" + b"\x00" * 22
+    data = (
+        header % b"\x00"
+        + b"\x00" * 2 * 1024 * 1024
+        + header % b"\x01"
+        + b"\x00" * 128 * 1024
+    )
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    TestCase().assertIn("encrypted_zip", backend.match_flavors(data)["yara"])
+
+    backend_cfg["tasting"]["windows"] = {"yara": {"head": 1048576, "tail": 65536}}
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    TestCase().assertNotIn("encrypted_zip", backend.match_flavors(data)["yara"])
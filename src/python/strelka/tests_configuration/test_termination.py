@@ -0,0 +1,120 @@
+import os
+import time
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+
+from strelka import strelka
+from strelka.scanners.scan_header import ScanHeader
+from strelka.termination import Condition
+
+
+def test_condition(tmp_path):
+    """
+    Pass: Conditions match fields (dotted paths and lists) against values and
+        blocklists, or any value when none are configured.
+    Failure: Conditions match the wrong fields or values.
+    """
+
+    blocklist = tmp_path / "blocklist.txt"
+    blocklist.write_text("# sha256\nabc123\n")
+
+    yara = Condition({"scanner": "ScanYara", "field": "tags", "values": ["bad"]})
+    TestCase().assertEqual("yara.tags", yara.name)
+    TestCase().assertEqual(["bad"], yara.match({"yara": {"tags": ["good", "bad"]}}))
+    TestCase().assertEqual([], yara.match({"yara": {"tags": ["good"]}}))
+    TestCase().assertEqual([], yara.match({"hash": {"tags": ["bad"]}}))
+
+    tlsh = Condition({"scanner": "ScanTlsh", "field": "match.family"})
+    TestCase().assertEqual(
+        ["Zeus"], tlsh.match({"tlsh": {"match": {"family": "Zeus"}}})
+    )
+    TestCase().assertEqual([], tlsh.match({"tlsh": {"elapsed": 0.1}}))
+
+    hash_ = Condition({"scanner": "ScanHash", "field": "sha256", "path": blocklist})
+    TestCase().assertEqual(["abc123"], hash_.match({"hash": {"sha256": "abc123"}}))
+    TestCase().assertEqual([], hash_.match({"hash": {"sha256": "def456"}}))
+
+
+def test_termination(mocker):
+    """
+    Pass: A matching scanner event cancels the file's remaining scanners and the
+        request's pending files, and a summary event is added.
+    Failure: Scanners or files run after the match, or no summary is added.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+        "ScanFooter": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["termination"] = {
+        "conditions": [
+            {
+                "name": "bad_header",
+                "scanner": "ScanHeader",
+                "field": "header",
+                "values": ["child 1"],
+            }
+        ]
+    }
+    backend_cfg["telemetry"] = {}
+
+    scan = ScanHeader.scan
+
+    def extract(self, data, file, options, expire_at):
+        scan(self, data, file, options, expire_at)
+        if file.depth == 0:
+            for i in range(3):
+                self.emit_file(f"child {i}".encode(), name=f"child{i}")
+
+    mocker.patch.object(ScanHeader, "scan", extract)
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    events = backend.distribute(
+        "root",
+        strelka.File(name="root", data=b"root"),
+        int(time.time()) + 300,
+    )
+
+    TestCase().assertEqual(
+        ["root", "child0", "child1"], [e["file"]["name"] for e in events[:3]]
+    )
+    TestCase().assertIn("footer", events[1]["scan"])
+    TestCase().assertNotIn("footer", events[2]["scan"])
+    TestCase().assertEqual(["verdict"], events[2]["file"]["flags"])
+
+    TestCase().assertEqual(
+        {
+            "summary": {
+                "verdict": {
+                    "condition": "bad_header",
+                    "scanner": "ScanHeader",
+                    "field": "header",
+                    "matches": ["child 1"],
+                    "node": events[2]["file"]["tree"]["node"],
+                },
+                "files": 3,
+                "cancelled": {"scanners": ["ScanFooter"], "files": 1},
+            }
+        },
+        events[3],
+    )
+
+    # The verdict is reset for each request
+    events = backend.distribute(
+        "root",
+        strelka.File(name="root", data=b"root"),
+        int(time.time()) + 300,
+    )
+    TestCase().assertEqual(4, len(events))
@@ -0,0 +1,74 @@
+import os
+import time
+import uuid
+from pathlib import Path
+from unittest import TestCase
+
+import yaml
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import ALWAYS_OFF, ALWAYS_ON
+from opentelemetry.trace import NonRecordingSpan
+
+from strelka import __namespace__, strelka
+
+
+def load_backend_cfg() -> dict:
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["telemetry"] = {}
+
+    return backend_cfg
+
+
+def distribute(backend: strelka.Backend, sampler) -> list:
+    """Distributes a file and returns the exported distribute spans."""
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    backend.tracer = provider.get_tracer(__name__)
+
+    backend.distribute(
+        str(uuid.uuid4()),
+        strelka.File(name="test.txt", data=b"strelka"),
+        int(time.time()) + 300,
+    )
+
+    return [span for span in exporter.get_finished_spans() if span.name == "distribute"]
+
+
+def test_tracing_attributes(mocker):
+    """
+    Pass: Sampled distribute spans carry the file's attributes and no attributes
+        are set on unsampled spans.
+    Failure: Attributes are missing from sampled spans or are built and set on
+        unsampled spans.
+    """
+
+    backend = strelka.Backend(load_backend_cfg(), disable_coordinator=True)
+
+    set_attributes = mocker.spy(NonRecordingSpan, "set_attributes")
+    set_attribute = mocker.spy(NonRecordingSpan, "set_attribute")
+    TestCase().assertEqual([], distribute(backend, ALWAYS_OFF))
+    set_attributes.assert_not_called()
+    set_attribute.assert_not_called()
+
+    (span,) = distribute(backend, ALWAYS_ON)
+    TestCase().assertEqual("test.txt", span.attributes[f"{__namespace__}.file.name"])
+    TestCase().assertEqual(7, span.attributes[f"{__namespace__}.file.size"])
+    TestCase().assertEqual(
+        ("ScanHeader",), span.attributes[f"{__namespace__}.file.scanners"]
+    )
+    TestCase().assertFalse(span.attributes[f"{__namespace__}.file.cached"])
@@ -0,0 +1,114 @@
+import collections
+import concurrent.futures
+import json
+import os
+import time
+from pathlib import Path
+from unittest import TestCase, mock
+
+import yaml
+
+from strelka import strelka
+
+
+def test_work_prefetch(mocker):
+    """
+    Pass: Tasks are claimed while a request is distributed and tasks that were not
+        started are returned to the coordinator with their data.
+    Failure: Tasks are not prefetched, or claimed tasks are lost on shutdown.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    backend_cfg["scanners"] = {
+        "ScanHeader": [{"positive": {"flavors": ["*"]}, "priority": 5}],
+    }
+    backend_cfg["coordinator"] = {"prefetch": 2}
+    backend_cfg["limits"]["max_files"] = 1
+
+    expire_at = time.time() + 300
+    tasks = [
+        json.dumps({"id": f"task{i}", "attributes": {"filename": f"task{i}"}})
+        for i in range(4)
+    ]
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    backend.coordinator.zpopmin.side_effect = [
+        [(tasks[0], expire_at)],
+        [(tasks[1], expire_at), (tasks[2], expire_at - 600)],
+    ]
+    pipeline = backend.coordinator.pipeline.return_value
+    pipeline.execute.return_value = [[b"test"], 1]
+
+    backend.work()
+
+    TestCase().assertListEqual(
+        [mock.call("tasks", count=1), mock.call("tasks", count=2)],
+        backend.coordinator.zpopmin.call_args_list,
+    )
+    TestCase().assertListEqual(
+        ["data:task0", "data:task1", "data:task2"],
+        sorted(c.args[0] for c in pipeline.lrange.call_args_list),
+    )
+
+    # The expired task is dropped, the other task is returned with its data
+    pipeline.zadd.assert_called_once_with("tasks", {tasks[1]: expire_at})
+    pipeline.rpush.assert_any_call("data:task1", b"test")
+    pipeline.rpush.assert_any_call("event:task0", "FIN")
+
+
+def test_work_return_failed_retrieval(mocker):
+    """
+    Pass: Claimed tasks whose data could not be retrieved are returned to the
+        coordinator without pushing data, and other tasks are returned with theirs.
+    Failure: Tasks whose retrieval failed are lost on shutdown.
+    """
+
+    if os.path.exists("/etc/strelka/backend.yaml"):
+        backend_cfg_path: str = "/etc/strelka/backend.yaml"
+    else:
+        backend_cfg_path: str = Path(
+            Path(__file__).parent / "../../../../configs/python/backend/backend.yaml"
+        )
+
+    with open(backend_cfg_path, "r") as f:
+        backend_cfg = yaml.safe_load(f.read())
+
+    expire_at = time.time() + 300
+    tasks = [
+        json.dumps({"id": f"task{i}", "attributes": {"filename": f"task{i}"}})
+        for i in range(2)
+    ]
+
+    backend = strelka.Backend(backend_cfg, disable_coordinator=True)
+    backend.coordinator = mock.MagicMock()
+    pipeline = backend.coordinator.pipeline.return_value
+
+    refused = concurrent.futures.Future()
+    refused.set_exception(strelka.MemoryLimitExceeded("data:task0 is 1024 bytes"))
+    retrieved = concurrent.futures.Future()
+    retrieved.set_result(b"test")
+
+    backend.return_tasks(
+        collections.deque(
+            [(tasks[0], expire_at, refused), (tasks[1], expire_at, retrieved)]
+        )
+    )
+
+    TestCase().assertListEqual(
+        [
+            mock.call("tasks", {tasks[0]: expire_at}),
+            mock.call("tasks", {tasks[1]: expire_at}),
+        ],
+        pipeline.zadd.call_args_list,
+    )
+    pipeline.rpush.assert_called_once_with("data:task1", b"test")